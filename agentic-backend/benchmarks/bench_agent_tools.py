@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-call cost of building an AgentTool versus reusing
+the prebuilt instances from sahayakai.tools.AGENT_TOOLS
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("USE_LOCAL_MODEL", "true")
+
+from google.adk.tools.agent_tool import AgentTool
+
+from sahayakai.tools import get_agent_tool
+from sahayakai.sub_agents.content_gen_agent import content_gen_agent
+from sahayakai.sub_agents.visual_aid_agent import visual_aid_agent
+
+
+def build_per_call():
+    """What every tool invocation used to do."""
+    for agent in (content_gen_agent, visual_aid_agent):
+        AgentTool(agent=agent)
+
+
+def reuse_registry():
+    for agent in (content_gen_agent, visual_aid_agent):
+        get_agent_tool(agent.name)
+
+
+def main():
+    number = int(os.getenv("BENCH_NUMBER", "2000"))
+    
+    print(f"Agent tool overhead ({number} calls, 2 agents per call)")
+    print("=" * 60)
+    
+    results = {}
+    for label, func in (("build per call", build_per_call), ("reuse registry", reuse_registry)):
+        best = min(timeit.repeat(func, number=number, repeat=5))
+        results[label] = best / number * 1e6
+        print(f"{label:<16} {results[label]:10.2f} us/call")
+    
+    saved = results["build per call"] - results["reuse registry"]
+    print("-" * 60)
+    print(f"{'saved':<16} {saved:10.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
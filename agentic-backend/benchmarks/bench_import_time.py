@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for the Sahayak AI modules
+Imports each target in a fresh interpreter with `python -X importtime` and
+reports the cumulative import time (best of --repeat runs) and its slowest
+direct imports. Results can be saved as a JSON baseline.
+
+    python benchmarks/bench_import_time.py --save benchmarks/baselines/import_time.json
+    python benchmarks/bench_import_time.py --compare benchmarks/baselines/import_time.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from typing import Dict
+
+from common import BACKEND_DIR
+
+# label -> (module, extra environment)
+TARGETS = {
+    "sahayakai.agent (local)": ("sahayakai.agent", {"USE_LOCAL_MODEL": "true"}),
+    "sahayakai.agent (cloud)": ("sahayakai.agent", {"USE_LOCAL_MODEL": "false", "GOOGLE_CLOUD_PROJECT": "demo"}),
+    "server": ("server", {"USE_LOCAL_MODEL": "true"}),
+    "local_dev_server": ("local_dev_server", {"USE_LOCAL_MODEL": "true"}),
+    "standalone_dev_server": ("standalone_dev_server", {"USE_LOCAL_MODEL": "true"}),
+}
+
+
+def import_time(module: str, env: Dict[str, str], workdir: str) -> dict:
+    """Import module once and parse the -X importtime report (microseconds)."""
+    env = dict(os.environ, **env,
+               CONVERSATION_DB_PATH=os.path.join(workdir, "conversations.db"),
+               RESPONSE_CACHE_PATH=os.path.join(workdir, "response_cache.db"),
+               JOB_DB_PATH=os.path.join(workdir, "jobs.db"),
+               IMAGE_CACHE_DIR=os.path.join(workdir, "image_cache"))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    total, packages = 0, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        depth = len(name) - len(name.lstrip())
+        name, cumulative = name.strip(), int(cumulative)
+        if depth == 3:
+            # Direct imports are listed before the module that made them
+            packages[name] = cumulative
+        elif depth == 1:
+            if name == module:
+                total = cumulative
+                break
+            packages = {}  # interpreter start-up imports
+    return {"total_us": total, "packages": packages}
+
+
+def benchmark(module: str, env: Dict[str, str], repeat: int, top: int) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        runs = [import_time(module, env, workdir) for _ in range(repeat)]
+    best = min(runs, key=lambda run: run["total_us"])
+    slowest = sorted(best["packages"].items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "ms": round(best["total_us"] / 1000, 1),
+        "runs_ms": [round(run["total_us"] / 1000, 1) for run in runs],
+        "slowest_ms": {name: round(us / 1000, 1) for name, us in slowest},
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Return descriptions of import-time regressions beyond threshold."""
+    regressions = []
+    for label, result in current["targets"].items():
+        base = baseline.get("targets", {}).get(label)
+        if base and result["ms"] > base["ms"] * (1 + threshold):
+            regressions.append(f"{label}: {base['ms']}ms -> {result['ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", default=",".join(TARGETS),
+                        help="comma-separated labels from: " + ", ".join(TARGETS))
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per target; the best is kept")
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list per target")
+    parser.add_argument("--save", help="write results to this JSON file (e.g. a baseline)")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed regression ratio")
+    args = parser.parse_args()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "config": {"repeat": args.repeat},
+        "targets": {},
+    }
+    for label in args.targets.split(","):
+        module, env = TARGETS[label]
+        result = report["targets"][label] = benchmark(module, env, args.repeat, args.top)
+        print(f"{label}: {result['ms']} ms (runs: {result['runs_ms']})")
+        for name, ms in result["slowest_ms"].items():
+            print(f"    {name:<40} {ms:10.1f} ms")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print("Regressions:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
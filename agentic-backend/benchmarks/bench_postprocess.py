@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: cleaning long model outputs with the previous multi-pass
+cleanup versus sahayakai.text_postprocess, one-shot and fed as a stream
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sahayakai.text_postprocess import OutputCleaner, clean_generated_text
+
+PROMPT = "<start_of_turn>user\nCreate a Grade 3 lesson on soil types<end_of_turn>\n<start_of_turn>model\n"
+
+
+def legacy_clean(prompt: str, generated_text: str) -> str:
+    """The cleanup TransformerLabClient used to run on every response."""
+    if not generated_text:
+        return "No response generated"
+    if generated_text.startswith(prompt):
+        generated_text = generated_text[len(prompt):].strip()
+    generated_text = generated_text.replace("<end_of_turn>", "")
+    generated_text = generated_text.replace("<start_of_turn>", "")
+    lines = generated_text.split('\n')
+    unique_lines = []
+    seen_lines = set()
+    for line in lines:
+        line = line.strip()
+        if (line and line not in seen_lines and len(line) > 5 and
+                not line.startswith('[User') and not line.startswith('User ') and
+                not line.startswith('[Assistant') and
+                not line == 'User:' and not line == 'Assistant:'):
+            unique_lines.append(line)
+            seen_lines.add(line)
+            if len(unique_lines) >= 3:
+                break
+    if unique_lines:
+        result = ' '.join(unique_lines)
+        sentences = result.split('. ')
+        if len(sentences) > 1 and not sentences[-1].endswith(('.', '!', '?')):
+            result = '. '.join(sentences[:-1]) + '.'
+        return result.strip()
+    paragraphs = generated_text.split('\n\n')
+    first_para = paragraphs[0].strip()
+    sentences = first_para.split('. ')
+    if len(sentences) > 1 and not sentences[-1].endswith(('.', '!', '?')):
+        first_para = '. '.join(sentences[:-1]) + '.'
+    return first_para
+
+
+def long_output(lines: int) -> str:
+    """A repetitive output of the kind small models produce near max_new_tokens."""
+    body = [
+        "Soil is the top layer of the earth where plants grow.",
+        "There are many types of soil such as sandy, clay and loamy soil.",
+        "Soil is the top layer of the earth where plants grow.",
+        "User: tell me more",
+        "<end_of_turn>",
+        "Loamy soil is best for growing wheat and vegetables in our village.",
+    ]
+    return PROMPT + "\n".join(body[i % len(body)] for i in range(lines)) + " and so"
+
+
+def stream_chunks(text: str, size: int = 4) -> list:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def main():
+    number = int(os.getenv("BENCH_NUMBER", "200"))
+
+    for lines in (50, 500, 5000):
+        text = long_output(lines)
+        assert legacy_clean(PROMPT, text) == clean_generated_text(PROMPT, text)
+        chunks = stream_chunks(text[len(PROMPT):])
+
+        def streamed():
+            cleaner = OutputCleaner()
+            for chunk in chunks:
+                if cleaner.feed(chunk):
+                    break
+            return cleaner
+
+        print(f"Output of {lines} lines ({len(text)} chars, {number} runs)")
+        print("=" * 60)
+        for label, func in (("legacy", lambda: legacy_clean(PROMPT, text)),
+                            ("one-shot", lambda: clean_generated_text(PROMPT, text)),
+                            ("streamed", streamed)):
+            best = min(timeit.repeat(func, number=number, repeat=5))
+            print(f"{label:<22} {best / number * 1e6:10.2f} us")
+
+        # Work left once the last chunk has arrived: legacy cleans everything then
+        cleaners = [streamed() for _ in range(number)]
+        start = timeit.default_timer()
+        for cleaner in cleaners:
+            cleaner.finish()
+        finish = (timeit.default_timer() - start) / number
+        print(f"{'streamed, at end':<22} {finish * 1e6:10.2f} us")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Shared helpers for the Sahayak AI benchmark scripts
+"""
+
+import os
+import sys
+import time
+import subprocess
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def start_process(script: str, env: Dict[str, str]) -> subprocess.Popen:
+    """Run a script from agentic-backend (or benchmarks/) in the background."""
+    return subprocess.Popen(
+        [sys.executable, script], cwd=BACKEND_DIR, env=dict(os.environ, **env),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def stop_process(process: subprocess.Popen):
+    """SIGTERM (graceful shutdown), then kill if it hangs."""
+    process.terminate()
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def wait_until_ready(url: str, timeout: float = 120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {url} did not become ready")
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+HTTP benchmark suite for the Sahayak AI servers
+Drives /health, /chat, /chat/stream and /agent on each server against the stub
+Transformer Lab worker and reports latency percentiles, time-to-first-byte
+and requests/sec. Results can be saved as a JSON baseline and compared later.
+
+    python benchmarks/http_bench.py --servers local_dev_server --save benchmarks/baselines/local.json
+    python benchmarks/http_bench.py --servers local_dev_server --compare benchmarks/baselines/local.json
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import platform
+import tempfile
+
+import httpx
+
+from common import percentile, start_process, stop_process, wait_until_ready
+
+
+def chat_message(i: int) -> dict:
+    return {"message": f"Create a Grade {i % 5 + 1} lesson on soil types ({uuid.uuid4().hex[:6]})"}
+
+
+def chat_messages(i: int) -> dict:
+    return {"messages": [{"role": "user", "content": chat_message(i)["message"]}], "max_tokens": 128}
+
+
+def agent_message(i: int) -> dict:
+    agents = ["content_gen_agent", "story_agent", "worksheet_agent", "visual_aid_agent", "sahayak_agent"]
+    return {"message": chat_message(i)["message"], "agent_name": agents[i % len(agents)]}
+
+
+# Server script -> endpoints to drive as (method, path, payload factory)
+SERVERS = {
+    "server": [
+        ("GET", "/health", None),
+        ("POST", "/chat", chat_message),
+        ("POST", "/chat/stream", chat_message),
+    ],
+    "demo_server": [
+        ("GET", "/health", None),
+        ("POST", "/chat", chat_message),
+        ("POST", "/chat/stream", chat_message),
+    ],
+    "local_dev_server": [
+        ("GET", "/health", None),
+        ("POST", "/chat", chat_messages),
+        ("POST", "/agent", agent_message),
+    ],
+    "standalone_dev_server": [
+        ("GET", "/health", None),
+        ("POST", "/chat", chat_messages),
+        ("POST", "/agent", agent_message),
+    ],
+}
+
+
+async def run_endpoint(base_url: str, method: str, path: str, payload_factory, requests: int, concurrency: int) -> dict:
+    """Issue `requests` calls with at most `concurrency` in flight."""
+    latencies, ttfbs, errors = [], [], 0
+    counter = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                payload = payload_factory(i) if payload_factory else None
+                start = time.perf_counter()
+                first_byte = None
+                try:
+                    async with client.stream(method, path, json=payload) as response:
+                        async for _ in response.aiter_raw():
+                            if first_byte is None:
+                                first_byte = time.perf_counter()
+                        if response.status_code >= 400:
+                            errors += 1
+                            continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                end = time.perf_counter()
+                latencies.append((end - start) * 1000)
+                ttfbs.append(((first_byte or end) - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    def summary(values):
+        return {f"p{p}": round(percentile(values, p), 2) if values else None for p in (50, 95, 99)}
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": summary(latencies),
+        "ttfb_ms": summary(ttfbs),
+    }
+
+
+def benchmark_server(name: str, args) -> dict:
+    port = args.port
+    db_dir = tempfile.mkdtemp(prefix="sahayak-bench-")
+    server = start_process(f"{name}.py", {
+        "USE_LOCAL_MODEL": "true",
+        "LOCAL_MODEL_URL": f"http://127.0.0.1:{args.stub_port}",
+        "RESPONSE_CACHE_ENABLED": "true" if args.cache else "false",
+        "RESPONSE_CACHE_PATH": os.path.join(db_dir, "cache.db"),
+        "CONVERSATION_DB_PATH": os.path.join(db_dir, "conversations.db"),
+        "JOB_DB_PATH": os.path.join(db_dir, "jobs.db"),
+        "IMAGE_CACHE_DIR": os.path.join(db_dir, "image_cache"),
+        "SERVER_MODE": "production",
+        "SERVER_WORKERS": str(args.workers),
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+    })
+    base_url = f"http://127.0.0.1:{port}"
+    results = {}
+    try:
+        wait_until_ready(f"{base_url}/health")
+        for method, path, payload_factory in SERVERS[name]:
+            # Short warm-up so connection setup and imports are not measured
+            asyncio.run(run_endpoint(base_url, method, path, payload_factory, args.concurrency, args.concurrency))
+            result = asyncio.run(run_endpoint(base_url, method, path, payload_factory, args.requests, args.concurrency))
+            results[f"{method} {path}"] = result
+            print(f"{name:<22} {method:<4} {path:<13} "
+                  f"{result['rps']:>8.1f} req/s  "
+                  f"p50 {result['latency_ms']['p50']}ms  p95 {result['latency_ms']['p95']}ms  "
+                  f"p99 {result['latency_ms']['p99']}ms  ttfb p50 {result['ttfb_ms']['p50']}ms  "
+                  f"errors {result['errors']}")
+    finally:
+        stop_process(server)
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Return descriptions of p95 latency or throughput regressions beyond threshold."""
+    regressions = []
+    for server, endpoints in current["servers"].items():
+        for endpoint, result in endpoints.items():
+            base = baseline.get("servers", {}).get(server, {}).get(endpoint)
+            if not base:
+                continue
+            base_p95, p95 = base["latency_ms"]["p95"], result["latency_ms"]["p95"]
+            if base_p95 and p95 and p95 > base_p95 * (1 + threshold):
+                regressions.append(f"{server} {endpoint}: p95 {base_p95}ms -> {p95}ms")
+            if base["rps"] and result["rps"] < base["rps"] * (1 - threshold):
+                regressions.append(f"{server} {endpoint}: {base['rps']} -> {result['rps']} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servers", default="local_dev_server,standalone_dev_server,demo_server,server",
+                        help="comma-separated server scripts to benchmark")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=1, help="server worker processes")
+    parser.add_argument("--cache", action="store_true", help="leave the response cache enabled")
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0)
+    parser.add_argument("--stub-tokens-per-sec", type=float, default=0.0)
+    parser.add_argument("--stub-max-concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--stub-port", type=int, default=21099)
+    parser.add_argument("--save", help="write results to this JSON file (e.g. a baseline)")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed regression ratio")
+    args = parser.parse_args()
+
+    stub = start_process("benchmarks/stub_worker.py", {
+        "PORT": str(args.stub_port), "STUB_LATENCY_MS": str(args.stub_latency_ms),
+        "STUB_TOKENS_PER_SEC": str(args.stub_tokens_per_sec),
+        "STUB_MAX_CONCURRENCY": str(args.stub_max_concurrency),
+    })
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "config": {k: getattr(args, k) for k in ("requests", "concurrency", "workers", "cache", "stub_latency_ms",
+                                                "stub_tokens_per_sec", "stub_max_concurrency")},
+        "servers": {},
+    }
+    try:
+        wait_until_ready(f"http://127.0.0.1:{args.stub_port}/docs")
+        for name in args.servers.split(","):
+            report["servers"][name] = benchmark_server(name, args)
+    finally:
+        stop_process(stub)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print("Regressions:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
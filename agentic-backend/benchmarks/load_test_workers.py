@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Load test: request throughput of a server launched in production mode with
+1, 2, 4, ... worker processes, to check that throughput scales with cores
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import multiprocessing
+
+import httpx
+
+from common import start_process, stop_process, wait_until_ready
+
+
+async def drive(url: str, concurrency: int, duration: float) -> int:
+    """Send requests from `concurrency` loops for `duration` seconds; return the number completed."""
+    completed = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        async def loop():
+            nonlocal completed
+            while time.perf_counter() < deadline:
+                response = await client.get(url)
+                if response.status_code == 200:
+                    completed += 1
+
+        await asyncio.gather(*[loop() for _ in range(concurrency)])
+    return completed
+
+
+def client_process(url: str, concurrency: int, duration: float, results):
+    results.put(asyncio.run(drive(url, concurrency, duration)))
+
+
+def measure(url: str, clients: int, concurrency: int, duration: float) -> float:
+    """Requests/sec using several client processes so the load generator is not the bottleneck."""
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=client_process, args=(url, concurrency, duration, results))
+        for _ in range(clients)
+    ]
+    for process in processes:
+        process.start()
+    total = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return total / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--server", default="demo_server.py", help="server script in agentic-backend")
+    parser.add_argument("--path", default="/health", help="endpoint to load")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=max(2, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent requests per client process")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}{args.path}"
+    results = []
+
+    print(f"Worker scaling: {args.server} {args.path} ({os.cpu_count()} CPU cores)")
+    print("=" * 60)
+
+    for workers in [int(w) for w in args.workers.split(",")]:
+        server = start_process(args.server, {
+            "SERVER_MODE": "production", "SERVER_WORKERS": str(workers),
+            "HOST": "127.0.0.1", "PORT": str(args.port),
+        })
+        try:
+            wait_until_ready(url)
+            measure(url, args.clients, args.concurrency, 2.0)  # warm-up
+            rps = measure(url, args.clients, args.concurrency, args.duration)
+        finally:
+            # SIGTERM exercises uvicorn's graceful shutdown
+            stop_process(server)
+
+        baseline = results[0]["rps"] / results[0]["workers"] if results else rps / workers
+        efficiency = rps / (baseline * workers)
+        results.append({"workers": workers, "rps": round(rps, 1), "scaling_efficiency": round(efficiency, 2)})
+        print(f"{workers:>3} workers  {rps:10.1f} req/s  scaling efficiency {efficiency:5.0%}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"server": args.server, "path": args.path, "cpu_count": os.cpu_count(),
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Stub Transformer Lab worker for offline performance testing
+Implements the worker API used by TransformerLabClient (worker_generate,
+worker_generate_stream, worker_get_conv_template) plus the optional batch
+route, with configurable latency, token rate, concurrency and failures, so
+benchmarks and CI can measure Sahayak's own overhead in isolation.
+
+    python benchmarks/stub_worker.py --latency-ms 200 --tokens-per-sec 20 --failure-rate 0.05
+
+Every option can also be set through the matching STUB_* environment variable.
+"""
+
+import os
+import json
+import random
+import asyncio
+import argparse
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+RESPONSE_TEXT = (
+    "Soil is the top layer of the earth where plants grow.\n"
+    "There are many types of soil such as sandy soil, clay soil and loamy soil.\n"
+    "Farmers in our village use loamy soil to grow wheat and vegetables.\n"
+    "Sandy soil does not hold water, so it is dry and loose.\n"
+    "Clay soil holds a lot of water and becomes sticky when wet.\n"
+)
+
+CONV_TEMPLATE = {
+    "conv": {
+        "name": "gemma",
+        "system_template": "{system_message}",
+        "system_message": "",
+        "roles": ["<start_of_turn>user\n", "<start_of_turn>model\n"],
+        "messages": [],
+        "offset": 0,
+        "sep_style": 12,
+        "sep": "<end_of_turn>\n",
+        "sep2": None,
+        "stop_str": "<end_of_turn>",
+        "stop_token_ids": None,
+    }
+}
+
+
+def env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+class StubSettings:
+    """Behaviour knobs, shared by all routes"""
+
+    def __init__(self):
+        self.latency_ms = env_float("STUB_LATENCY_MS", 50)
+        self.jitter_ms = env_float("STUB_JITTER_MS", 0)
+        self.tokens_per_sec = env_float("STUB_TOKENS_PER_SEC", 0)  # 0 = all tokens at once
+        self.max_concurrency = int(env_float("STUB_MAX_CONCURRENCY", 5))
+        self.failure_rate = env_float("STUB_FAILURE_RATE", 0)
+        self.failure_mode = os.getenv("STUB_FAILURE_MODE", "http")  # http | error_code | hang
+        self.response_text = RESPONSE_TEXT
+        if os.getenv("STUB_RESPONSE_FILE"):
+            with open(os.getenv("STUB_RESPONSE_FILE")) as f:
+                self.response_text = f.read()
+
+
+settings = StubSettings()
+stats = {"generate": 0, "generate_stream": 0, "generate_batch": 0, "prompts": 0,
+         "conv_template": 0, "failures": 0, "in_flight": 0, "max_in_flight": 0}
+slots = None  # created on startup so it binds to the server's event loop
+
+app = FastAPI(title="Stub Transformer Lab Worker")
+
+
+@app.on_event("startup")
+async def create_slots():
+    global slots
+    slots = asyncio.Semaphore(settings.max_concurrency)
+
+
+def output_tokens(max_new_tokens: int) -> list:
+    """Split the canned response into word-level "tokens", capped at max_new_tokens."""
+    tokens = [word + " " for word in settings.response_text.split(" ")]
+    return tokens[:max_new_tokens] if max_new_tokens else tokens
+
+
+async def prefill_delay():
+    delay = settings.latency_ms + random.uniform(0, settings.jitter_ms)
+    await asyncio.sleep(delay / 1000.0)
+
+
+async def decode_delay(tokens: int):
+    if settings.tokens_per_sec > 0:
+        await asyncio.sleep(tokens / settings.tokens_per_sec)
+
+
+def should_fail() -> bool:
+    if settings.failure_rate > 0 and random.random() < settings.failure_rate:
+        stats["failures"] += 1
+        return True
+    return False
+
+
+async def failure_response():
+    if settings.failure_mode == "hang":
+        # Simulates an overloaded worker that never answers
+        await asyncio.sleep(3600)
+    if settings.failure_mode == "error_code":
+        return {"text": "**NETWORK ERROR DUE TO HIGH TRAFFIC. PLEASE REGENERATE OR REFRESH THIS PAGE.**",
+                "error_code": 50001}
+    return JSONResponse(status_code=500, content={"detail": "Injected stub failure"})
+
+
+class InFlight:
+    """Holds a model slot like a real worker's limit_worker_concurrency"""
+
+    async def __aenter__(self):
+        await slots.acquire()
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+
+    async def __aexit__(self, *exc):
+        stats["in_flight"] -= 1
+        slots.release()
+
+
+@app.post("/worker_generate")
+async def worker_generate(request: Request):
+    data = await request.json()
+    stats["generate"] += 1
+    stats["prompts"] += 1
+    if should_fail():
+        return await failure_response()
+
+    async with InFlight():
+        tokens = output_tokens(data.get("max_new_tokens", 256))
+        await prefill_delay()
+        await decode_delay(len(tokens))
+
+    prefix = data.get("prompt", "") if data.get("echo", True) else ""
+    return {"text": prefix + "".join(tokens), "error_code": 0}
+
+
+@app.post("/worker_generate_stream")
+async def worker_generate_stream(request: Request):
+    data = await request.json()
+    stats["generate_stream"] += 1
+    stats["prompts"] += 1
+    if should_fail():
+        return await failure_response()
+
+    async def snapshots():
+        async with InFlight():
+            tokens = output_tokens(data.get("max_new_tokens", 256))
+            text = data.get("prompt", "") if data.get("echo", True) else ""
+            await prefill_delay()
+            for token in tokens:
+                await decode_delay(1)
+                text += token
+                yield json.dumps({"text": text, "error_code": 0}).encode() + b"\0"
+
+    return StreamingResponse(snapshots())
+
+
+@app.post("/worker_generate_batch")
+async def worker_generate_batch(request: Request):
+    data = await request.json()
+    prompts = data.get("prompts", [])
+    stats["generate_batch"] += 1
+    stats["prompts"] += len(prompts)
+    if should_fail():
+        return await failure_response()
+
+    # A batched forward pass costs one prefill and the longest decode
+    async with InFlight():
+        tokens = output_tokens(data.get("max_new_tokens", 256))
+        await prefill_delay()
+        await decode_delay(len(tokens))
+
+    echo = data.get("echo", True)
+    return {"texts": [(prompt if echo else "") + "".join(tokens) for prompt in prompts], "error_code": 0}
+
+
+@app.post("/worker_get_conv_template")
+async def worker_get_conv_template():
+    stats["conv_template"] += 1
+    return CONV_TEMPLATE
+
+
+@app.get("/stub/stats")
+async def get_stats():
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "21002")))
+    parser.add_argument("--latency-ms", type=float, default=settings.latency_ms, help="prefill delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=settings.jitter_ms, help="random extra prefill delay")
+    parser.add_argument("--tokens-per-sec", type=float, default=settings.tokens_per_sec, help="decode rate; 0 = instant")
+    parser.add_argument("--max-concurrency", type=int, default=settings.max_concurrency, help="model slots")
+    parser.add_argument("--failure-rate", type=float, default=settings.failure_rate, help="probability a call fails")
+    parser.add_argument("--failure-mode", choices=["http", "error_code", "hang"], default=settings.failure_mode)
+    args = parser.parse_args()
+
+    settings.latency_ms = args.latency_ms
+    settings.jitter_ms = args.jitter_ms
+    settings.tokens_per_sec = args.tokens_per_sec
+    settings.max_concurrency = args.max_concurrency
+    settings.failure_rate = args.failure_rate
+    settings.failure_mode = args.failure_mode
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
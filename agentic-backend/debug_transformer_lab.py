@@ -3,13 +3,15 @@
 Debug script to test Transformer Lab responses
 """
 
+import os
 import requests
 import json
 
 def test_transformer_lab_direct():
     """Test Transformer Lab API directly with various prompts"""
     
-    url = "http://localhost:21002/worker_generate"
+    # Point LOCAL_MODEL_URL at benchmarks/stub_worker.py to run without Transformer Lab
+    url = f"{os.getenv('LOCAL_MODEL_URL', 'http://localhost:21002').rstrip('/')}/worker_generate"
     
     test_prompts = [
         "Hello, how are you?",
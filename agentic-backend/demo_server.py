@@ -7,12 +7,11 @@ This version works without Google ADK dependencies for demo purposes.
 import os
 import asyncio
 from typing import Any, Dict, Optional, AsyncGenerator
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
-import uvicorn
 import json
 import random
 import time
@@ -22,6 +21,8 @@ load_dotenv()
 
 # Import config for local model settings
 from sahayakai import config
+from sahayakai.conversation_store import ConversationStore
+from sahayakai.serving import run_server
 
 app = FastAPI(
     title="Sahayak AI Agent Server (Demo)",
@@ -54,8 +55,13 @@ class HealthResponse(BaseModel):
     agent_name: str
     model: str
 
-# Global conversation storage (in production, use a proper database)
-conversations: Dict[str, list] = {}
+# Conversation history persisted in SQLite so it survives restarts and is shared by workers
+conversation_store = ConversationStore()
+
+@app.on_event("shutdown")
+async def close_conversation_store():
+    """Close the conversation database"""
+    conversation_store.close()
 
 # Mock agent configuration - use local model if configured
 model_name = config.LOCAL_MODEL_NAME if config.USE_LOCAL_MODEL else "gemini-2.0-flash-exp"
@@ -320,26 +326,16 @@ async def chat_with_agent(request: ChatRequest):
     """
     try:
         # Generate conversation ID if not provided
-        conversation_id = request.conversation_id or f"conv_{len(conversations)}"
-        
-        # Initialize conversation if new
-        if conversation_id not in conversations:
-            conversations[conversation_id] = []
-        
-        # Add user message to conversation
-        conversations[conversation_id].append({
-            "role": "user",
-            "content": request.message
-        })
+        conversation_id = request.conversation_id or conversation_store.new_conversation_id()
         
         # Invoke the agent
         agent_response = await invoke_agent(request.message, conversation_id)
         
-        # Add agent response to conversation
-        conversations[conversation_id].append({
-            "role": "assistant", 
-            "content": agent_response
-        })
+        # Store the user message and agent response in one write
+        await conversation_store.append_messages_async(conversation_id, [
+            {"role": "user", "content": request.message},
+            {"role": "assistant", "content": agent_response}
+        ])
         
         return ChatResponse(
             response=agent_response,
@@ -353,16 +349,16 @@ async def chat_with_agent(request: ChatRequest):
 async def stream_agent_response(message: str, conversation_id: str) -> AsyncGenerator[str, None]:
     """Stream agent response for real-time interaction."""
     try:
-        # Get the full response
         full_response = await invoke_agent(message, conversation_id)
         
-        # Stream it word by word for demonstration
-        words = full_response.split()
-        for i, word in enumerate(words):
-            chunk = word + " "
-            yield f"data: {json.dumps({'chunk': chunk, 'conversation_id': conversation_id})}\n\n"
-            await asyncio.sleep(0.05)  # Small delay for streaming effect
+        # Send each line as soon as it is available instead of pacing word by word
+        for line in full_response.splitlines(keepends=True):
+            yield f"data: {json.dumps({'chunk': line, 'conversation_id': conversation_id})}\n\n"
         
+        await conversation_store.append_messages_async(conversation_id, [
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": full_response}
+        ])
         yield f"data: {json.dumps({'done': True, 'conversation_id': conversation_id})}\n\n"
         
     except Exception as e:
@@ -371,15 +367,7 @@ async def stream_agent_response(message: str, conversation_id: str) -> AsyncGene
 @app.post("/chat/stream")
 async def chat_stream(request: ChatRequest):
     """Stream chat responses from the agent."""
-    conversation_id = request.conversation_id or f"conv_{len(conversations)}"
-    
-    if conversation_id not in conversations:
-        conversations[conversation_id] = []
-    
-    conversations[conversation_id].append({
-        "role": "user",
-        "content": request.message
-    })
+    conversation_id = request.conversation_id or conversation_store.new_conversation_id()
     
     return StreamingResponse(
         stream_agent_response(request.message, conversation_id),
@@ -393,29 +381,31 @@ async def chat_stream(request: ChatRequest):
 @app.get("/conversations/{conversation_id}")
 async def get_conversation(conversation_id: str):
     """Get conversation history"""
-    if conversation_id not in conversations:
+    if not await conversation_store.exists_async(conversation_id):
         raise HTTPException(status_code=404, detail="Conversation not found")
     
     return {
         "conversation_id": conversation_id,
-        "messages": conversations[conversation_id]
+        "messages": await conversation_store.get_messages_async(conversation_id)
     }
 
 @app.get("/conversations")
-async def list_conversations():
-    """List all conversation IDs"""
+async def list_conversations(limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0)):
+    """List conversation IDs, most recently active first"""
+    conversation_ids, total = await conversation_store.list_conversations_async(limit=limit, offset=offset)
     return {
-        "conversations": list(conversations.keys()),
-        "count": len(conversations)
+        "conversations": conversation_ids,
+        "count": total,
+        "limit": limit,
+        "offset": offset
     }
 
 @app.delete("/conversations/{conversation_id}")
 async def delete_conversation(conversation_id: str):
     """Delete a conversation"""
-    if conversation_id not in conversations:
+    if not await conversation_store.delete_conversation_async(conversation_id):
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    del conversations[conversation_id]
     return {"message": f"Conversation {conversation_id} deleted"}
 
 @app.get("/agent-info")
@@ -487,10 +477,4 @@ if __name__ == "__main__":
     print("💡 This is a demo version - try asking for lesson plans, worksheets, or visual aids")
     print("")
     
-    uvicorn.run(
-        "demo_server:app",
-        host=host,
-        port=port,
-        reload=True,
-        log_level="info"
-    )
+    run_server("demo_server:app", default_port=8000, reload=True)
@@ -6,15 +6,22 @@ This server allows testing the agents locally with Transformer Lab
 
 import asyncio
 import json
-from typing import Dict, Any
-from fastapi import FastAPI, HTTPException
+from typing import Dict, Any, List, Optional, AsyncGenerator
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
-import uvicorn
 
 from sahayakai.local_model_client import TransformerLabClient
 from sahayakai import config
+from sahayakai.response_cache import response_cache
+from sahayakai.serving import run_server
+from sahayakai.streaming import ClosingStreamingResponse
+from sahayakai.prompt_templates import agent_prompts
+from sahayakai.admission import (
+    AdmissionController, AdmissionRejected, rejection_response, request_tenant, request_priority
+)
+from sahayakai.fair_queue import BATCH
 
 # Load environment variables
 load_dotenv()
@@ -40,6 +47,19 @@ if config.USE_LOCAL_MODEL:
 else:
     local_client = None
 
+# Bounds generations in progress; excess requests get 429 with Retry-After
+admission = AdmissionController("Local model")
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request, error: AdmissionRejected):
+    return rejection_response(error)
+
+@app.on_event("shutdown")
+async def close_local_client():
+    """Release pooled connections to Transformer Lab"""
+    if local_client:
+        await local_client.aclose()
+
 class ChatMessage(BaseModel):
     role: str
     content: str
@@ -48,11 +68,33 @@ class ChatRequest(BaseModel):
     messages: list[ChatMessage]
     max_tokens: int = 256
     temperature: float = 0.7
+    # Fair scheduling: tenant (as sent by the Streamlit client) and "interactive" or "batch"
+    userId: Optional[str] = None
+    priority: str = "interactive"
 
 class AgentRequest(BaseModel):
     message: str
     agent_name: str = "sahayak_agent"
     context: Dict[str, Any] = {}
+    # Fair scheduling: tenant (as sent by the Streamlit client) and "interactive" or "batch"
+    userId: Optional[str] = None
+    priority: str = "interactive"
+
+class AgentBatchItem(BaseModel):
+    message: str
+    agent_name: Optional[str] = None  # defaults to the batch's agent_name
+
+class AgentBatchRequest(BaseModel):
+    items: List[AgentBatchItem]
+    agent_name: str = "sahayak_agent"
+    max_tokens: int = 512
+    temperature: float = 0.7
+    userId: Optional[str] = None
+    priority: str = BATCH
+
+def sse_event(payload: Dict[str, Any]) -> str:
+    """Format a payload as a server-sent event."""
+    return f"data: {json.dumps(payload)}\n\n"
 
 @app.get("/health")
 async def health_check():
@@ -60,22 +102,29 @@ async def health_check():
     return {
         "status": "healthy",
         "model": config.LOCAL_MODEL_NAME if config.USE_LOCAL_MODEL else "cloud",
-        "server": "local" if config.USE_LOCAL_MODEL else "cloud"
+        "server": "local" if config.USE_LOCAL_MODEL else "cloud",
+        "cache": response_cache.stats() if response_cache else None,
+        "client": local_client.metrics() if local_client else None,
+        "admission": admission.metrics()
     }
 
 @app.post("/chat")
-async def chat_completion(request: ChatRequest):
+async def chat_completion(request: ChatRequest, http_request: Request):
     """OpenAI-compatible chat completion endpoint"""
     if not local_client:
         raise HTTPException(status_code=400, detail="Local model not configured")
     
+    tenant = request_tenant(http_request, request.userId)
+    priority = request_priority(http_request, request.priority)
     try:
-        # Convert messages to a prompt
+        # Convert messages to a prompt; requests joining an identical
+        # generation in flight take no admission slot
         messages = [msg.dict() for msg in request.messages]
-        response = local_client.chat_completion(
+        response = await local_client.chat_completion_async(
             messages=messages,
             max_tokens=request.max_tokens,
-            temperature=request.temperature
+            temperature=request.temperature,
+            admit=lambda: admission.admit(tenant, priority)
         )
         
         return {
@@ -90,88 +139,32 @@ async def chat_completion(request: ChatRequest):
                 }
             }]
         }
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 @app.post("/agent")
-async def run_agent(request: AgentRequest):
+async def run_agent(request: AgentRequest, http_request: Request):
     """Run a specific agent with local model"""
     if not local_client:
         raise HTTPException(status_code=400, detail="Local model not configured")
     
+    tenant = request_tenant(http_request, request.userId)
+    priority = request_priority(http_request, request.priority)
     try:
-        # Route to different agents based on agent_name
-        if request.agent_name == "content_gen_agent":
-            prompt = f"""Task: Create educational content for rural Indian school children.
-
-Request: {request.message}
-
-Requirements:
-- Appropriate for multi-grade classrooms
-- Simple, clear language
-- Culturally relevant to rural India
-- Practical for teachers with limited resources
-
-Content:"""
-        
-        elif request.agent_name == "story_agent":
-            prompt = f"""Task: Write a short educational story for children.
-
-Topic: {request.message}
-
-Requirements:
-- Age-appropriate for young students
-- Set in rural Indian context
-- Include a learning element
-- Complete story with beginning, middle, and end
-
-Story:"""
+        # Agent prompts are parsed once; unknown agents get the Sahayak prompt
+        template = agent_prompts.get(request.agent_name)
+        prompt = template.render(message=request.message)
         
-        elif request.agent_name == "worksheet_agent":
-            prompt = f"""Task: Create a practice worksheet for students.
-
-Subject: {request.message}
-
-Format:
-- Clear title
-- Simple instructions
-- 3-5 practice problems
-- Answer spaces
-
-Worksheet:
-
-Title: _______________
-
-Instructions: _______________
-
-Problems:
-1."""
-        
-        elif request.agent_name == "visual_aid_agent":
-            prompt = f"""Task: Create step-by-step drawing instructions for teachers.
-
-Topic: {request.message}
-
-Provide detailed instructions for blackboard/whiteboard drawing:
-- Materials needed
-- Step-by-step drawing process
-- Labels and annotations to add
-
-Instructions:"""
-        
-        else:  # root_agent
-            prompt = f"""You are Sahayak AI, helping rural Indian teachers.
-
-Teacher's request: {request.message}
-
-Provide practical educational advice that works in multi-grade classrooms with limited resources.
-
-Advice:"""
-        
-        response = local_client.generate_text(
+        response = await local_client.generate_text_async(
             prompt=prompt,
             max_tokens=512,
-            temperature=0.7
+            temperature=0.7,
+            cache_message=request.message,
+            agent_name=request.agent_name,
+            cache_prefix=template.static_prefix,
+            admit=lambda: admission.admit(tenant, priority)
         )
         
         return {
@@ -182,9 +175,86 @@ Advice:"""
             "status": "success"
         }
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Agent error: {str(e)}")
 
+@app.post("/agent/batch")
+async def run_agent_batch(request: AgentBatchRequest, http_request: Request):
+    """
+    Run several agent requests (e.g. one worksheet per grade) in one call.
+    Results stream back as server-sent events in completion order, each
+    tagged with its index in the request.
+    """
+    if not local_client:
+        raise HTTPException(status_code=400, detail="Local model not configured")
+    if not request.items:
+        raise HTTPException(status_code=400, detail="Batch has no items")
+    if len(request.items) > config.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch has more than {config.BATCH_MAX_ITEMS} items")
+    
+    # Closes the batch (cancelling its items) however the response ends
+    return ClosingStreamingResponse(
+        stream_agent_batch(
+            request, request_tenant(http_request, request.userId), request_priority(http_request, request.priority)
+        ),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+async def stream_agent_batch(request: AgentBatchRequest, tenant: str, priority: str) -> AsyncGenerator[str, None]:
+    """
+    Generate every item of a batch and yield each result as it completes.
+    Items run at most the tenant's admission cap at a time, each admitted
+    like a single request (waiting out 429s instead of failing the batch).
+    Items are started grouped by agent, so requests sharing an agent's
+    instruction prefix reach the worker together while it is cached.
+    """
+    agent_names = [item.agent_name or request.agent_name for item in request.items]
+    limit = asyncio.Semaphore(min(len(request.items), admission.tenant_max_in_flight))
+    
+    async def run_item(index: int) -> Dict[str, Any]:
+        item, agent_name = request.items[index], agent_names[index]
+        template = agent_prompts.get(agent_name)
+        try:
+            async with limit:
+                response = await local_client.generate_text_async(
+                    prompt=template.render(message=item.message),
+                    max_tokens=request.max_tokens,
+                    temperature=request.temperature,
+                    cache_message=item.message,
+                    agent_name=agent_name,
+                    cache_prefix=template.static_prefix,
+                    admit=lambda: admission.admit(tenant, priority, retry=True)
+                )
+        except Exception as e:
+            response = f"Error: {str(e)}"
+        return {
+            "index": index,
+            "agent": agent_name,
+            "message": item.message,
+            "response": response,
+            "status": "error" if response.startswith("Error:") else "success"
+        }
+    
+    order = sorted(range(len(request.items)), key=lambda index: agent_names[index])
+    tasks = [asyncio.create_task(run_item(index)) for index in order]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            yield sse_event(await completed)
+        yield sse_event({"done": True, "count": len(tasks)})
+    finally:
+        # Client went away: stop the remaining items and wait for them to
+        # release their admission slots
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
 @app.get("/agents")
 async def list_agents():
     """List available agents"""
@@ -215,7 +285,8 @@ async def list_agents():
                 "description": "Visual aid instruction generator",
                 "model": config.LOCAL_MODEL_NAME if config.USE_LOCAL_MODEL else "cloud"
             }
-        ]
+        ],
+        "token_budgets": local_client.context_window.budgets() if local_client else None
     }
 
 if __name__ == "__main__":
@@ -225,4 +296,4 @@ if __name__ == "__main__":
     print(f"📚 Server will run at: http://localhost:8000")
     print(f"📖 API Docs: http://localhost:8000/docs")
     
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    run_server("local_dev_server:app", default_port=8000)
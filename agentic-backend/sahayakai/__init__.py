@@ -1 +1,9 @@
-from . import agent
\ No newline at end of file
+import importlib
+
+
+def __getattr__(name):
+    # ADK loads `sahayakai.agent` on first access, so ADK-free tools and the
+    # standalone server can import leaf modules without pulling it in
+    if name == "agent":
+        return importlib.import_module(f"{__name__}.agent")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
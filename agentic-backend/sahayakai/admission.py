@@ -0,0 +1,211 @@
+"""
+Admission Control for Sahayak AI
+Bounds the requests a server sends into its model backend: a fixed number
+run at once (and per tenant), a short fair-queued line waits briefly for a
+slot, and everything beyond that is turned away immediately with a
+Retry-After estimate
+"""
+
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+from . import config
+from .fair_queue import FairQueue, QueuedRequest, INTERACTIVE, PRIORITY_CLASSES
+
+# Smoothing for the service-time average behind Retry-After
+SERVICE_TIME_ALPHA = 0.2
+MAX_RETRY_AFTER = 60
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; servers answer 429"""
+
+    def __init__(self, name: str, reason: str, retry_after: int):
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"{name} is busy ({reason}); retry in {retry_after}s")
+
+
+class Ticket:
+    """An admitted request; hand it back to release()"""
+    __slots__ = ("tenant", "admitted_at")
+
+    def __init__(self, tenant: str):
+        self.tenant = tenant
+        self.admitted_at = time.monotonic()
+
+
+class AdmissionController:
+    """
+    Up to max_in_flight requests run, at most tenant_max_in_flight of them per
+    tenant. Up to max_queue more (tenant_max_queue per tenant) wait at most
+    queue_timeout seconds for a slot, ordered by a FairQueue: interactive
+    before batch, and tenants in proportion to their weights. A finishing
+    request hands its slot straight to the next eligible waiter. Retry-After
+    is the time the current queue needs to drain at the observed service rate
+    (max_in_flight / average service time).
+    """
+
+    def __init__(self,
+                 name: str = "backend",
+                 max_in_flight: int = None,
+                 max_queue: int = None,
+                 queue_timeout: float = None,
+                 tenant_max_in_flight: int = None,
+                 tenant_max_queue: int = None,
+                 tenant_weights: Dict[str, float] = None):
+        self.name = name
+        self.max_in_flight = max_in_flight or config.ADMISSION_MAX_IN_FLIGHT
+        self.max_queue = max_queue if max_queue is not None else config.ADMISSION_MAX_QUEUE
+        self.queue_timeout = queue_timeout if queue_timeout is not None else config.ADMISSION_QUEUE_TIMEOUT
+        self.tenant_max_in_flight = tenant_max_in_flight or config.ADMISSION_TENANT_MAX_IN_FLIGHT
+        self.tenant_max_queue = (tenant_max_queue if tenant_max_queue is not None
+                                 else config.ADMISSION_TENANT_MAX_QUEUE)
+
+        self.in_flight = 0
+        self._tenant_in_flight: Dict[str, int] = {}
+        self._queue = FairQueue(config.ADMISSION_TENANT_WEIGHTS if tenant_weights is None else tenant_weights)
+        self._service_time = 0.0
+        self._stats = {
+            "admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_tenant_queue_full": 0,
+            "rejected_queue_timeout": 0, "peak_queue_depth": 0,
+        }
+
+    def retry_after(self) -> int:
+        """Seconds until a new request would likely be admitted."""
+        if not self._service_time:
+            return 1
+        drain = self._service_time * (len(self._queue) + 1) / self.max_in_flight
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(drain)))
+
+    def _reject(self, reason: str):
+        self._stats[f"rejected_{reason}"] += 1
+        raise AdmissionRejected(self.name, reason, self.retry_after())
+
+    def _can_run(self, tenant: str) -> bool:
+        return self._tenant_in_flight.get(tenant, 0) < self.tenant_max_in_flight
+
+    def _grant(self, tenant: str) -> Ticket:
+        self.in_flight += 1
+        self._tenant_in_flight[tenant] = self._tenant_in_flight.get(tenant, 0) + 1
+        self._stats["admitted"] += 1
+        return Ticket(tenant)
+
+    async def acquire(self, tenant: str = "default", priority: str = INTERACTIVE) -> Ticket:
+        """Wait for a slot; returns the ticket to pass to release()."""
+        if priority not in PRIORITY_CLASSES:
+            priority = INTERACTIVE
+        # Waiters only exist while every slot they could use is taken, so a
+        # free slot can go straight to this request
+        if self.in_flight < self.max_in_flight and self._can_run(tenant):
+            return self._grant(tenant)
+        if len(self._queue) >= self.max_queue:
+            self._reject("queue_full")
+        if self._queue.depth(tenant) >= self.tenant_max_queue:
+            self._reject("tenant_queue_full")
+
+        waiter = self._queue.push(tenant, priority, asyncio.get_running_loop().create_future())
+        self._stats["queued"] += 1
+        self._stats["peak_queue_depth"] = max(self._stats["peak_queue_depth"], len(self._queue))
+        try:
+            await asyncio.wait({waiter.future}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if not waiter.future.done():
+            self._abandon(waiter)
+            self._reject("queue_timeout")
+        return waiter.future.result()
+
+    def _abandon(self, waiter: QueuedRequest):
+        if waiter.future.done():
+            # The slot was handed over just as the waiter gave up
+            self._release_slot(waiter.future.result())
+        else:
+            waiter.future.cancel()
+            self._queue.remove(waiter)
+
+    def release(self, ticket: Ticket):
+        """Free a slot taken by acquire()."""
+        elapsed = time.monotonic() - ticket.admitted_at
+        self._service_time = (elapsed if not self._service_time else
+                              SERVICE_TIME_ALPHA * elapsed + (1 - SERVICE_TIME_ALPHA) * self._service_time)
+        self._release_slot(ticket)
+
+    def _release_slot(self, ticket: Ticket):
+        self.in_flight -= 1
+        remaining = self._tenant_in_flight[ticket.tenant] - 1
+        if remaining:
+            self._tenant_in_flight[ticket.tenant] = remaining
+        else:
+            del self._tenant_in_flight[ticket.tenant]
+
+        # Hand free slots to the next eligible waiters
+        while self.in_flight < self.max_in_flight:
+            waiter = self._queue.pop(self._can_run)
+            if waiter is None:
+                break
+            if not waiter.future.done():
+                waiter.future.set_result(self._grant(waiter.tenant))
+
+    @asynccontextmanager
+    async def admit(self, tenant: str = "default", priority: str = INTERACTIVE, retry: bool = False):
+        """
+        Hold a slot for the body of an async with block. With retry (background
+        work), rejections are waited out for their Retry-After instead of raised.
+        """
+        while True:
+            try:
+                ticket = await self.acquire(tenant, priority)
+                break
+            except AdmissionRejected as e:
+                if not retry:
+                    raise
+                await asyncio.sleep(e.retry_after)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def metrics(self) -> Dict[str, Any]:
+        return dict(
+            self._stats,
+            max_in_flight=self.max_in_flight,
+            max_queue=self.max_queue,
+            tenant_max_in_flight=self.tenant_max_in_flight,
+            in_flight=self.in_flight,
+            queue_depth=len(self._queue),
+            queue_depth_by_priority=self._queue.depth_by_priority(),
+            active_tenants=len(self._tenant_in_flight),
+            avg_service_seconds=round(self._service_time, 3),
+            retry_after=self.retry_after(),
+        )
+
+
+def request_tenant(request, user_id: Optional[str] = None) -> str:
+    """
+    Tenant of an HTTP request: the X-Tenant-ID header, else the userId sent
+    in the body, else the client address (one school behind one NAT).
+    """
+    tenant = request.headers.get("x-tenant-id") or user_id
+    if not tenant and request.client:
+        tenant = request.client.host
+    return tenant or "anonymous"
+
+
+def request_priority(request, priority: Optional[str] = None) -> str:
+    """Priority class from the X-Priority header or the body; interactive by default."""
+    return (request.headers.get("x-priority") or priority or INTERACTIVE).lower()
+
+
+def rejection_response(error: AdmissionRejected):
+    """FastAPI response for a rejected request: 429 with Retry-After."""
+    from fastapi.responses import JSONResponse
+
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(error), "reason": error.reason, "retry_after": error.retry_after},
+        headers={"Retry-After": str(error.retry_after)},
+    )
@@ -2,11 +2,9 @@
 
 from google.adk.agents import Agent
 from google.genai import types
-from .sub_agents.orchestrator_agent import orchestrator_agent
-from .sub_agents.merger_agent import merger_agent
 
 from . import prompt, config
-from .tools import call_content_gen_agent , call_visual_aid_agent
+from .tools import call_content_gen_agent , call_visual_aid_agent, call_content_and_visual_aid_agents
 
 
 # Create the main workflow with orchestrator and merger
@@ -31,7 +29,8 @@ root_agent = Agent(
     #sub_agents=[merger_agent],
     tools=[
         call_content_gen_agent,
-        call_visual_aid_agent
+        call_visual_aid_agent,
+        call_content_and_visual_aid_agents
     ],
     generate_content_config=types.GenerateContentConfig(temperature=0.01),
 )
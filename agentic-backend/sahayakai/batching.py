@@ -0,0 +1,92 @@
+"""
+Request Batching for Sahayak AI
+Collects concurrent generation requests over a short window and sends them
+to Transformer Lab as one batched generation. Only worthwhile with a worker
+batch endpoint (LOCAL_MODEL_BATCH_ENDPOINT); otherwise it only adds latency
+"""
+
+import asyncio
+from typing import Dict, Any, List, Set, Tuple
+from . import config
+
+
+class GenerationBatcher:
+    """Micro-batches concurrent generate calls that share sampling parameters"""
+
+    def __init__(self, client, window_ms: float = None, max_batch_size: int = None):
+        self.client = client
+        self.window = (window_ms if window_ms is not None else config.LOCAL_MODEL_BATCH_WINDOW_MS) / 1000.0
+        self.max_batch_size = max_batch_size or config.LOCAL_MODEL_MAX_BATCH_SIZE
+
+        # Sampling parameters -> [(prompt, future)] waiting for the next flush
+        self._pending: Dict[Tuple, List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[Tuple, asyncio.Task] = {}
+        # The event loop only keeps weak references to tasks
+        self._dispatches: Set[asyncio.Task] = set()
+        self._stats = {"requests": 0, "batches": 0, "largest_batch": 0}
+
+    async def generate(self,
+                       prompt: str,
+                       max_tokens: int = 256,
+                       temperature: float = 0.7,
+                       top_p: float = 0.9,
+                       repetition_penalty: float = 1.2) -> str:
+        """Queue a prompt and wait for its share of the batched result."""
+        params = (max_tokens, temperature, top_p, repetition_penalty)
+        future = asyncio.get_running_loop().create_future()
+
+        batch = self._pending.setdefault(params, [])
+        batch.append((prompt, future))
+        self._stats["requests"] += 1
+
+        if len(batch) >= self.max_batch_size:
+            self._flush(params)
+        elif params not in self._timers:
+            self._timers[params] = asyncio.create_task(self._flush_later(params))
+
+        return await future
+
+    async def _flush_later(self, params: Tuple):
+        await asyncio.sleep(self.window)
+        self._timers.pop(params, None)
+        self._flush(params)
+
+    def _flush(self, params: Tuple):
+        timer = self._timers.pop(params, None)
+        if timer and timer is not asyncio.current_task():
+            timer.cancel()
+
+        batch = self._pending.pop(params, [])
+        if batch:
+            task = asyncio.create_task(self._dispatch(params, batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, params: Tuple, batch: List[Tuple[str, asyncio.Future]]):
+        self._stats["batches"] += 1
+        self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+
+        max_tokens, temperature, top_p, repetition_penalty = params
+        prompts = [prompt for prompt, _ in batch]
+        try:
+            results = await self.client.generate_batch_async(
+                prompts, max_tokens, temperature, top_p, repetition_penalty
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # Scatter results back to the callers in submission order
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Batching counters."""
+        return dict(self._stats)
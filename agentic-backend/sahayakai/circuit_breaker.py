@@ -0,0 +1,155 @@
+"""
+Circuit Breaker and Adaptive Timeouts for Sahayak AI
+Lets callers fail fast while the local model worker is unhealthy and sizes
+request timeouts from observed latency instead of a fixed worst case
+"""
+
+import time
+import random
+import threading
+from collections import deque
+from typing import Any, Dict
+from . import config
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"{name} is unavailable (circuit open); retry in {retry_after:.0f}s")
+
+
+class CircuitBreaker:
+    """
+    closed -> open after failure_threshold consecutive failures
+    open -> half_open after reset_timeout, letting half_open_max_calls probes through
+    half_open -> closed on a successful probe, back to open on a failed one;
+    a probe that ends with neither (cancelled) frees its slot via end_call()
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self,
+                 name: str = "backend",
+                 failure_threshold: int = None,
+                 reset_timeout: float = None,
+                 half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold or config.CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or config.CIRCUIT_RESET_TIMEOUT
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+        self._stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def before_call(self) -> bool:
+        """
+        Raise CircuitOpenError if the call should not be attempted. Returns
+        True when the call is a half-open probe; pass that to end_call().
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    self._stats["rejected"] += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = self.HALF_OPEN
+                self._half_open_calls = 0
+
+            if self.state == self.HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    self._stats["rejected"] += 1
+                    raise CircuitOpenError(self.name, self.reset_timeout)
+                self._half_open_calls += 1
+                return True
+        return False
+
+    def end_call(self, probe: bool):
+        """
+        Call when a call finishes, however it finished. A probe that recorded
+        neither success nor failure (cancelled, closed early) gives its slot
+        back so the next call can probe instead.
+        """
+        if not probe:
+            return
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self):
+        with self._lock:
+            self._stats["successes"] += 1
+            self._consecutive_failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._stats["failures"] += 1
+            self._consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self._stats["opened"] += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, state=self.state, consecutive_failures=self._consecutive_failures)
+
+
+class LatencyTracker:
+    """
+    Derives per-endpoint timeouts from recent latencies. Latency is tracked per
+    unit of work (e.g. per requested token) so long and short generations share
+    one estimate: timeout = p95(seconds per unit) * units * multiplier, clamped.
+    """
+
+    def __init__(self,
+                 min_timeout: float = None,
+                 max_timeout: float = None,
+                 multiplier: float = None,
+                 window: int = 100,
+                 min_samples: int = 10):
+        self.min_timeout = min_timeout or config.LOCAL_MODEL_MIN_TIMEOUT
+        self.max_timeout = max_timeout or config.LOCAL_MODEL_TIMEOUT
+        self.multiplier = multiplier or config.LOCAL_MODEL_TIMEOUT_MULTIPLIER
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, units: int = 1):
+        with self._lock:
+            samples = self._samples.setdefault(endpoint, deque(maxlen=self.window))
+            samples.append(seconds / max(units, 1))
+
+    def timeout_for(self, endpoint: str, units: int = 1) -> float:
+        """Timeout for the next call; the maximum until enough samples exist."""
+        with self._lock:
+            samples = sorted(self._samples.get(endpoint, ()))
+        if len(samples) < self.min_samples:
+            return self.max_timeout
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return min(self.max_timeout, max(self.min_timeout, p95 * max(units, 1) * self.multiplier))
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = {endpoint: sorted(samples) for endpoint, samples in self._samples.items()}
+        return {
+            endpoint: {
+                "samples": len(samples),
+                "p95_seconds_per_unit": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+            }
+            for endpoint, samples in snapshot.items() if samples
+        }
+
+
+def backoff_delay(attempt: int, base: float = None, cap: float = 5.0) -> float:
+    """Exponential backoff with full jitter."""
+    base = base if base is not None else config.LOCAL_MODEL_RETRY_BASE_DELAY
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -1,4 +1,5 @@
 import os
+import json
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -16,4 +17,104 @@ LOCAL_MODEL_URL = os.getenv('LOCAL_MODEL_URL', 'http://localhost:21002')
 LOCAL_MODEL_NAME = os.getenv('LOCAL_MODEL_NAME', 'google/gemma-3-1b-pt')
 
 # GCS Configuration for image storage
-GCS_BUCKET_NAME = GOOGLE_CLOUD_STORAGE_BUCKET
\ No newline at end of file
+GCS_BUCKET_NAME = GOOGLE_CLOUD_STORAGE_BUCKET
+
+# Local model client connection pool / concurrency limits
+LOCAL_MODEL_TIMEOUT = float(os.getenv('LOCAL_MODEL_TIMEOUT', '60'))
+LOCAL_MODEL_MAX_CONNECTIONS = int(os.getenv('LOCAL_MODEL_MAX_CONNECTIONS', '16'))
+LOCAL_MODEL_MAX_KEEPALIVE = int(os.getenv('LOCAL_MODEL_MAX_KEEPALIVE', '8'))
+LOCAL_MODEL_MAX_CONCURRENCY = int(os.getenv('LOCAL_MODEL_MAX_CONCURRENCY', '4'))
+
+# Response cache for repeated teacher requests
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH', 'response_cache.db')
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', str(24 * 3600)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1024'))
+RESPONSE_CACHE_MAX_DISK_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_DISK_ENTRIES', '20000'))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv('RESPONSE_CACHE_SIMILARITY', '0.95'))
+RESPONSE_CACHE_NEAR_CANDIDATES = int(os.getenv('RESPONSE_CACHE_NEAR_CANDIDATES', '200'))
+# Near-duplicate matching only for single-turn requests of at most this many topic words
+RESPONSE_CACHE_NEAR_MAX_WORDS = int(os.getenv('RESPONSE_CACHE_NEAR_MAX_WORDS', '12'))
+
+# Request batching in front of Transformer Lab. LOCAL_MODEL_BATCH_ENDPOINT names
+# a worker route that accepts {"prompts": [...]} and returns {"texts": [...]};
+# batching needs one (without it, batching would only add the window's delay)
+LOCAL_MODEL_BATCHING = os.getenv('LOCAL_MODEL_BATCHING', 'false').lower() == 'true'
+LOCAL_MODEL_BATCH_WINDOW_MS = float(os.getenv('LOCAL_MODEL_BATCH_WINDOW_MS', '20'))
+LOCAL_MODEL_MAX_BATCH_SIZE = int(os.getenv('LOCAL_MODEL_MAX_BATCH_SIZE', '8'))
+LOCAL_MODEL_BATCH_ENDPOINT = os.getenv('LOCAL_MODEL_BATCH_ENDPOINT', '')
+
+# Conversation history database (shared with models/docker-compose.yml)
+CONVERSATION_DB_PATH = os.getenv('CONVERSATION_DB_PATH', 'sahayak_offline.db')
+
+# Chat context window management (token counts are estimates)
+CONTEXT_MAX_PROMPT_TOKENS = int(os.getenv('CONTEXT_MAX_PROMPT_TOKENS', '1536'))
+CONTEXT_KEEP_TURNS = int(os.getenv('CONTEXT_KEEP_TURNS', '6'))
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv('CONTEXT_SUMMARY_MAX_TOKENS', '256'))
+# Per-agent prompt budgets, e.g. {"story_agent": 1024, "worksheet_agent": 768}
+AGENT_TOKEN_BUDGETS = json.loads(os.getenv('AGENT_TOKEN_BUDGETS', '{}'))
+
+# Server launch mode: "development" (one reloading process) or "production"
+# (SERVER_WORKERS processes; 0 = one per CPU core)
+SERVER_MODE = os.getenv('SERVER_MODE', 'development').lower()
+SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', '0'))
+SERVER_GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv('SERVER_GRACEFUL_SHUTDOWN_TIMEOUT', '30'))
+
+# Local model resilience: adaptive timeouts (LOCAL_MODEL_TIMEOUT is the ceiling),
+# circuit breaker and retries for idempotent calls
+LOCAL_MODEL_MIN_TIMEOUT = float(os.getenv('LOCAL_MODEL_MIN_TIMEOUT', '5'))
+LOCAL_MODEL_TIMEOUT_MULTIPLIER = float(os.getenv('LOCAL_MODEL_TIMEOUT_MULTIPLIER', '3'))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', '30'))
+LOCAL_MODEL_RETRIES = int(os.getenv('LOCAL_MODEL_RETRIES', '2'))
+LOCAL_MODEL_RETRY_BASE_DELAY = float(os.getenv('LOCAL_MODEL_RETRY_BASE_DELAY', '0.2'))
+
+# Conversation templates are cached per model name and refreshed in the background
+CONV_TEMPLATE_REFRESH_INTERVAL = int(os.getenv('CONV_TEMPLATE_REFRESH_INTERVAL', '3600'))  # seconds
+
+# Stream generations and cancel them once the cleaned output is settled
+# (enough lines, or the model starts repeating itself)
+LOCAL_MODEL_EARLY_STOP = os.getenv('LOCAL_MODEL_EARLY_STOP', 'true').lower() == 'true'
+
+# Ask the worker to keep KV state for prompt prefixes (agent instructions) and
+# how many prefixes it is assumed to hold when estimating prefill saved. Only
+# enable for backends with a prompt cache (llama.cpp style `cache_prompt`);
+# the default FastChat worker ignores the flag
+LOCAL_MODEL_PROMPT_CACHE = os.getenv('LOCAL_MODEL_PROMPT_CACHE', 'false').lower() == 'true'
+PROMPT_CACHE_MAX_PREFIXES = int(os.getenv('PROMPT_CACHE_MAX_PREFIXES', '16'))
+
+# Concurrent Imagen requests per process; further visual-aid calls wait their turn
+IMAGE_GENERATION_MAX_CONCURRENCY = int(os.getenv('IMAGE_GENERATION_MAX_CONCURRENCY', '2'))
+
+# Content-addressed cache of generated images (memory LRU + directory on disk)
+IMAGE_CACHE_ENABLED = os.getenv('IMAGE_CACHE_ENABLED', 'true').lower() == 'true'
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', 'image_cache')
+IMAGE_CACHE_MAX_MEMORY_BYTES = int(os.getenv('IMAGE_CACHE_MAX_MEMORY_BYTES', str(64 * 1024 * 1024)))
+IMAGE_CACHE_MAX_DISK_BYTES = int(os.getenv('IMAGE_CACHE_MAX_DISK_BYTES', str(1024 * 1024 * 1024)))
+
+# Share one generation between identical requests that are in flight together
+REQUEST_COALESCING = os.getenv('REQUEST_COALESCING', 'true').lower() == 'true'
+
+# Admission control per server: requests running at once, requests allowed to
+# wait for a slot, and how long they may wait before a 429
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', '16'))
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', '32'))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '10'))  # seconds
+# Fair sharing between tenants (X-Tenant-ID header or userId): per-tenant
+# running and waiting limits, and relative weights, e.g. {"district-office": 2}
+ADMISSION_TENANT_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_TENANT_MAX_IN_FLIGHT', '4'))
+ADMISSION_TENANT_MAX_QUEUE = int(os.getenv('ADMISSION_TENANT_MAX_QUEUE', '8'))
+ADMISSION_TENANT_WEIGHTS = json.loads(os.getenv('ADMISSION_TENANT_WEIGHTS', '{}'))
+
+# Background jobs (lesson packages): database, jobs run at once per worker,
+# poll interval, when a silent job counts as abandoned, runs per job, and how
+# long finished jobs are kept
+JOB_DB_PATH = os.getenv('JOB_DB_PATH', 'sahayak_jobs.db')
+JOB_MAX_CONCURRENT = int(os.getenv('JOB_MAX_CONCURRENT', '2'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '5'))  # seconds
+JOB_STALE_AFTER = float(os.getenv('JOB_STALE_AFTER', '60'))  # seconds
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '2'))
+JOB_RESULT_TTL = float(os.getenv('JOB_RESULT_TTL', str(7 * 24 * 3600)))  # seconds
+
+# Largest /agent/batch request accepted
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '50'))
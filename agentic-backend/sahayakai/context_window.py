@@ -0,0 +1,122 @@
+"""
+Context Window Manager for Sahayak AI
+Keeps chat prompts within a per-agent token budget by keeping recent turns
+verbatim and folding older turns into a cached running summary
+"""
+
+import re
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+from . import config
+
+
+SENTENCE_END = re.compile(r"(?<=[.!?।])\s")
+
+
+def count_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for Gemma's tokenizer)."""
+    return (len(text) + 3) // 4
+
+
+def extractive_summary(previous: str, messages: List[Dict[str, str]], max_tokens: int) -> str:
+    """Fold messages into a summary using the first sentence of each turn."""
+    pieces = [previous] if previous else []
+    for message in messages:
+        content = " ".join(message.get("content", "").split())
+        first_sentence = SENTENCE_END.split(content, maxsplit=1)[0]
+        words = first_sentence.split()
+        if len(words) > 30:
+            first_sentence = " ".join(words[:30]) + "..."
+        speaker = "Teacher" if message.get("role") == "user" else "Assistant"
+        pieces.append(f"{speaker}: {first_sentence}")
+
+    summary = " ".join(pieces)
+    # Keep the most recent part of the summary when it outgrows its budget
+    max_chars = max_tokens * 4
+    if len(summary) > max_chars:
+        summary = "..." + summary[-max_chars:]
+    return summary
+
+
+class ContextWindowManager:
+    """Trims chat history to a token budget, summarizing what it drops"""
+
+    def __init__(self,
+                 max_tokens: int = None,
+                 keep_last_turns: int = None,
+                 summary_max_tokens: int = None,
+                 summarizer: Callable[[str, List[Dict[str, str]], int], str] = None,
+                 token_counter: Callable[[str], int] = None,
+                 agent_budgets: Dict[str, int] = None,
+                 max_cached_summaries: int = 256):
+        self.max_tokens = max_tokens or config.CONTEXT_MAX_PROMPT_TOKENS
+        self.keep_last_turns = keep_last_turns or config.CONTEXT_KEEP_TURNS
+        self.summary_max_tokens = summary_max_tokens or config.CONTEXT_SUMMARY_MAX_TOKENS
+        self.summarizer = summarizer or extractive_summary
+        self.count_tokens = token_counter or count_tokens
+        self.agent_budgets = dict(config.AGENT_TOKEN_BUDGETS if agent_budgets is None else agent_budgets)
+
+        # Hash of the folded message prefix -> summary of that prefix
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self.max_cached_summaries = max_cached_summaries
+
+    def budget_for(self, agent_name: Optional[str] = None) -> int:
+        """Prompt token budget for an agent."""
+        return self.agent_budgets.get(agent_name, self.max_tokens)
+
+    def budgets(self) -> Dict[str, int]:
+        return dict(self.agent_budgets, default=self.max_tokens)
+
+    def _summarize(self, older: List[Dict[str, str]]) -> str:
+        # Running hashes identify every prefix of the folded history, so a new
+        # request only summarizes the turns that slid out since the last one.
+        hashes = []
+        digest = hashlib.sha1()
+        for message in older:
+            digest.update(message.get("role", "").encode())
+            digest.update(b"\0")
+            digest.update(message.get("content", "").encode())
+            digest.update(b"\0")
+            hashes.append(digest.copy().hexdigest())
+
+        start, summary = 0, ""
+        for i in range(len(hashes) - 1, -1, -1):
+            if hashes[i] in self._summaries:
+                start, summary = i + 1, self._summaries[hashes[i]]
+                self._summaries.move_to_end(hashes[i])
+                break
+
+        if start < len(older):
+            summary = self.summarizer(summary, older[start:], self.summary_max_tokens)
+            self._summaries[hashes[-1]] = summary
+            while len(self._summaries) > self.max_cached_summaries:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def fit(self, messages: List[Dict[str, str]], agent_name: Optional[str] = None) -> List[Dict[str, str]]:
+        """Return messages that fit the agent's budget."""
+        budget = self.budget_for(agent_name)
+        if sum(self.count_tokens(m.get("content", "")) for m in messages) <= budget:
+            return messages
+
+        system = [m for m in messages if m.get("role") == "system"]
+        turns = [m for m in messages if m.get("role") != "system"]
+
+        # Keep up to keep_last_turns recent messages verbatim, leaving room for the summary
+        available = budget - self.summary_max_tokens - sum(self.count_tokens(m.get("content", "")) for m in system)
+        kept = []
+        for message in reversed(turns[-self.keep_last_turns:]):
+            cost = self.count_tokens(message.get("content", ""))
+            if kept and cost > available:
+                break
+            kept.append(message)
+            available -= cost
+        kept.reverse()
+
+        older = turns[:len(turns) - len(kept)]
+        if older:
+            summary = self._summarize(older)
+            system = system + [{"role": "system", "content": f"Summary of earlier conversation: {summary}"}]
+
+        return system + kept
@@ -0,0 +1,121 @@
+"""
+Conversation Store for Sahayak AI
+SQLite-backed chat history shared by every server worker and kept across restarts
+"""
+
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+from . import config
+
+
+class ConversationStore:
+    """Persistent conversation history in SQLite (WAL mode)"""
+
+    def __init__(self, path: str = None):
+        self.path = path or config.CONVERSATION_DB_PATH
+        self._lock = threading.Lock()
+
+        # One connection per process; writes are short transactions under the lock
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id TEXT NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages(conversation_id, id);
+            CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations(updated_at);
+        """)
+        self._db.commit()
+
+    @staticmethod
+    def new_conversation_id() -> str:
+        """Collision-free conversation ID (unlike a counter, safe across deletes and workers)."""
+        return f"conv_{uuid.uuid4().hex}"
+
+    def append_messages(self, conversation_id: str, messages: List[Dict[str, str]]):
+        """Append messages in a single transaction, creating the conversation if needed."""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO conversations (id, created_at, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at",
+                (conversation_id, now, now),
+            )
+            self._db.executemany(
+                "INSERT INTO messages (conversation_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                [(conversation_id, m["role"], m["content"], now) for m in messages],
+            )
+
+    def exists(self, conversation_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+        return row is not None
+
+    def get_messages(self, conversation_id: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """Messages in order; with limit, only the most recent ones."""
+        with self._lock:
+            if limit is None:
+                rows = self._db.execute(
+                    "SELECT role, content FROM messages WHERE conversation_id = ? ORDER BY id",
+                    (conversation_id,),
+                ).fetchall()
+            else:
+                rows = self._db.execute(
+                    "SELECT role, content FROM (SELECT id, role, content FROM messages "
+                    "WHERE conversation_id = ? ORDER BY id DESC LIMIT ?) ORDER BY id",
+                    (conversation_id, limit),
+                ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def list_conversations(self, limit: int = 50, offset: int = 0) -> Tuple[List[str], int]:
+        """Page of conversation IDs, most recently active first, plus the total count."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM conversations ORDER BY updated_at DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+            total = self._db.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+        return [row[0] for row in rows], total
+
+    def delete_conversation(self, conversation_id: str) -> bool:
+        with self._lock, self._db:
+            cursor = self._db.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+        return cursor.rowcount > 0
+
+    # Async handlers use these, so SQLite I/O never blocks the event loop
+
+    async def append_messages_async(self, conversation_id: str, messages: List[Dict[str, str]]):
+        await asyncio.to_thread(self.append_messages, conversation_id, messages)
+
+    async def exists_async(self, conversation_id: str) -> bool:
+        return await asyncio.to_thread(self.exists, conversation_id)
+
+    async def get_messages_async(self, conversation_id: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        return await asyncio.to_thread(self.get_messages, conversation_id, limit)
+
+    async def list_conversations_async(self, limit: int = 50, offset: int = 0) -> Tuple[List[str], int]:
+        return await asyncio.to_thread(self.list_conversations, limit, offset)
+
+    async def delete_conversation_async(self, conversation_id: str) -> bool:
+        return await asyncio.to_thread(self.delete_conversation, conversation_id)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,111 @@
+"""
+Fair Queuing for Sahayak AI
+Orders waiting requests across tenants (schools, teachers) so one tenant's
+bulk job cannot starve everyone else, with interactive requests ahead of batch
+"""
+
+import itertools
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITY_CLASSES = (INTERACTIVE, BATCH)  # served strictly in this order
+
+
+class QueuedRequest:
+    __slots__ = ("tenant", "priority", "start", "finish", "seq", "future")
+
+    def __init__(self, tenant: str, priority: str, start: float, finish: float, seq: int, future):
+        self.tenant = tenant
+        self.priority = priority
+        self.start = start
+        self.finish = finish
+        self.seq = seq
+        self.future = future
+
+
+class FairQueue:
+    """
+    Start-time fair queuing. Each request is tagged with a virtual finish
+    time, advanced per tenant by 1/weight, so tenants with waiting requests
+    are served in proportion to their weights however many requests each
+    has queued. Within a tenant, requests stay in arrival order. Every
+    interactive request is served before any batch request.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.weights = dict(weights or {})
+        self.virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        # (priority, tenant) -> requests in arrival order
+        self._queues: Dict[Tuple[str, str], Deque[QueuedRequest]] = {}
+        self._tenant_depth: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def depth(self, tenant: str) -> int:
+        return self._tenant_depth.get(tenant, 0)
+
+    def push(self, tenant: str, priority: str, future) -> QueuedRequest:
+        start = max(self.virtual_time, self._last_finish.get(tenant, 0.0))
+        finish = start + 1.0 / self.weights.get(tenant, 1.0)
+        self._last_finish[tenant] = finish
+
+        request = QueuedRequest(tenant, priority, start, finish, next(self._seq), future)
+        self._queues.setdefault((priority, tenant), deque()).append(request)
+        self._tenant_depth[tenant] = self._tenant_depth.get(tenant, 0) + 1
+        self._size += 1
+        return request
+
+    def remove(self, request: QueuedRequest):
+        """Drop a request that gave up waiting."""
+        queue = self._queues.get((request.priority, request.tenant))
+        if queue and request in queue:
+            queue.remove(request)
+            self._forget(request)
+
+    def pop(self, eligible: Callable[[str], bool]) -> Optional[QueuedRequest]:
+        """Remove and return the next request whose tenant is eligible to run."""
+        for priority in PRIORITY_CLASSES:
+            best = None
+            for (queue_priority, tenant), queue in self._queues.items():
+                if queue_priority != priority or not eligible(tenant):
+                    continue
+                head = queue[0]
+                if best is None or (head.finish, head.seq) < (best.finish, best.seq):
+                    best = head
+            if best is not None:
+                self._queues[(best.priority, best.tenant)].popleft()
+                self._forget(best)
+                self.virtual_time = max(self.virtual_time, best.start)
+                if len(self._last_finish) > 64 + 4 * len(self._tenant_depth):
+                    self._prune()
+                return best
+        return None
+
+    def _forget(self, request: QueuedRequest):
+        self._size -= 1
+        key = (request.priority, request.tenant)
+        if not self._queues[key]:
+            del self._queues[key]
+        self._tenant_depth[request.tenant] -= 1
+        if not self._tenant_depth[request.tenant]:
+            del self._tenant_depth[request.tenant]
+            # An idle tenant restarts from the current virtual time anyway
+            if self._last_finish.get(request.tenant, 0.0) <= self.virtual_time:
+                self._last_finish.pop(request.tenant, None)
+
+    def _prune(self):
+        for tenant, finish in list(self._last_finish.items()):
+            if finish <= self.virtual_time and tenant not in self._tenant_depth:
+                del self._last_finish[tenant]
+
+    def depth_by_priority(self) -> Dict[str, int]:
+        depths = dict.fromkeys(PRIORITY_CLASSES, 0)
+        for (priority, _), queue in self._queues.items():
+            depths[priority] += len(queue)
+        return depths
@@ -0,0 +1,166 @@
+"""
+Image Cache for Sahayak AI
+Content-addressed store for generated visual aids, so a repeated prompt with
+the same generation settings is served without another Imagen call
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from . import config
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def image_key(prompt: str, model: str, settings: Dict[str, Any]) -> str:
+    """sha256 of the normalized prompt, model and generation settings."""
+    payload = json.dumps(
+        {"prompt": WHITESPACE.sub(" ", prompt).strip(), "model": model, "settings": settings},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def artifact_name(key: str) -> str:
+    """Artifact name derived from the content key; identical images share one name."""
+    return f"generated_image_{key[:16]}.png"
+
+
+class ImageCache:
+    """
+    Two-tier (memory LRU + directory of <key>.png files) cache, each tier
+    bounded in bytes. Disk recency is the file mtime, so the directory can be
+    shared by workers and survives restarts; files other workers write are
+    found by their content-addressed path. Eviction across processes is best
+    effort. The directory is created and indexed on first use.
+    """
+
+    def __init__(self, path: str = None, max_memory_bytes: int = None, max_disk_bytes: int = None):
+        self.path = path or config.IMAGE_CACHE_DIR
+        self.max_memory_bytes = max_memory_bytes or config.IMAGE_CACHE_MAX_MEMORY_BYTES
+        self.max_disk_bytes = max_disk_bytes or config.IMAGE_CACHE_MAX_DISK_BYTES
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "bytes_served": 0}
+        self._loaded = False
+
+    def _load(self):
+        """Create the directory and index the files already in it (called with the lock held)."""
+        if self._loaded:
+            return
+        self._loaded = True
+        os.makedirs(self.path, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.path):
+            key, ext = os.path.splitext(name)
+            if ext != ".png":
+                continue
+            try:
+                stat = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, key, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.png")
+
+    def _remember(self, key: str, data: bytes):
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        if len(data) > self.max_memory_bytes:
+            return
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old)
+
+    def _forget_disk(self, key: str):
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached image bytes for a key, if any."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._stats["hits"] += 1
+                self._stats["bytes_served"] += len(data)
+                return data
+
+            self._load()
+            # Not only indexed keys: another worker may have written the file since
+            try:
+                with open(self._file(key), "rb") as f:
+                    data = f.read()
+                os.utime(self._file(key))
+            except OSError:
+                # Never written, or evicted by another worker
+                self._forget_disk(key)
+                self._stats["misses"] += 1
+                return None
+
+            if key not in self._disk:
+                self._disk[key] = len(data)
+                self._disk_bytes += len(data)
+            self._disk.move_to_end(key)
+            self._remember(key, data)
+            self._stats["disk_hits"] += 1
+            self._stats["bytes_served"] += len(data)
+            return data
+
+    def set(self, key: str, data: bytes):
+        """Store image bytes under their content key."""
+        with self._lock:
+            self._load()
+            self._remember(key, data)
+            self._stats["stores"] += 1
+
+            # Write then rename so readers never see a partial file
+            tmp_path = f"{self._file(key)}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._file(key))
+            except OSError as e:
+                print(f"Image cache write failed for {key}: {e}")
+                return
+            self._forget_disk(key)
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+
+            # Least recently used files beyond the disk budget
+            while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+                old_key, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                try:
+                    os.remove(self._file(old_key))
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache hit/miss counters and tier sizes."""
+        with self._lock:
+            return dict(
+                self._stats,
+                memory_entries=len(self._memory), memory_bytes=self._memory_bytes,
+                disk_entries=len(self._disk), disk_bytes=self._disk_bytes,
+            )
+
+
+# Global instance shared by the image-generation tool and servers; creating it
+# touches no files
+image_cache = ImageCache() if config.IMAGE_CACHE_ENABLED else None
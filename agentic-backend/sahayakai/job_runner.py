@@ -0,0 +1,126 @@
+"""
+Job Runner for Sahayak AI
+Runs queued jobs from the JobStore in the background of a server worker,
+recording progress events, heartbeats, results and retention
+"""
+
+import os
+import uuid
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from . import config
+from .job_store import JobStore
+
+# handler(payload, progress) -> result; progress(agent, status, message="")
+Progress = Callable[..., None]
+JobHandler = Callable[[Dict[str, Any], Progress], Awaitable[Any]]
+
+
+class JobRunner:
+    """
+    Each server worker runs up to max_concurrent jobs. Submitted jobs start
+    right away when there is room; otherwise any worker picks them up from
+    the store on its next poll. Jobs whose worker stopped (no heartbeat for
+    stale_after seconds) are queued again, up to max_attempts runs.
+    """
+
+    def __init__(self,
+                 store: JobStore,
+                 handlers: Dict[str, JobHandler],
+                 max_concurrent: int = None,
+                 poll_interval: float = None,
+                 stale_after: float = None,
+                 max_attempts: int = None):
+        self.store = store
+        self.handlers = handlers
+        self.max_concurrent = max_concurrent or config.JOB_MAX_CONCURRENT
+        self.poll_interval = poll_interval or config.JOB_POLL_INTERVAL
+        self.stale_after = stale_after or config.JOB_STALE_AFTER
+        self.max_attempts = max_attempts or config.JOB_MAX_ATTEMPTS
+
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._running: Set[asyncio.Task] = set()
+        self._wake: Optional[asyncio.Event] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start polling; call from the server's startup hook."""
+        self._wake = asyncio.Event()
+        self._loop_task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        """Stop polling and cancel running jobs; they go back on the queue for other workers."""
+        tasks = [task for task in [self._loop_task, *self._running] if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.store.release(self.owner)
+
+    def submit(self, kind: str, payload: Dict[str, Any], tenant: str) -> Dict[str, Any]:
+        """Persist a job and start it if this worker has room."""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        job = self.store.create(kind, payload, tenant)
+        if len(self._running) < self.max_concurrent:
+            claimed = self.store.claim(self.owner, job["id"])
+            if claimed:
+                self._start(claimed)
+                return claimed
+        if self._wake:
+            self._wake.set()
+        return job
+
+    def _start(self, job: Dict[str, Any]):
+        task = asyncio.create_task(self._run(job))
+        self._running.add(task)
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task):
+        self._running.discard(task)
+        if self._wake:
+            self._wake.set()
+
+    async def _run(self, job: Dict[str, Any]):
+        job_id = job["id"]
+
+        def progress(agent: str, status: str, message: str = ""):
+            self.store.add_event(job_id, agent, status, message)
+
+        progress("job", "running", f"Attempt {job['attempts']}")
+        try:
+            result = await self.handlers[job["kind"]](dict(job["payload"], tenant=job["tenant"]), progress)
+        except asyncio.CancelledError:
+            raise  # worker shutting down; stop() requeues the job
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self.store.finish(job_id, error=str(e))
+        else:
+            self.store.finish(job_id, result=result)
+
+    async def _poll(self):
+        while True:
+            try:
+                self.store.heartbeat(self.owner)
+                self.store.requeue_stale(self.stale_after, self.max_attempts)
+                self.store.purge_expired()
+                while len(self._running) < self.max_concurrent:
+                    job = self.store.claim(self.owner)
+                    if job is None:
+                        break
+                    self._start(job)
+            except Exception as e:
+                print(f"Job runner poll failed: {e}")
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "owner": self.owner,
+            "running_here": len(self._running),
+            "max_concurrent": self.max_concurrent,
+            "jobs": self.store.counts(),
+        }
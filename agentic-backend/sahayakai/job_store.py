@@ -0,0 +1,198 @@
+"""
+Job Store for Sahayak AI
+SQLite-backed state, progress events and results of long-running generation
+jobs (lesson packages), shared by every server worker and kept across restarts
+"""
+
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from . import config
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+
+class JobStore:
+    """Persistent jobs and their event log in SQLite (WAL mode)"""
+
+    def __init__(self, path: str = None, result_ttl: float = None):
+        self.path = path or config.JOB_DB_PATH
+        self.result_ttl = result_ttl or config.JOB_RESULT_TTL
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                tenant TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                progress TEXT NOT NULL DEFAULT '{}',
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                owner TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                finished_at REAL,
+                expires_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS job_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+                agent TEXT NOT NULL,
+                status TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs(expires_at);
+            CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events(job_id, id);
+        """)
+        self._db.commit()
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["progress"] = json.loads(job["progress"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def create(self, kind: str, payload: Dict[str, Any], tenant: str) -> Dict[str, Any]:
+        """Record a new queued job."""
+        job_id = f"job_{uuid.uuid4().hex}"
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, tenant, status, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, tenant, QUEUED, json.dumps(payload), now, now),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def claim(self, owner: str, job_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Mark a queued job as running for owner: job_id, or else the oldest
+        queued job. Returns None if another worker got it first.
+        """
+        now = time.time()
+        with self._lock, self._db:
+            if job_id is None:
+                row = self._db.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    return None
+                job_id = row[0]
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, owner = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ? AND status = ?",
+                (RUNNING, owner, now, job_id, QUEUED),
+            )
+            if cursor.rowcount == 0:
+                return None
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row)
+
+    def add_event(self, job_id: str, agent: str, status: str, message: str = ""):
+        """Append a progress event and record the agent's latest status."""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO job_events (job_id, agent, status, message, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, agent, status, message, now),
+            )
+            self._db.execute(
+                "UPDATE jobs SET progress = json_set(progress, '$.' || ?, ?), updated_at = ? WHERE id = ?",
+                (agent, status, now, job_id),
+            )
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """Events with an id greater than after, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, agent, status, message, created_at FROM job_events "
+                "WHERE job_id = ? AND id > ? ORDER BY id",
+                (job_id, after),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def finish(self, job_id: str, result: Any = None, error: Optional[str] = None):
+        """Store the result (or error); both are kept for result_ttl seconds."""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET status = ?1, progress = json_set(progress, '$.job', ?1), result = ?2, "
+                "error = ?3, owner = NULL, updated_at = ?4, finished_at = ?4, expires_at = ?5 WHERE id = ?6",
+                (FAILED if error else SUCCEEDED, None if error else json.dumps(result), error,
+                 now, now + self.result_ttl, job_id),
+            )
+            self._db.execute(
+                "INSERT INTO job_events (job_id, agent, status, message, created_at) VALUES (?, 'job', ?, ?, ?)",
+                (job_id, FAILED if error else SUCCEEDED, error or "", now),
+            )
+
+    def heartbeat(self, owner: str):
+        """Show that owner's running jobs are still alive."""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET updated_at = ? WHERE owner = ? AND status = ?", (time.time(), owner, RUNNING)
+            )
+
+    def release(self, owner: str):
+        """Queue owner's running jobs again (worker shutting down); the interrupted run is not counted."""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, attempts = attempts - 1, updated_at = ? "
+                "WHERE owner = ? AND status = ?",
+                (QUEUED, time.time(), owner, RUNNING),
+            )
+
+    def requeue_stale(self, stale_after: float, max_attempts: int) -> int:
+        """
+        Running jobs without a heartbeat for stale_after seconds lost their
+        worker; queue them again, or fail them after max_attempts.
+        """
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = 'Worker stopped while running the job', owner = NULL, "
+                "updated_at = ?, finished_at = ?, expires_at = ? "
+                "WHERE status = ? AND updated_at < ? AND attempts >= ?",
+                (FAILED, now, now, now + self.result_ttl, RUNNING, now - stale_after, max_attempts),
+            )
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, updated_at = ? WHERE status = ? AND updated_at < ?",
+                (QUEUED, now, RUNNING, now - stale_after),
+            )
+        return cursor.rowcount
+
+    def purge_expired(self) -> int:
+        """Delete finished jobs (and their events) past their retention."""
+        with self._lock, self._db:
+            cursor = self._db.execute("DELETE FROM jobs WHERE expires_at < ?", (time.time(),))
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -4,158 +4,723 @@ Provides a wrapper to use local Gemma models with Transformer Lab
 """
 
 import os
+import time
+import asyncio
+import threading
 import requests
+import httpx
 import json
-from typing import Dict, Any, Optional, List
+from contextlib import aclosing, nullcontext
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Optional, List, AsyncContextManager, AsyncIterator, Callable
 from . import config
+from .response_cache import response_cache, is_cacheable, chat_cache_key
+from .batching import GenerationBatcher
+from .context_window import ContextWindowManager
+from .circuit_breaker import CircuitBreaker, LatencyTracker, backoff_delay
+from .prefix_cache import PrefixCacheTracker
+from .single_flight import SingleFlight, flight_key
+from .text_postprocess import OutputCleaner, clean_generated_text, TURN_MARKERS, NO_RESPONSE
+
+
+# Gemma end-of-turn marker; generation past it is discarded
+STOP_MARKER = "<end_of_turn>"
+
+# Used when the worker cannot report its own template
+FALLBACK_CONV_TEMPLATE = {
+    "conv": {
+        "name": "gemma",
+        "roles": ["user", "model"],
+        "sep": "<end_of_turn>\n",
+        "stop_str": "<end_of_turn>"
+    }
+}
+
+# Conversation templates by model name; they only change when the model does
+_conv_templates: Dict[str, Dict[str, Any]] = {}
+_conv_templates_lock = threading.Lock()
+
+
+class WorkerStreamDecoder:
+    """
+    Turns worker_generate_stream output (cumulative JSON snapshots separated by
+    NUL bytes) into text deltas, ending at the Gemma end-of-turn marker.
+    """
+    
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+        self.started = False
+        self.stopped = False
+        self._buffer = b""
+        self._text = ""
+        self._emitted = 0
+    
+    def feed(self, raw: bytes) -> str:
+        """Consume raw response bytes; return the newly available text."""
+        self._buffer += raw
+        *chunks, self._buffer = self._buffer.split(b"\0")
+        for chunk in chunks:
+            if chunk and not self.stopped:
+                self._snapshot(json.loads(chunk.decode()))
+        return self._take(final=self.stopped)
+    
+    def flush(self) -> str:
+        """Release text held back when the stream ends without an end-of-turn marker."""
+        return self._take(final=True)
+    
+    def _snapshot(self, data: Dict[str, Any]):
+        if data.get("error_code", 0) != 0:
+            raise Exception(data.get("text", "worker error"))
+        self.started = True
+        
+        text = data.get("text", "")
+        if text.startswith(self.prompt):
+            text = text[len(self.prompt):]
+        text = text.lstrip()
+        
+        stop = text.find(STOP_MARKER)
+        if stop != -1:
+            text = text[:stop]
+            self.stopped = True
+        self._text = TURN_MARKERS.sub("", text)
+    
+    def _take(self, final: bool) -> str:
+        text = self._text
+        if not final:
+            # Hold back a possibly incomplete turn marker
+            marker_start = text.rfind("<", len(text) - len("<start_of_turn>"))
+            if marker_start != -1 and ">" not in text[marker_start:]:
+                text = text[:marker_start]
+        if len(text) <= self._emitted:
+            return ""
+        delta, self._emitted = text[self._emitted:], len(text)
+        return delta
 
 
 class TransformerLabClient:
     """Client for communicating with Transformer Lab local models"""
     
-    def __init__(self, base_url: str = None, model_name: str = None):
+    def __init__(self,
+                 base_url: str = None,
+                 model_name: str = None,
+                 max_connections: int = None,
+                 max_concurrency: int = None,
+                 batching: bool = None):
         self.base_url = base_url or config.LOCAL_MODEL_URL
         self.model_name = model_name or config.LOCAL_MODEL_NAME
-        self.timeout = 60.0
+        self.timeout = config.LOCAL_MODEL_TIMEOUT
+        self.max_connections = max_connections or config.LOCAL_MODEL_MAX_CONNECTIONS
+        self.max_concurrency = max_concurrency or config.LOCAL_MODEL_MAX_CONCURRENCY
+        
+        # Keep-alive session for the blocking API so repeated calls reuse sockets
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        
+        # The async client is created lazily so it binds to the running event loop
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        # Fail fast while the worker is unhealthy; size timeouts from observed latency
+        self.breaker = CircuitBreaker(name="Transformer Lab worker")
+        self.latency = LatencyTracker(max_timeout=self.timeout)
+        
+        # Estimates prefill saved by reusing cached instruction prefixes
+        self.prefix_cache = PrefixCacheTracker()
         
-    def _make_request(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        # Bounds chat prompt size as conversations grow
+        self.context_window = ContextWindowManager()
+        
+        batching = config.LOCAL_MODEL_BATCHING if batching is None else batching
+        if batching and not config.LOCAL_MODEL_BATCH_ENDPOINT:
+            print("Request batching needs LOCAL_MODEL_BATCH_ENDPOINT; leaving it disabled")
+            batching = False
+        self._batcher = GenerationBatcher(self) if batching else None
+        
+        # Generations cancelled once OutputCleaner had settled the result
+        self.early_stop = config.LOCAL_MODEL_EARLY_STOP
+        self._early_stops = {"max_lines": 0, "repetition": 0}
+        
+        # Identical requests in flight together share one generation
+        self._inflight = SingleFlight("local model") if config.REQUEST_COALESCING else None
+    
+    def _url(self, endpoint: str) -> str:
+        return f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
+        
+    @staticmethod
+    def _check_worker_error(result: Dict[str, Any]) -> Dict[str, Any]:
+        """The worker reports overload and model errors in-band via error_code."""
+        if result.get("error_code", 0) != 0:
+            raise Exception(f"Transformer Lab worker error {result['error_code']}: {result.get('text', '')}")
+        return result
+    
+    @staticmethod
+    def _is_client_error(error: Exception) -> bool:
+        """4xx responses are caller mistakes, not signs of an unhealthy worker."""
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+        return status is not None and 400 <= status < 500
+    
+    def _record_error(self, error: Exception):
+        """A 4xx still shows a healthy worker (the caller erred); anything else counts against it."""
+        if self._is_client_error(error):
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+    
+    def _make_request(self, endpoint: str, data: Dict[str, Any], idempotent: bool = False) -> Dict[str, Any]:
         """Make a request to the Transformer Lab API."""
-        url = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
         headers = {"Content-Type": "application/json"}
+        units = data.get("max_new_tokens", 1)
+        attempts = 1 + (config.LOCAL_MODEL_RETRIES if idempotent else 0)
         
-        try:
-            response = requests.post(url, json=data, headers=headers, timeout=self.timeout)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Error calling Transformer Lab API: {e}")
+        for attempt in range(attempts):
+            probe = self.breaker.before_call()
+            start = time.monotonic()
+            try:
+                response = self._session.post(
+                    self._url(endpoint), json=data, headers=headers,
+                    timeout=self.latency.timeout_for(endpoint, units)
+                )
+                response.raise_for_status()
+                result = self._check_worker_error(response.json())
+            except Exception as e:
+                if attempt + 1 >= attempts:
+                    # One outcome per call, however many attempts it took
+                    self._record_error(e)
+                    raise Exception(f"Error calling Transformer Lab API: {e}")
+            else:
+                self.breaker.record_success()
+                self.latency.record(endpoint, time.monotonic() - start, units)
+                return result
+            finally:
+                # Free a probe slot before backing off, so others can probe meanwhile
+                self.breaker.end_call(probe)
+            time.sleep(backoff_delay(attempt))
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None or self._async_client.is_closed:
+            self._async_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=config.LOCAL_MODEL_MAX_KEEPALIVE,
+                ),
+                headers={"Content-Type": "application/json"},
+            )
+        return self._async_client
+    
+    async def _make_request_async(self, endpoint: str, data: Dict[str, Any], idempotent: bool = False) -> Dict[str, Any]:
+        """Make a non-blocking request to the Transformer Lab API over the pooled client."""
+        client = self._get_async_client()
+        units = data.get("max_new_tokens", 1)
+        attempts = 1 + (config.LOCAL_MODEL_RETRIES if idempotent else 0)
+        
+        for attempt in range(attempts):
+            probe = self.breaker.before_call()
+            try:
+                async with self._semaphore:
+                    start = time.monotonic()
+                    try:
+                        response = await client.post(
+                            self._url(endpoint), json=data,
+                            timeout=self.latency.timeout_for(endpoint, units)
+                        )
+                        response.raise_for_status()
+                        result = self._check_worker_error(response.json())
+                    except Exception as e:
+                        if attempt + 1 >= attempts:
+                            # One outcome per call, however many attempts it took
+                            self._record_error(e)
+                            raise Exception(f"Error calling Transformer Lab API: {e}")
+                    else:
+                        self.breaker.record_success()
+                        self.latency.record(endpoint, time.monotonic() - start, units)
+                        return result
+            finally:
+                # A cancelled probe records nothing; free its slot
+                self.breaker.end_call(probe)
+            await asyncio.sleep(backoff_delay(attempt))
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Runtime counters for health/metrics endpoints."""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "circuit_breaker": self.breaker.metrics(),
+            "latency": self.latency.metrics(),
+            "early_stops": dict(self._early_stops),
+            "prefix_cache": self.prefix_cache.metrics(),
+            "batching": self._batcher.stats() if self._batcher else None,
+            "coalescing": self._inflight.stats() if self._inflight else None,
+        }
+    
+    async def aclose(self):
+        """Close pooled connections held by the client."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        self._session.close()
     
     def get_conversation_template(self) -> Dict[str, Any]:
-        """Get the conversation template for the model."""
-        try:
-            return self._make_request("worker_get_conv_template", {})
-        except:
-            # Fallback template
-            return {
-                "conv": {
-                    "name": "gemma",
-                    "roles": ["user", "model"],
-                    "sep": "<end_of_turn>\n",
-                    "stop_str": "<end_of_turn>"
-                }
-            }
+        """
+        Get the conversation template for the model.
+        Fetched once per model name; a stale template keeps being served while
+        a background thread refreshes it.
+        """
+        with _conv_templates_lock:
+            entry = _conv_templates.get(self.model_name)
+            if entry is not None and not entry["refreshing"] and \
+                    time.monotonic() - entry["fetched_at"] > config.CONV_TEMPLATE_REFRESH_INTERVAL:
+                entry["refreshing"] = True
+                threading.Thread(target=self._fetch_conversation_template, daemon=True).start()
+        
+        if entry is None:
+            return self._fetch_conversation_template()
+        return entry["template"]
     
-    def generate_text(self, 
-                     prompt: str, 
-                     max_tokens: int = 256,
-                     temperature: float = 0.7,
-                     top_p: float = 0.9,
-                     repetition_penalty: float = 1.2) -> str:  # Increased repetition penalty
-        """Generate text using the local model."""
+    async def get_conversation_template_async(self) -> Dict[str, Any]:
+        """Like get_conversation_template, but never blocks the event loop on the first fetch."""
+        if self.model_name not in _conv_templates:
+            return await asyncio.to_thread(self.get_conversation_template)
+        return self.get_conversation_template()
+    
+    def _fetch_conversation_template(self) -> Dict[str, Any]:
+        try:
+            template = self._make_request("worker_get_conv_template", {}, idempotent=True)
+            fetched_at = time.monotonic()
+        except Exception as e:
+            print(f"Could not fetch conversation template, using Gemma default: {e}")
+            template = FALLBACK_CONV_TEMPLATE
+            fetched_at = 0.0  # stale straight away, so the next use retries in the background
         
-        # Try the working parameter format directly
-        request_data = {
+        with _conv_templates_lock:
+            _conv_templates[self.model_name] = {"template": template, "fetched_at": fetched_at, "refreshing": False}
+        return template
+    
+    def _build_generate_request(self,
+                                prompt: str,
+                                max_tokens: int,
+                                temperature: float,
+                                top_p: float,
+                                repetition_penalty: float) -> Dict[str, Any]:
+        return {
             "prompt": prompt,
             "max_new_tokens": max_tokens,
             "temperature": temperature,
             "top_p": top_p,
             "repetition_penalty": repetition_penalty,
             "do_sample": True,
+            # Backends with a prompt cache (llama.cpp style) reuse the KV state of
+            # a matching prefix; others ignore the flag
+            "cache_prompt": config.LOCAL_MODEL_PROMPT_CACHE,
         }
+    
+    def generate_text(self, 
+                     prompt: str, 
+                     max_tokens: int = 256,
+                     temperature: float = 0.7,
+                     top_p: float = 0.9,
+                     repetition_penalty: float = 1.2,  # Increased repetition penalty
+                     cache_message: Optional[str] = None,
+                     agent_name: str = "local_model",
+                     cache_prefix: Optional[str] = None,
+                     cache_context: str = "",
+                     cache_near: bool = True) -> str:
+        """
+        Generate text using the local model.
+        cache_message/agent_name identify the teacher request in the response
+        cache; the raw prompt is used when no message is given. cache_context
+        is a digest of the rest of the prompt (system prompt and history) and
+        cache_near=False limits the cache to exact matches. cache_prefix is the
+        static start of the prompt (agent instructions) that the worker can
+        keep cached between requests.
+        """
+        cache_message = cache_message or prompt
+        sampling = (max_tokens, temperature, top_p, repetition_penalty)
+        if response_cache:
+            cached = response_cache.get(cache_message, agent_name, sampling, cache_context, cache_near)
+            if cached is not None:
+                return cached
+        
+        def generate() -> str:
+            return self._generate(prompt, max_tokens, temperature, top_p, repetition_penalty,
+                                  cache_message, agent_name, cache_prefix, cache_context)
+        
+        if self._inflight:
+            key = flight_key(agent_name, prompt, max_tokens, temperature, top_p, repetition_penalty)
+            return self._inflight.do_sync(key, generate)
+        return generate()
+    
+    def _generate(self, prompt: str, max_tokens: int, temperature: float, top_p: float,
+                  repetition_penalty: float, cache_message: str, agent_name: str,
+                  cache_prefix: Optional[str], cache_context: str) -> str:
+        request_data = self._build_generate_request(
+            prompt, max_tokens, temperature, top_p, repetition_penalty
+        )
+        self._track_prefix(agent_name, prompt, cache_prefix)
         
         try:
-            response = self._make_request("worker_generate", request_data)
-            
-            # Extract the generated text
-            generated_text = response.get("text", "")
-            
-            if generated_text:
-                # Remove the original prompt if it's echoed back
-                if generated_text.startswith(prompt):
-                    generated_text = generated_text[len(prompt):].strip()
-                
-                # Clean up common artifacts
-                generated_text = generated_text.replace("<end_of_turn>", "")
-                generated_text = generated_text.replace("<start_of_turn>", "")
-                
-                # Handle repetitive content by detecting patterns
-                lines = generated_text.split('\n')
-                unique_lines = []
-                seen_lines = set()
-                
-                for line in lines:
-                    line = line.strip()
-                    if (line and 
-                        line not in seen_lines and  # Remove exact duplicates
-                        len(line) > 5 and  # Skip very short lines
-                        not line.startswith('[User') and 
-                        not line.startswith('User ') and
-                        not line.startswith('[Assistant') and
-                        not line == 'User:' and
-                        not line == 'Assistant:'):
-                        
-                        unique_lines.append(line)
-                        seen_lines.add(line)
-                        
-                        # Stop if we have enough content
-                        if len(unique_lines) >= 3:
-                            break
-                
-                if unique_lines:
-                    # Join the unique lines
-                    result = ' '.join(unique_lines)
-                    
-                    # Ensure complete sentences
-                    sentences = result.split('. ')
-                    if len(sentences) > 1 and not sentences[-1].endswith(('.', '!', '?')):
-                        # Remove incomplete last sentence
-                        result = '. '.join(sentences[:-1]) + '.'
-                    
-                    return result.strip()
-                else:
-                    # Fallback: take first paragraph and ensure it's complete
-                    paragraphs = generated_text.split('\n\n')
-                    if paragraphs:
-                        first_para = paragraphs[0].strip()
-                        sentences = first_para.split('. ')
-                        if len(sentences) > 1 and not sentences[-1].endswith(('.', '!', '?')):
-                            first_para = '. '.join(sentences[:-1]) + '.'
-                        return first_para
+            if self.early_stop:
+                result = self._generate_until_settled(prompt, request_data)
+            else:
+                response = self._make_request("worker_generate", request_data)
+                result = clean_generated_text(prompt, response.get("text", ""))
             
-            return "No response generated"
+        except Exception as e:
+            print(f"Error generating text with Transformer Lab: {e}")
+            return f"Error: Could not generate response - {str(e)}"
+        
+        if response_cache and is_cacheable(result):
+            response_cache.set(cache_message, agent_name, result,
+                               (max_tokens, temperature, top_p, repetition_penalty), cache_context)
+        return result
+    
+    async def generate_text_async(self,
+                                  prompt: str,
+                                  max_tokens: int = 256,
+                                  temperature: float = 0.7,
+                                  top_p: float = 0.9,
+                                  repetition_penalty: float = 1.2,
+                                  cache_message: Optional[str] = None,
+                                  agent_name: str = "local_model",
+                                  cache_prefix: Optional[str] = None,
+                                  cache_context: str = "",
+                                  cache_near: bool = True,
+                                  admit: Optional[Callable[[], AsyncContextManager]] = None) -> str:
+        """
+        Async variant of generate_text that does not block the event loop.
+        admit (e.g. admission control) is entered only around a generation
+        this call actually starts; cache hits and calls that join an identical
+        generation in flight skip it.
+        """
+        cache_message = cache_message or prompt
+        sampling = (max_tokens, temperature, top_p, repetition_penalty)
+        if response_cache:
+            cached = await response_cache.get_async(cache_message, agent_name, sampling, cache_context, cache_near)
+            if cached is not None:
+                return cached
+        
+        async def generate() -> str:
+            async with admit() if admit else nullcontext():
+                return await self._generate_async(prompt, max_tokens, temperature, top_p, repetition_penalty,
+                                                  cache_message, agent_name, cache_prefix, cache_context)
+        
+        if self._inflight:
+            key = flight_key(agent_name, prompt, max_tokens, temperature, top_p, repetition_penalty)
+            return await self._inflight.do(key, generate)
+        return await generate()
+    
+    async def _generate_async(self, prompt: str, max_tokens: int, temperature: float, top_p: float,
+                              repetition_penalty: float, cache_message: str, agent_name: str,
+                              cache_prefix: Optional[str], cache_context: str) -> str:
+        request_data = self._build_generate_request(
+            prompt, max_tokens, temperature, top_p, repetition_penalty
+        )
+        self._track_prefix(agent_name, prompt, cache_prefix)
+        
+        try:
+            if self._batcher:
+                result = await self._batcher.generate(
+                    prompt, max_tokens, temperature, top_p, repetition_penalty
+                )
+            elif self.early_stop:
+                result = await self._generate_until_settled_async(prompt, request_data)
+            else:
+                response = await self._make_request_async("worker_generate", request_data)
+                result = clean_generated_text(prompt, response.get("text", ""))
             
         except Exception as e:
             print(f"Error generating text with Transformer Lab: {e}")
             return f"Error: Could not generate response - {str(e)}"
+        
+        if response_cache and is_cacheable(result):
+            await response_cache.set_async(cache_message, agent_name, result,
+                                           (max_tokens, temperature, top_p, repetition_penalty), cache_context)
+        return result
     
-    def chat_completion(self, messages: List[Dict[str, str]], **kwargs) -> str:
+    def _track_prefix(self, agent_name: str, prompt: str, cache_prefix: Optional[str]):
+        if config.LOCAL_MODEL_PROMPT_CACHE:
+            self.prefix_cache.record(agent_name, prompt, cache_prefix)
+    
+    async def generate_batch_async(self,
+                                   prompts: List[str],
+                                   max_tokens: int = 256,
+                                   temperature: float = 0.7,
+                                   top_p: float = 0.9,
+                                   repetition_penalty: float = 1.2) -> List[Any]:
         """
-        Process chat messages and generate a response.
+        Generate text for several prompts that share sampling parameters.
+        Uses the worker's batch endpoint when LOCAL_MODEL_BATCH_ENDPOINT is set,
+        otherwise issues the prompts concurrently over the pooled connection.
+        Failed prompts are returned as exceptions in their slot.
         """
-        # Convert messages to a single prompt
-        prompt_parts = []
-        for message in messages:
-            role = message.get("role", "user")
-            content = message.get("content", "")
+        if config.LOCAL_MODEL_BATCH_ENDPOINT:
+            request_data = self._build_generate_request(
+                "", max_tokens, temperature, top_p, repetition_penalty
+            )
+            del request_data["prompt"]
+            request_data["prompts"] = prompts
             
-            if role == "system":
-                prompt_parts.append(f"System: {content}")
-            elif role == "user":
-                prompt_parts.append(f"User: {content}")
-            elif role == "assistant":
-                prompt_parts.append(f"Assistant: {content}")
+            response = await self._make_request_async(config.LOCAL_MODEL_BATCH_ENDPOINT, request_data)
+            texts = response.get("texts", [])
+            if len(texts) != len(prompts):
+                raise Exception(f"Batch endpoint returned {len(texts)} results for {len(prompts)} prompts")
+            return [clean_generated_text(prompt, text) for prompt, text in zip(prompts, texts)]
+        
+        async def generate_one(prompt: str) -> str:
+            request_data = self._build_generate_request(
+                prompt, max_tokens, temperature, top_p, repetition_penalty
+            )
+            if self.early_stop:
+                return await self._generate_until_settled_async(prompt, request_data)
+            response = await self._make_request_async("worker_generate", request_data)
+            return clean_generated_text(prompt, response.get("text", ""))
         
-        prompt = "\n".join(prompt_parts)
+        return await asyncio.gather(*[generate_one(prompt) for prompt in prompts], return_exceptions=True)
+    
+    async def generate_text_stream_async(self,
+                                         prompt: str,
+                                         max_tokens: int = 256,
+                                         temperature: float = 0.7,
+                                         top_p: float = 0.9,
+                                         repetition_penalty: float = 1.2,
+                                         agent_name: str = "local_model",
+                                         cache_prefix: Optional[str] = None,
+                                         admit: Optional[Callable[[], AsyncContextManager]] = None) -> AsyncIterator[str]:
+        """
+        Stream generated text from the worker_generate_stream endpoint.
+        Yields text deltas as the worker produces them; identical streams in
+        flight together share one generation. admit is held for the length of
+        a generation this call starts, as in generate_text_async.
+        """
+        async def generate() -> AsyncIterator[str]:
+            request_data = self._build_generate_request(
+                prompt, max_tokens, temperature, top_p, repetition_penalty
+            )
+            async with admit() if admit else nullcontext():
+                self._track_prefix(agent_name, prompt, cache_prefix)
+                async with aclosing(self._stream_async(prompt, request_data)) as deltas:
+                    async for delta in deltas:
+                        yield delta
+        
+        if self._inflight:
+            key = flight_key(agent_name, prompt, max_tokens, temperature, top_p, repetition_penalty)
+            stream = self._inflight.stream(key, generate)
+        else:
+            stream = generate()
+        async with aclosing(stream) as deltas:
+            async for delta in deltas:
+                yield delta
+    
+    async def _stream_async(self, prompt: str, request_data: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Yield text deltas from worker_generate_stream. Closing the generator
+        closes the response, which stops the worker generating.
+        """
+        request_data = dict(request_data, echo=False)
+        endpoint = "worker_generate_stream"
+        decoder = WorkerStreamDecoder(prompt)
+        client = self._get_async_client()
+        
+        probe = self.breaker.before_call()
+        try:
+            async with self._semaphore:
+                start = time.monotonic()
+                try:
+                    async with client.stream("POST", self._url(endpoint), json=request_data,
+                                             timeout=self.latency.timeout_for(endpoint)) as response:
+                        response.raise_for_status()
+                        async for raw in response.aiter_bytes():
+                            delta = decoder.feed(raw)
+                            if start and decoder.started:
+                                self._record_stream_start(endpoint, start)
+                                start = None
+                            if delta:
+                                yield delta
+                            if decoder.stopped:
+                                return
+                        delta = decoder.flush()
+                        if delta:
+                            yield delta
+                except Exception as e:
+                    if not decoder.started:
+                        self._record_error(e)
+                    raise Exception(f"Error calling Transformer Lab API: {e}")
+        finally:
+            # Cancelled or closed before the first token: free the probe slot
+            self.breaker.end_call(probe)
+    
+    def _record_stream_start(self, endpoint: str, start: float):
+        # A streaming worker is healthy once it produces tokens; the time to the
+        # first snapshot sizes the read timeout of later streams
+        self.breaker.record_success()
+        self.latency.record(endpoint, time.monotonic() - start)
+    
+    async def _generate_until_settled_async(self, prompt: str, request_data: Dict[str, Any]) -> str:
+        """Stream a generation through OutputCleaner and cancel it once the result is settled."""
+        cleaner = OutputCleaner()
+        async with aclosing(self._stream_async(prompt, request_data)) as deltas:
+            async for delta in deltas:
+                if cleaner.feed(delta):
+                    self._early_stops[cleaner.stop_reason] += 1
+                    break
+        return cleaner.finish() or NO_RESPONSE
+    
+    def _generate_until_settled(self, prompt: str, request_data: Dict[str, Any]) -> str:
+        """Blocking variant of _generate_until_settled_async."""
+        request_data = dict(request_data, echo=False)
+        endpoint = "worker_generate_stream"
+        decoder = WorkerStreamDecoder(prompt)
+        cleaner = OutputCleaner()
+        
+        probe = self.breaker.before_call()
+        start = time.monotonic()
+        try:
+            with self._session.post(self._url(endpoint), json=request_data, stream=True,
+                                    timeout=self.latency.timeout_for(endpoint)) as response:
+                response.raise_for_status()
+                for raw in response.iter_content(chunk_size=None):
+                    settled = cleaner.feed(decoder.feed(raw))
+                    if start and decoder.started:
+                        self._record_stream_start(endpoint, start)
+                        start = None
+                    if settled:
+                        self._early_stops[cleaner.stop_reason] += 1
+                        break
+                    if decoder.stopped:
+                        break
+                else:
+                    cleaner.feed(decoder.flush())
+        except Exception as e:
+            if not decoder.started:
+                self._record_error(e)
+            raise Exception(f"Error calling Transformer Lab API: {e}")
+        finally:
+            self.breaker.end_call(probe)
+        
+        return cleaner.finish() or NO_RESPONSE
+    
+    @staticmethod
+    def _turn_prefix(role: str) -> str:
+        """Templates list roles either bare ("user") or as full Gemma turn openers."""
+        return role if role.startswith("<") else f"<start_of_turn>{role}\n"
+    
+    def build_chat_prompt(self, messages: List[Dict[str, str]], template: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Render chat messages with the model's conversation template, ending with
+        an open model turn. Gemma has no system role, so system messages are
+        folded into the first user turn.
+        """
+        conv = (template or self.get_conversation_template()).get("conv", {})
+        user_prefix, model_prefix = [self._turn_prefix(role) for role in conv.get("roles") or ["user", "model"]]
+        sep = conv.get("sep") or f"{STOP_MARKER}\n"
+        
+        system = "\n\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        system = system or conv.get("system_message", "")
+        turns = [m for m in messages if m.get("role") in ("user", "assistant")]
+        if system:
+            if turns and turns[0]["role"] == "user":
+                turns[0] = {"role": "user", "content": f"{system}\n\n{turns[0].get('content', '')}"}
+            else:
+                turns.insert(0, {"role": "user", "content": system})
+        
+        prompt_parts = []
+        for message in turns:
+            prefix = user_prefix if message["role"] == "user" else model_prefix
+            prompt_parts.append(f"{prefix}{message.get('content', '')}{sep}")
+        prompt_parts.append(model_prefix)
+        
+        return "".join(prompt_parts)
+    
+    def chat_prompt_prefix(self, messages: List[Dict[str, str]], template: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        The static start of build_chat_prompt's output: the opening user turn
+        up to the end of the leading system message (the agent instructions).
+        """
+        if not messages or messages[0].get("role") != "system":
+            return None
+        conv = (template or self.get_conversation_template()).get("conv", {})
+        user_prefix = self._turn_prefix((conv.get("roles") or ["user"])[0])
+        return f"{user_prefix}{messages[0].get('content', '')}\n\n"
+    
+    def chat_completion(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """
+        Process chat messages and generate a response.
+        History beyond the agent's token budget is folded into a summary.
+        """
+        messages = self.context_window.fit(messages, kwargs.get("agent_name"))
+        template = self.get_conversation_template()
+        prompt = self.build_chat_prompt(messages, template)
+        # Cached under the last user message and a digest of what precedes it
+        cache_message, cache_context, single_turn = chat_cache_key(messages)
         
         # Generate response
         response_text = self.generate_text(
             prompt=prompt,
             max_tokens=kwargs.get("max_tokens", 256),
             temperature=kwargs.get("temperature", 0.7),
-            top_p=kwargs.get("top_p", 0.9)
+            top_p=kwargs.get("top_p", 0.9),
+            cache_message=cache_message,
+            agent_name=kwargs.get("agent_name") or "local_model",
+            cache_prefix=self.chat_prompt_prefix(messages, template),
+            cache_context=cache_context,
+            cache_near=single_turn
         )
         
         return response_text
+    
+    async def chat_completion_async(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """Async variant of chat_completion."""
+        messages = self.context_window.fit(messages, kwargs.get("agent_name"))
+        template = await self.get_conversation_template_async()
+        prompt = self.build_chat_prompt(messages, template)
+        cache_message, cache_context, single_turn = chat_cache_key(messages)
+        
+        return await self.generate_text_async(
+            prompt=prompt,
+            max_tokens=kwargs.get("max_tokens", 256),
+            temperature=kwargs.get("temperature", 0.7),
+            top_p=kwargs.get("top_p", 0.9),
+            cache_message=cache_message,
+            agent_name=kwargs.get("agent_name") or "local_model",
+            cache_prefix=self.chat_prompt_prefix(messages, template),
+            cache_context=cache_context,
+            cache_near=single_turn,
+            admit=kwargs.get("admit")
+        )
+    
+    async def chat_completion_stream_async(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """Stream a chat response token by token."""
+        messages = self.context_window.fit(messages, kwargs.get("agent_name"))
+        template = await self.get_conversation_template_async()
+        prompt = self.build_chat_prompt(messages, template)
+        
+        stream = self.generate_text_stream_async(
+            prompt=prompt,
+            max_tokens=kwargs.get("max_tokens", 256),
+            temperature=kwargs.get("temperature", 0.7),
+            top_p=kwargs.get("top_p", 0.9),
+            agent_name=kwargs.get("agent_name") or "local_model",
+            cache_prefix=self.chat_prompt_prefix(messages, template),
+            admit=kwargs.get("admit")
+        )
+        async with aclosing(stream) as chunks:
+            async for chunk in chunks:
+                yield chunk
+    
+    async def stream_until_settled_async(self, deltas: AsyncIterator[str], cleaner: OutputCleaner) -> AsyncIterator[str]:
+        """
+        Yield streamed deltas as they arrive while feeding them to cleaner.
+        The stream is closed (stopping the worker) once the result is
+        settled; cleaner.finish() then gives the cleaned text to store.
+        """
+        async with aclosing(deltas) as chunks:
+            async for delta in chunks:
+                yield delta
+                if cleaner.feed(delta):
+                    self._early_stops[cleaner.stop_reason] += 1
+                    return
 
 
 class LocalModelAdapter:
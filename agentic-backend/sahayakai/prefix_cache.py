@@ -0,0 +1,72 @@
+"""
+Prompt Prefix Reuse Tracking for Sahayak AI
+Estimates the prefill work saved when requests start with a static prefix
+(agent instructions) that the model backend still holds in its prompt cache.
+The numbers are a model of the backend's cache, not reported by it; only
+local prompt templates are tracked, not ADK agent runs
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from . import config
+from .context_window import count_tokens
+
+
+class PrefixCacheTracker:
+    """
+    Mirrors the backend's prompt cache as an LRU of the last max_prefixes
+    prefixes sent. A request whose prefix is still in it is assumed to need
+    only its suffix prefilled; those prefix tokens are counted as an
+    estimated saving, per agent.
+    """
+
+    def __init__(self, max_prefixes: int = None):
+        self.max_prefixes = max_prefixes or config.PROMPT_CACHE_MAX_PREFIXES
+        self._recent: OrderedDict = OrderedDict()
+        self._agents: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent_name: str, prompt: str, prefix: Optional[str]) -> bool:
+        """Account for one request; returns True if its prefix was probably reused."""
+        if not prefix or not prompt.startswith(prefix):
+            prefix = ""
+        prefix_tokens = count_tokens(prefix)
+        key = hashlib.sha1(prefix.encode()).hexdigest() if prefix else None
+
+        with self._lock:
+            stats = self._agents.setdefault(agent_name, {
+                "requests": 0, "prompt_tokens": 0, "prefix_tokens": 0,
+                "estimated_prefix_hits": 0, "estimated_prefill_tokens_saved": 0,
+            })
+            stats["requests"] += 1
+            stats["prompt_tokens"] += count_tokens(prompt)
+            stats["prefix_tokens"] += prefix_tokens
+
+            if key is None:
+                return False
+            hit = key in self._recent
+            if hit:
+                self._recent.move_to_end(key)
+                stats["estimated_prefix_hits"] += 1
+                stats["estimated_prefill_tokens_saved"] += prefix_tokens
+            else:
+                self._recent[key] = None
+                while len(self._recent) > self.max_prefixes:
+                    self._recent.popitem(last=False)
+            return hit
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            agents = {name: dict(stats) for name, stats in self._agents.items()}
+        for stats in agents.values():
+            stats["estimated_prefill_saved_ratio"] = round(
+                stats["estimated_prefill_tokens_saved"] / max(stats["prompt_tokens"], 1), 3
+            )
+        return {
+            "enabled": config.LOCAL_MODEL_PROMPT_CACHE,
+            "source": "estimate",
+            "estimated_cached_prefixes": len(self._recent),
+            "agents": agents,
+        }
@@ -37,6 +37,7 @@ You are responsible for:
 
 ### Step 3: **Tool Invocation**
 - If multiple tasks are needed, invoke sub-agents using `asyncio.gather()`
+- If the request needs both content and a visual aid, call `call_content_and_visual_aid_agents` once instead of calling `call_content_gen_agent` and `call_visual_aid_agent` one after another
 - Use `ToolContext.call_tool()` or `AgentClient.run()` to route calls
 
 ### Step 4: **Offline Mode Handling**
@@ -0,0 +1,137 @@
+"""
+Prompt Templates for Sahayak AI
+Registry of agent prompts, parsed once and checked at import, with each
+template's static prefix exposed so a model backend can cache it
+"""
+
+from string import Formatter
+from typing import Dict, Iterable, List, Optional
+
+
+class PromptTemplate:
+    """
+    A str.format-style template split once into literal text and named slots.
+    Only plain {name} fields are allowed, so rendering is a single join.
+    """
+
+    def __init__(self, name: str, text: str, fields: Optional[Iterable[str]] = None):
+        self.name = name
+        self.text = text
+        self._parts: List[str] = []
+        self._slots: List[tuple] = []  # (index in _parts, field name)
+
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if literal:
+                self._parts.append(literal)
+            if field is None:
+                continue
+            if not field.isidentifier() or spec or conversion:
+                raise ValueError(f"Prompt '{name}': unsupported placeholder {{{field}}}")
+            self._slots.append((len(self._parts), field))
+            self._parts.append("")
+
+        self.fields = frozenset(field for _, field in self._slots)
+        if fields is not None and self.fields != set(fields):
+            raise ValueError(f"Prompt '{name}' has placeholders {sorted(self.fields)}, expected {sorted(fields)}")
+
+        # Literal text before the first placeholder; identical across requests
+        first_slot = self._slots[0][0] if self._slots else len(self._parts)
+        self.static_prefix = "".join(self._parts[:first_slot])
+
+    def render(self, **values: str) -> str:
+        missing = self.fields - values.keys()
+        if missing:
+            raise ValueError(f"Prompt '{self.name}' is missing values for {sorted(missing)}")
+        parts = self._parts.copy()
+        for index, field in self._slots:
+            parts[index] = str(values[field])
+        return "".join(parts)
+
+
+class PromptRegistry:
+    """Named prompt templates with a default for unknown names"""
+
+    def __init__(self, default: str):
+        self.default = default
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def register(self, name: str, text: str, fields: Optional[Iterable[str]] = None) -> PromptTemplate:
+        template = PromptTemplate(name, text, fields)
+        self._templates[name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates.get(name) or self._templates[self.default]
+
+    def render(self, name: str, **values: str) -> str:
+        return self.get(name).render(**values)
+
+    def names(self) -> List[str]:
+        return list(self._templates)
+
+
+# Agent prompts for the local model. Instructions come first and the teacher's
+# message last, so everything before {message} is a reusable prefix.
+agent_prompts = PromptRegistry(default="sahayak_agent")
+
+agent_prompts.register("content_gen_agent", """Task: Create educational content for rural Indian school children.
+
+Requirements:
+- Appropriate for multi-grade classrooms
+- Simple, clear language
+- Culturally relevant to rural India
+- Practical for teachers with limited resources
+
+Request: {message}
+
+Content:""", fields=["message"])
+
+agent_prompts.register("story_agent", """Task: Write a short educational story for children.
+
+Requirements:
+- Age-appropriate for young students
+- Set in rural Indian context
+- Include a learning element
+- Complete story with beginning, middle, and end
+
+Topic: {message}
+
+Story:""", fields=["message"])
+
+agent_prompts.register("worksheet_agent", """Task: Create a practice worksheet for students.
+
+Format:
+- Clear title
+- Simple instructions
+- 3-5 practice problems
+- Answer spaces
+
+Subject: {message}
+
+Worksheet:
+
+Title: _______________
+
+Instructions: _______________
+
+Problems:
+1.""", fields=["message"])
+
+agent_prompts.register("visual_aid_agent", """Task: Create step-by-step drawing instructions for teachers.
+
+Provide detailed instructions for blackboard/whiteboard drawing:
+- Materials needed
+- Step-by-step drawing process
+- Labels and annotations to add
+
+Topic: {message}
+
+Instructions:""", fields=["message"])
+
+agent_prompts.register("sahayak_agent", """You are Sahayak AI, helping rural Indian teachers.
+
+Provide practical educational advice that works in multi-grade classrooms with limited resources.
+
+Teacher's request: {message}
+
+Advice:""", fields=["message"])
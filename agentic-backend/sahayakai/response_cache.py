@@ -0,0 +1,329 @@
+"""
+Response Cache for Sahayak AI
+Serves repeated and near-duplicate teacher requests without another model call
+"""
+
+import re
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from . import config
+from .text_postprocess import NO_RESPONSE
+
+
+LANGUAGES = [
+    "english", "hindi", "telugu", "tamil", "bengali", "marathi", "gujarati",
+    "urdu", "kannada", "odia", "malayalam", "punjabi", "assamese",
+]
+
+SUBJECTS = {
+    "math": "mathematics", "maths": "mathematics", "mathematics": "mathematics",
+    "science": "science", "evs": "environmental studies",
+    "environmental": "environmental studies", "social": "social science",
+    "history": "social science", "geography": "social science",
+    "english": "english", "hindi": "hindi",
+}
+
+STOPWORDS = {
+    "a", "an", "the", "on", "in", "of", "for", "about", "to", "and", "with",
+    "me", "my", "please", "create", "make", "generate", "give", "write",
+    "prepare", "some", "students", "student", "kids", "children", "class",
+    "grade", "std", "standard", "language", "i", "want", "need",
+}
+
+# Kept before a language in the key: "english to hindi" is not "hindi to english"
+DIRECTION_WORDS = {"to", "into", "from"}
+
+GRADE_PATTERN = re.compile(
+    r"\b(?:grade|class|std|standard)\s*(\d{1,2})\b|\b(\d{1,2})(?:st|nd|rd|th)\s+(?:grade|class|standard)\b"
+)
+WORD_PATTERN = re.compile(r"[^\W_]+")
+NUMBER_PATTERN = re.compile(r"\d+")
+
+
+def normalize_request(message: str, agent_name: str) -> Dict[str, str]:
+    """Extract grade, subject, language, numbers and the topic words (in order) from a teacher request."""
+    text = message.lower()
+
+    grade = ""
+    match = GRADE_PATTERN.search(text)
+    if match:
+        grade = match.group(1) or match.group(2)
+        text = text[:match.start()] + " " + text[match.end():]
+
+    words = WORD_PATTERN.findall(text)
+    # Every language named, in order and with its direction word, so a
+    # translation request keeps its source and target
+    language_words = []
+    for i, word in enumerate(words):
+        if word in LANGUAGES:
+            if i > 0 and words[i - 1] in DIRECTION_WORDS:
+                language_words.append(words[i - 1])
+            language_words.append(word)
+    language = " ".join(language_words) or "english"
+    subject = next((SUBJECTS[w] for w in words if w in SUBJECTS and w not in LANGUAGES), "")
+
+    topic_words = []
+    for word in words:
+        if word in STOPWORDS or word in LANGUAGES or word in SUBJECTS:
+            continue
+        # Cheap plural folding so "soil types" and "soil type" collide
+        if len(word) > 3 and word.endswith("s"):
+            word = word[:-1]
+        topic_words.append(word)
+
+    return {
+        "agent": agent_name,
+        "grade": grade,
+        "subject": subject,
+        "language": language,
+        # Word order and numbers change the answer ("3 times 4", "dog chasing a cat")
+        "numbers": " ".join(NUMBER_PATTERN.findall(text)),
+        "topic": " ".join(topic_words),
+    }
+
+
+def chat_cache_key(messages: List[Dict[str, str]]) -> Tuple[str, str, bool]:
+    """
+    Cache identity of a chat request: the last user message, a digest of
+    everything before it (system prompt and conversation history), and
+    whether it is a single-turn request (no earlier user or assistant turns).
+    """
+    last = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=None)
+    if last is None:
+        return "", "", False
+    before = messages[:last] + messages[last + 1:]
+    context = hashlib.sha256(json.dumps(
+        [[m.get("role"), m.get("content", "")] for m in before], ensure_ascii=False
+    ).encode("utf-8")).hexdigest()[:32]
+    single_turn = not any(m.get("role") in ("user", "assistant") for m in before)
+    return messages[last].get("content", ""), context, single_turn
+
+
+def trigrams(text: str) -> frozenset:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(a: frozenset, b: frozenset) -> float:
+    """Jaccard similarity of two trigram sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ResponseCache:
+    """
+    Two-tier (memory LRU + SQLite) cache. Lookup is exact first; otherwise,
+    for short single-turn requests only, the closest match on the ordered
+    topic text within the same agent/grade/subject/language/numbers/
+    sampling/context bucket, among the near_candidates most recently used
+    disk entries of that bucket.
+    """
+
+    def __init__(self,
+                 path: str = None,
+                 max_entries: int = None,
+                 max_disk_entries: int = None,
+                 ttl: float = None,
+                 similarity_threshold: float = None,
+                 near_candidates: int = None,
+                 near_max_words: int = None):
+        # path="" keeps the cache in memory only
+        self.path = config.RESPONSE_CACHE_PATH if path is None else path
+        self.max_entries = max_entries or config.RESPONSE_CACHE_MAX_ENTRIES
+        self.max_disk_entries = max_disk_entries or config.RESPONSE_CACHE_MAX_DISK_ENTRIES
+        self.ttl = ttl or config.RESPONSE_CACHE_TTL
+        self.similarity_threshold = similarity_threshold or config.RESPONSE_CACHE_SIMILARITY
+        self.near_candidates = near_candidates or config.RESPONSE_CACHE_NEAR_CANDIDATES
+        self.near_max_words = near_max_words or config.RESPONSE_CACHE_NEAR_MAX_WORDS
+
+        # key -> (response, expires_at, bucket, topic trigrams)
+        self._memory: "OrderedDict[str, Tuple[str, float, str, frozenset]]" = OrderedDict()
+        self._buckets: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "near_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self._db = None
+        if self.path:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    bucket TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._db.executescript("""
+                CREATE INDEX IF NOT EXISTS idx_response_cache_bucket_used ON response_cache(bucket, last_used);
+                CREATE INDEX IF NOT EXISTS idx_response_cache_last_used ON response_cache(last_used);
+                CREATE INDEX IF NOT EXISTS idx_response_cache_expires ON response_cache(expires_at);
+                DROP INDEX IF EXISTS idx_response_cache_bucket;
+            """)
+            self._db.commit()
+
+    @staticmethod
+    def _split_key(message: str, agent_name: str, sampling: Sequence[Any], context: str) -> Tuple[str, str, str]:
+        fields = normalize_request(message, agent_name)
+        bucket = "|".join([fields["agent"], fields["grade"], fields["subject"], fields["language"],
+                           fields["numbers"], ",".join(map(str, sampling)), context])
+        return f"{bucket}|{fields['topic']}", bucket, fields["topic"]
+
+    def _near_allowed(self, topic: str, near: bool) -> bool:
+        # Long prompts and follow-ups differ in details trigrams barely see
+        return near and 0 < len(topic.split()) <= self.near_max_words
+
+    def _remember(self, key: str, response: str, expires_at: float, bucket: str, topic: str):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+        self._memory[key] = (response, expires_at, bucket, trigrams(topic))
+        self._buckets.setdefault(bucket, set()).add(key)
+
+        while len(self._memory) > self.max_entries:
+            old_key, (_, _, old_bucket, _) = self._memory.popitem(last=False)
+            self._buckets.get(old_bucket, set()).discard(old_key)
+
+    def _forget(self, key: str):
+        entry = self._memory.pop(key, None)
+        if entry:
+            self._buckets.get(entry[2], set()).discard(key)
+
+    def _lookup_memory(self, key: str, bucket: str, topic: str, now: float, near: bool) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry and entry[1] > now:
+            self._memory.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+        if entry:
+            self._forget(key)
+        if not near:
+            return None
+
+        # Near-duplicate search only within the same agent/grade/subject/language
+        wanted = trigrams(topic)
+        best_key, best_score = None, self.similarity_threshold
+        for candidate in list(self._buckets.get(bucket, ())):
+            response, expires_at, _, grams = self._memory[candidate]
+            if expires_at <= now:
+                self._forget(candidate)
+                continue
+            score = similarity(wanted, grams)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+
+        if best_key:
+            self._memory.move_to_end(best_key)
+            self._stats["near_hits"] += 1
+            return self._memory[best_key][0]
+        return None
+
+    def _lookup_disk(self, key: str, bucket: str, topic: str, now: float, near: bool) -> Optional[str]:
+        best = self._db.execute(
+            "SELECT key, topic, response, expires_at FROM response_cache WHERE key = ? AND expires_at > ?",
+            (key, now),
+        ).fetchone()
+
+        if best is None and near:
+            # Near-duplicate search over the bucket's most recently used entries only
+            rows = self._db.execute(
+                "SELECT key, topic, response, expires_at FROM response_cache "
+                "WHERE bucket = ? ORDER BY last_used DESC LIMIT ?",
+                (bucket, self.near_candidates),
+            ).fetchall()
+            wanted = trigrams(topic)
+            best_score = self.similarity_threshold
+            for row in rows:
+                if row[3] <= now:
+                    continue
+                score = similarity(wanted, trigrams(row[1]))
+                if score >= best_score:
+                    best, best_score = row, score
+
+        if best is None:
+            return None
+
+        self._db.execute("UPDATE response_cache SET last_used = ? WHERE key = ?", (now, best[0]))
+        self._db.commit()
+        self._remember(best[0], best[2], best[3], bucket, best[1])
+        self._stats["disk_hits"] += 1
+        return best[2]
+
+    def get(self, message: str, agent_name: str, sampling: Sequence[Any] = (),
+            context: str = "", near: bool = True) -> Optional[str]:
+        """
+        Return a cached response for an equivalent request, if any. sampling
+        holds the generation parameters (max_tokens, temperature, ...) and
+        context a digest of the prompt around message (see chat_cache_key);
+        only responses generated with the same ones match. near=False (e.g.
+        for conversation follow-ups) allows exact matches only.
+        """
+        key, bucket, topic = self._split_key(message, agent_name, sampling, context)
+        near = self._near_allowed(topic, near)
+        now = time.time()
+
+        with self._lock:
+            response = self._lookup_memory(key, bucket, topic, now, near)
+            if response is None and self._db is not None:
+                response = self._lookup_disk(key, bucket, topic, now, near)
+            if response is None:
+                self._stats["misses"] += 1
+            return response
+
+    def set(self, message: str, agent_name: str, response: str, sampling: Sequence[Any] = (),
+            context: str = ""):
+        """Store a response for a request."""
+        key, bucket, topic = self._split_key(message, agent_name, sampling, context)
+        now = time.time()
+        expires_at = now + self.ttl
+
+        with self._lock:
+            self._remember(key, response, expires_at, bucket, topic)
+            if self._db is None:
+                return
+
+            self._db.execute(
+                "INSERT OR REPLACE INTO response_cache (key, bucket, topic, response, expires_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, bucket, topic, response, expires_at, now),
+            )
+            # Drop expired rows, then the least recently used beyond the disk limit
+            self._db.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+            self._db.execute(
+                "DELETE FROM response_cache WHERE key IN ("
+                "SELECT key FROM response_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,),
+            )
+            self._db.commit()
+
+    async def get_async(self, message: str, agent_name: str, sampling: Sequence[Any] = (),
+                        context: str = "", near: bool = True) -> Optional[str]:
+        """get() on a worker thread, so SQLite reads never block the event loop."""
+        return await asyncio.to_thread(self.get, message, agent_name, sampling, context, near)
+
+    async def set_async(self, message: str, agent_name: str, response: str, sampling: Sequence[Any] = (),
+                        context: str = ""):
+        """set() on a worker thread, so SQLite writes never block the event loop."""
+        await asyncio.to_thread(self.set, message, agent_name, response, sampling, context)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache hit/miss counters."""
+        with self._lock:
+            return dict(self._stats, entries=len(self._memory))
+
+
+def is_cacheable(response: str) -> bool:
+    """Only successful generations are worth caching."""
+    return bool(response) and not response.startswith("Error:") and response != NO_RESPONSE
+
+
+# Global instance shared by the model client and servers
+response_cache = ResponseCache() if config.RESPONSE_CACHE_ENABLED else None
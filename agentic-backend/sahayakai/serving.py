@@ -0,0 +1,41 @@
+"""
+Server launcher for Sahayak AI
+Runs a FastAPI app with uvicorn in development (single process, reload) or
+production (several worker processes, graceful shutdown) mode
+"""
+
+import os
+import uvicorn
+from . import config
+
+
+def worker_count() -> int:
+    """Number of worker processes; 0 means one per CPU core."""
+    if config.SERVER_WORKERS > 0:
+        return config.SERVER_WORKERS
+    return os.cpu_count() or 1
+
+
+def run_server(app_path: str, default_port: int = 8000, reload: bool = False):
+    """
+    Launch app_path ("module:app") with uvicorn.
+    Production mode (SERVER_MODE=production) runs worker_count() processes.
+    Shared state (conversations, response cache) lives in SQLite, so workers
+    see the same data. Reload is only used for a single development process.
+    """
+    host = os.getenv("HOST", "0.0.0.0")
+    port = int(os.getenv("PORT", str(default_port)))
+    production = config.SERVER_MODE == "production"
+    workers = worker_count() if production else 1
+
+    print(f"Mode: {'production' if production else 'development'} ({workers} worker{'s' if workers > 1 else ''})")
+
+    uvicorn.run(
+        app_path,
+        host=host,
+        port=port,
+        workers=workers,
+        reload=reload and not production,
+        timeout_graceful_shutdown=config.SERVER_GRACEFUL_SHUTDOWN_TIMEOUT,
+        log_level="info"
+    )
@@ -0,0 +1,176 @@
+"""
+Request Coalescing for Sahayak AI
+Identical requests that arrive while one is already generating wait for that
+generation instead of starting their own; streaming subscribers share one
+stream, replayed from the start for late joiners
+"""
+
+import re
+import asyncio
+import hashlib
+import threading
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def flight_key(*parts: Any) -> str:
+    """Key for a request: case- and whitespace-insensitive text plus parameters."""
+    text = "\x1f".join(WHITESPACE.sub(" ", str(part)).strip().casefold() for part in parts)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class _Call:
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.waiters = 0
+
+
+class _SyncCall:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _StreamFlight:
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.changed = asyncio.Event()
+
+    def notify(self):
+        # Wake current waiters; later waiters wait on a fresh event
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls by key. The first caller (leader) runs the
+    work; callers arriving before it finishes get the same result. The work
+    is cancelled once every caller has given up. Results are not kept
+    afterwards; that is the response cache's job.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self._sync_calls: Dict[str, _SyncCall] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "coalesced": 0, "streams": 0, "stream_subscribers_coalesced": 0}
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    async def do(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        """Run work() once for all concurrent callers with this key."""
+        call = self._calls.get(key)
+        if call is None:
+            self._count("calls")
+            call = self._calls[key] = _Call(asyncio.ensure_future(work()))
+            call.future.add_done_callback(lambda done: self._calls.pop(key, None) if self._calls.get(key) is call else None)
+        else:
+            self._count("coalesced")
+
+        call.waiters += 1
+        try:
+            # A caller that gives up must not cancel the generation others wait on
+            return await asyncio.shield(call.future)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.future.done():
+                # Nobody is waiting any more; stop generating
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                call.future.cancel()
+
+    def do_sync(self, key: str, work: Callable[[], Any]) -> Any:
+        """Blocking variant of do() for callers on worker threads."""
+        with self._lock:
+            call = self._sync_calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._sync_calls[key] = _SyncCall()
+                self._stats["calls"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if leader:
+            try:
+                call.result = work()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._sync_calls[key]
+                call.event.set()
+        else:
+            call.event.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def stream(self, key: str, work: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Yield the chunks of work() for every concurrent subscriber with this key.
+        The underlying stream is closed once the last subscriber leaves.
+        """
+        flight = self._streams.get(key)
+        if flight is None:
+            self._count("streams")
+            flight = self._streams[key] = _StreamFlight()
+            flight.task = asyncio.ensure_future(self._produce(key, flight, work))
+        else:
+            self._count("stream_subscribers_coalesced")
+
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(flight.chunks):
+                    index += 1
+                    yield flight.chunks[index - 1]
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is listening any more; stop generating
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+                flight.task.cancel()
+
+    async def _produce(self, key: str, flight: _StreamFlight, work: Callable[[], AsyncIterator[str]]):
+        try:
+            async with aclosing(work()) as chunks:
+                async for chunk in chunks:
+                    flight.chunks.append(chunk)
+                    flight.notify()
+        except asyncio.CancelledError:
+            flight.error = Exception("Generation cancelled")
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            flight.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        """Leader and coalesced counts; coalesced calls cost no generation."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["in_flight"] = len(self._calls) + len(self._sync_calls) + len(self._streams)
+        stats["deduplicated"] = stats["coalesced"] + stats["stream_subscribers_coalesced"]
+        return stats
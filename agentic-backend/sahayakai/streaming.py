@@ -0,0 +1,97 @@
+"""
+Streaming Responses for Sahayak AI
+Server-sent event streams whose generator is always closed, so the generation
+and admission slot behind a stream are released even when the client leaves
+before the body starts
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, AsyncIterator, Callable, Optional
+from fastapi.responses import StreamingResponse
+
+
+class PrimedStream:
+    """An async generator whose first item is already being produced"""
+
+    def __init__(self, first: asyncio.Future, stream):
+        self._first: Optional[asyncio.Future] = first
+        self._stream = stream
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self
+
+    async def __anext__(self) -> str:
+        if self._first is not None:
+            first, self._first = self._first, None
+            return await first
+        return await self._stream.__anext__()
+
+    async def aclose(self):
+        if self._first is not None and not self._first.done():
+            self._first.cancel()
+            await asyncio.gather(self._first, return_exceptions=True)
+        await self._stream.aclose()
+
+
+def signal_admitted(admit: Callable[[], AsyncContextManager], admitted: asyncio.Event) -> Callable[[], AsyncContextManager]:
+    """Wrap an admit hook so admitted is set once the request is let through."""
+    @asynccontextmanager
+    async def admit_and_signal():
+        async with admit():
+            admitted.set()
+            yield
+    return admit_and_signal
+
+
+async def prime_stream(stream, admitted: asyncio.Event) -> PrimedStream:
+    """
+    Run stream until it is admitted (see signal_admitted) or yields its first
+    item, whichever comes first. Errors raised before then (e.g. admission
+    rejections) surface here, while an error status can still be sent; after
+    that, the response can start without waiting for model output.
+    """
+    first = asyncio.ensure_future(stream.__anext__())
+    waiter = asyncio.ensure_future(admitted.wait())
+    try:
+        await asyncio.wait({first, waiter}, return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        await stream.aclose()
+        raise
+    finally:
+        waiter.cancel()
+    if first.done() and first.exception() is not None:
+        await stream.aclose()
+        first.result()
+    return PrimedStream(first, stream)
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that closes its body generator once the response is
+    over, however it ended. Starlette leaves it suspended when the client
+    disconnects, never starts it if the client left first, and (on ASGI 2.4
+    servers such as uvicorn) only notices a disconnect at the next send; a
+    generator waiting on slow work would hold its resources until then.
+    """
+
+    async def __call__(self, scope, receive, send):
+        streaming = asyncio.ensure_future(self.stream_response(send))
+        disconnected = asyncio.ensure_future(self.listen_for_disconnect(receive))
+        try:
+            await asyncio.wait({streaming, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (streaming, disconnected):
+                task.cancel()
+            await asyncio.gather(streaming, disconnected, return_exceptions=True)
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose:
+                await aclose()
+
+        if streaming.cancelled() or isinstance(streaming.exception(), OSError):
+            return  # the client went away
+        streaming.result()
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,13 @@
+import importlib
+
+
+def lazy_agent(package: str, agent_name: str):
+    """
+    Module __getattr__ for a sub-agent package: the agent is built on first
+    access, so importing the package (e.g. for its prompt) does not load ADK.
+    """
+    def __getattr__(name):
+        if name == agent_name:
+            return getattr(importlib.import_module(f"{package}.agent"), agent_name)
+        raise AttributeError(f"module {package!r} has no attribute {name!r}")
+    return __getattr__
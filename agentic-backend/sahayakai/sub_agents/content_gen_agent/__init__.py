@@ -1,4 +1,3 @@
+from .. import lazy_agent
 
-
-from .agent import content_gen_agent
- 
\ No newline at end of file
+__getattr__ = lazy_agent(__name__, "content_gen_agent")
@@ -1,2 +1,3 @@
+from .. import lazy_agent
 
-from .agent import visual_aid_agent
\ No newline at end of file
+__getattr__ = lazy_agent(__name__, "visual_aid_agent")
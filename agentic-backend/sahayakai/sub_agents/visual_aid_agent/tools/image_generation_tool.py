@@ -1,28 +1,52 @@
 from datetime import datetime
+import asyncio
 import os
 from google import genai
 from google.genai import types
 from google.adk.tools import ToolContext
-from google.cloud import storage
 from .... import config
+from ....image_cache import image_cache, image_key, artifact_name as cached_artifact_name
 
+IMAGEN_MODEL = "imagen-3.0-generate-002"
+IMAGE_SETTINGS = {
+    "number_of_images": 1,
+    "aspect_ratio": "9:16",
+    "safety_filter_level": "block_low_and_above",
+    "person_generation": "allow_adult",
+}
 
-# Only initialize the cloud client if not using local model
-if not config.USE_LOCAL_MODEL:
-    # Initialize the client with proper project configuration
-    project_id = os.getenv('GOOGLE_CLOUD_PROJECT') or config.GOOGLE_CLOUD_PROJECT
-    location = os.getenv('GOOGLE_CLOUD_LOCATION') or config.GOOGLE_CLOUD_LOCATION
 
-    if not project_id:
-        raise ValueError("GOOGLE_CLOUD_PROJECT environment variable must be set")
+_client = None
+_semaphore = None
+_semaphore_loop = None
 
-    client = genai.Client(
-        vertexai=True,
-        project=project_id,
-        location=location
-    )
-else:
-    client = None
+
+def get_client() -> genai.Client:
+    """Create the Vertex AI client on first use, so importing the agent stays cheap."""
+    global _client
+    if _client is None:
+        project_id = os.getenv('GOOGLE_CLOUD_PROJECT') or config.GOOGLE_CLOUD_PROJECT
+        location = os.getenv('GOOGLE_CLOUD_LOCATION') or config.GOOGLE_CLOUD_LOCATION
+
+        if not project_id:
+            raise ValueError("GOOGLE_CLOUD_PROJECT environment variable must be set")
+
+        _client = genai.Client(
+            vertexai=True,
+            project=project_id,
+            location=location
+        )
+    return _client
+
+
+def get_semaphore() -> asyncio.Semaphore:
+    """Per-process cap on in-flight Imagen calls, bound to the running event loop."""
+    global _semaphore, _semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _semaphore is None or _semaphore_loop is not loop:
+        _semaphore = asyncio.Semaphore(config.IMAGE_GENERATION_MAX_CONCURRENCY)
+        _semaphore_loop = loop
+    return _semaphore
 
 
 async def generate_images(imagen_prompt: str, tool_context: ToolContext):
@@ -32,28 +56,38 @@ async def generate_images(imagen_prompt: str, tool_context: ToolContext):
     if config.USE_LOCAL_MODEL:
         return await generate_local_visual_aid(imagen_prompt, tool_context)
     
-    # Original cloud-based image generation
     try:
-        response = client.models.generate_images(
-            model="imagen-3.0-generate-002",
-            prompt=imagen_prompt,
-            config=types.GenerateImagesConfig(
-                number_of_images=1,
-                aspect_ratio="9:16",
-                safety_filter_level="block_low_and_above",
-                person_generation="allow_adult",
-            ),
-        )
+        # Identical prompt and settings -> the same image, served from the cache
+        key = image_key(imagen_prompt, IMAGEN_MODEL, IMAGE_SETTINGS)
+        artifact_name = cached_artifact_name(key)
+        if image_cache:
+            cached_bytes = await asyncio.to_thread(image_cache.get, key)
+            if cached_bytes is not None:
+                await tool_context.save_artifact(
+                    artifact_name, types.Part.from_bytes(data=cached_bytes, mime_type="image/png")
+                )
+                return {
+                    "status": "success",
+                    "message": f"Image served from cache.  ADK artifact: {artifact_name}.",
+                    "artifact_name": artifact_name,
+                    "cached": True,
+                }
+
+        # Original cloud-based image generation, on the async client so the
+        # Imagen round trip doesn't block other requests
+        async with get_semaphore():
+            response = await get_client().aio.models.generate_images(
+                model=IMAGEN_MODEL,
+                prompt=imagen_prompt,
+                config=types.GenerateImagesConfig(**IMAGE_SETTINGS),
+            )
         generated_image_paths = []
         if response.generated_images is not None:
             for generated_image in response.generated_images:
                 # Get the image bytes
                 image_bytes = generated_image.image.image_bytes
-                counter = str(tool_context.state.get("loop_iteration", 0))
-                artifact_name = f"generated_image_" + counter + ".png"
-                # call save to gcs function
-                #if config.GCS_BUCKET_NAME:
-                    #save_to_gcs(tool_context, image_bytes, artifact_name, counter)
+                if image_cache:
+                    await asyncio.to_thread(image_cache.set, key, image_bytes)
 
                 # Save as ADK artifact (optional, if still needed by other ADK components)
                 report_artifact = types.Part.from_bytes(
@@ -67,6 +101,7 @@ async def generate_images(imagen_prompt: str, tool_context: ToolContext):
                     "status": "success",
                     "message": f"Image generated .  ADK artifact: {artifact_name}.",
                     "artifact_name": artifact_name,
+                    "cached": False,
                 }
         else:
             # model_dump_json might not exist or be the best way to get error details
@@ -159,58 +194,12 @@ This visual aid has been optimized for offline classroom use in rural Indian sch
             "message": f"Failed to generate visual aid instructions: {str(e)}"
         }
 
-    try:
-
-        response = client.models.generate_images(
-            model="imagen-3.0-generate-002",
-            prompt=imagen_prompt,
-            config=types.GenerateImagesConfig(
-                number_of_images=1,
-                aspect_ratio="9:16",
-                safety_filter_level="block_low_and_above",
-                person_generation="allow_adult",
-            ),
-        )
-        generated_image_paths = []
-        if response.generated_images is not None:
-            for generated_image in response.generated_images:
-                # Get the image bytes
-                image_bytes = generated_image.image.image_bytes
-                counter = str(tool_context.state.get("loop_iteration", 0))
-                artifact_name = f"generated_image_" + counter + ".png"
-                # call save to gcs function
-                #if config.GCS_BUCKET_NAME:
-                    #save_to_gcs(tool_context, image_bytes, artifact_name, counter)
-
-                # Save as ADK artifact (optional, if still needed by other ADK components)
-                report_artifact = types.Part.from_bytes(
-                    data=image_bytes, mime_type="image/png"
-                )
-
-                await tool_context.save_artifact(artifact_name, report_artifact)
-                print(f"Image also saved as ADK artifact: {artifact_name}")
-
-                return {
-                    "status": "success",
-                    "message": f"Image generated .  ADK artifact: {artifact_name}.",
-                    "artifact_name": artifact_name,
-                }
-        else:
-            # model_dump_json might not exist or be the best way to get error details
-            error_details = str(response)  # Or a more specific error field if available
-            print(f"No images generated. Response: {error_details}")
-            return {
-                "status": "error",
-                "message": f"No images generated. Response: {error_details}",
-            }
-
-    except Exception as e:
-
-        return {"status": "error", "message": f"No images generated. {e}"}
-
 
 def save_to_gcs(tool_context: ToolContext, image_bytes, filename: str, counter: str):
     # --- Save to GCS ---
+    # Imported here so local mode never loads the Cloud Storage SDK
+    from google.cloud import storage
+
     storage_client = storage.Client()  # Initialize GCS client
     bucket_name = config.GCS_BUCKET_NAME
 
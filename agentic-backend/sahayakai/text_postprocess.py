@@ -0,0 +1,166 @@
+"""
+Output Post-processing for Sahayak AI
+Cleans raw model output (turn markers, role echoes, repeated lines, trailing
+sentence fragments) in a single pass that can also consume streamed chunks,
+and tells a streaming caller when to stop generating
+"""
+
+import re
+from typing import List, Optional
+
+# Gemma turn markers; they never span a line break
+TURN_MARKERS = re.compile(r"<(?:start|end)_of_turn>")
+
+# Lines where the model starts writing the next speaker's turn
+ROLE_ECHO = re.compile(r"\[User|User |\[Assistant|(?:User|Assistant):$")
+
+MAX_LINES = 3
+MIN_LINE_LENGTH = 6
+NO_RESPONSE = "No response generated"
+
+# Generation is looping once kept lines come back this many times in a row...
+MAX_REPEATED_LINES = 3
+# ...or the current line ends in the same 4-200 characters repeated over at
+# least 48 characters (three times at minimum)
+LOOP_MIN_PERIOD = 4
+LOOP_MAX_PERIOD = 200
+LOOP_MIN_SPAN = 48
+LOOP_CHECK_INTERVAL = 16
+
+
+def complete_sentences(text: str) -> str:
+    """Drop a trailing incomplete sentence, if the text has more than one."""
+    if text.endswith(('.', '!', '?')):
+        return text
+    cut = text.rfind('. ')
+    return text[:cut] + '.' if cut != -1 else text
+
+
+def find_loop(text: str) -> int:
+    """
+    If text ends in a repeating block, return the index where its second copy
+    starts (text[:index] keeps the first copy); otherwise -1.
+    """
+    n = len(text)
+    if n < LOOP_MIN_SPAN:
+        return -1
+    last = text[-1]
+    # Only periods where the final character recurs can repeat
+    pos = text.rfind(last, 0, n - 1)
+    while pos != -1:
+        period = n - 1 - pos
+        if period > LOOP_MAX_PERIOD or period * 3 > n:
+            break
+        if period >= LOOP_MIN_PERIOD:
+            repeats = max(3, -(-LOOP_MIN_SPAN // period))
+            if period * repeats <= n and text[n - period * repeats:] == text[n - period:] * repeats:
+                # Walk back to where the loop began so the kept copy is a whole one
+                start = n - period * repeats
+                while start > 0 and text[start - 1] == text[start - 1 + period]:
+                    start -= 1
+                return start + period
+        pos = text.rfind(last, 0, pos)
+    return -1
+
+
+class OutputCleaner:
+    """
+    Incremental cleaner: feed() processes each completed line as it arrives and
+    keeps the first max_lines distinct, non-trivial lines. Once `done` is set
+    (enough lines, or the output is looping; see `stop_reason`) the rest of
+    the output cannot change the result, so callers should stop generating.
+    finish() only handles the final partial line.
+    """
+
+    def __init__(self, max_lines: int = MAX_LINES):
+        self.max_lines = max_lines
+        self.lines: List[str] = []
+        self.done = False
+        self.stop_reason: Optional[str] = None  # "max_lines" | "repetition"
+        self._seen = set()
+        self._repeated_lines = 0
+        self._tail = ""
+        self._tail_checked = 0
+        self._line_count = 0
+        # Kept only for the fallback when no line qualifies
+        self._first_paragraph: List[str] = []
+        self._paragraph_closed = False
+
+    def feed(self, chunk: str) -> bool:
+        """Consume a chunk of generated text; returns True once the result is settled."""
+        if self.done:
+            return True
+        self._tail += chunk
+        if "\n" in chunk:
+            text, start = self._tail, 0
+            while not self.done:
+                end = text.find("\n", start)
+                if end == -1:
+                    break
+                self._add_line(text[start:end], terminated=True)
+                start = end + 1
+            self._tail = "" if self.done else text[start:]
+            self._tail_checked = 0
+
+        if not self.done and len(self._tail) - self._tail_checked >= LOOP_CHECK_INTERVAL:
+            # A single line can loop forever without producing a newline
+            self._tail_checked = len(self._tail)
+            cut = find_loop(self._tail)
+            if cut != -1:
+                self._add_line(self._tail[:cut], terminated=False)
+                self._tail = ""
+                self._stop("repetition")
+        return self.done
+
+    def _stop(self, reason: str):
+        if not self.done:
+            self.done = True
+            self.stop_reason = reason
+
+    def _add_line(self, line: str, terminated: bool):
+        line = TURN_MARKERS.sub("", line) if "<" in line else line
+
+        if not self._paragraph_closed:
+            # A blank line (other than the first) ends the first paragraph
+            if line == "" and terminated and self._line_count > 0:
+                self._paragraph_closed = True
+            else:
+                self._first_paragraph.append(line)
+        self._line_count += 1
+
+        line = line.strip()
+        if line in self._seen:
+            self._repeated_lines += 1
+            if self._repeated_lines >= MAX_REPEATED_LINES:
+                self._stop("repetition")
+        elif len(line) >= MIN_LINE_LENGTH and not ROLE_ECHO.match(line):
+            self.lines.append(line)
+            self._seen.add(line)
+            self._repeated_lines = 0
+            if len(self.lines) >= self.max_lines:
+                self._stop("max_lines")
+
+    def finish(self) -> str:
+        """Return the cleaned text."""
+        if not self.done and self._tail:
+            self._add_line(self._tail, terminated=False)
+            self._tail = ""
+
+        if self.lines:
+            return complete_sentences(' '.join(self.lines)).strip()
+        # Fallback: the first paragraph, trimmed to complete sentences
+        return complete_sentences("\n".join(self._first_paragraph).strip())
+
+
+def clean_generated_text(prompt: str, generated_text: str) -> str:
+    """Strip prompt echo, turn markers and repeated lines from a complete model output."""
+    if not generated_text:
+        return NO_RESPONSE
+
+    # Remove the original prompt if it's echoed back
+    if generated_text.startswith(prompt):
+        generated_text = generated_text[len(prompt):].strip()
+
+    cleaner = OutputCleaner()
+    cleaner.feed(generated_text)
+    return cleaner.finish()
@@ -1,11 +1,25 @@
 
+import asyncio
+import importlib
 
 from google.adk.tools import ToolContext
 from google.adk.tools.agent_tool import AgentTool
 
-from .sub_agents.content_gen_agent import content_gen_agent
-from .sub_agents.visual_aid_agent import visual_aid_agent
 
+CONTENT_GEN_AGENT = "content_gen_agent"
+VISUAL_AID_AGENT = "visual_aid_agent"
+
+# AgentTool holds no per-call state, so each wrapper is built once, on first
+# use, and reused; sub-agents (and the image client) load only when needed
+AGENT_TOOLS = {}
+
+
+def get_agent_tool(agent_name: str) -> AgentTool:
+    """Return the shared AgentTool for a sub-agent."""
+    if agent_name not in AGENT_TOOLS:
+        package = importlib.import_module(f".sub_agents.{agent_name}", __package__)
+        AGENT_TOOLS[agent_name] = AgentTool(agent=getattr(package, agent_name))
+    return AGENT_TOOLS[agent_name]
 
 
 async def call_content_gen_agent(
@@ -14,7 +28,7 @@ async def call_content_gen_agent(
 ):
     """Tool to call content generation agent."""
 
-    agent_tool = AgentTool(agent=content_gen_agent)
+    agent_tool = get_agent_tool(CONTENT_GEN_AGENT)
 
     content_gen_result = await agent_tool.run_async(
         args={"request": question}, tool_context=tool_context
@@ -29,10 +43,45 @@ async def call_visual_aid_agent(
 ):
     """Tool to call visual aid agent."""
 
-    agent_tool = AgentTool(agent=visual_aid_agent)
+    agent_tool = get_agent_tool(VISUAL_AID_AGENT)
 
     visual_aid_agent_output = await agent_tool.run_async(
         args={"request": question}, tool_context=tool_context
     )
     tool_context.state["visual_aid_agent_output"] = visual_aid_agent_output
-    return visual_aid_agent_output
\ No newline at end of file
+    return visual_aid_agent_output
+
+
+async def call_content_and_visual_aid_agents(
+    question: str,
+    tool_context: ToolContext,
+):
+    """Tool to call content generation and visual aid agents concurrently.
+
+    Use this when a request needs both lesson content and a visual aid, so
+    the teacher waits for the slower agent instead of both in turn.
+    """
+
+    content_gen_tool = get_agent_tool(CONTENT_GEN_AGENT)
+    visual_aid_tool = get_agent_tool(VISUAL_AID_AGENT)
+
+    content_gen_result, visual_aid_result = await asyncio.gather(
+        content_gen_tool.run_async(
+            args={"request": question}, tool_context=tool_context
+        ),
+        visual_aid_tool.run_async(
+            args={"request": question}, tool_context=tool_context
+        ),
+        return_exceptions=True,
+    )
+
+    outputs = {}
+    for key, result in (
+        ("content_gen_agent_output", content_gen_result),
+        ("visual_aid_agent_output", visual_aid_result),
+    ):
+        if isinstance(result, Exception):
+            result = {"status": "error", "message": str(result)}
+        tool_context.state[key] = result
+        outputs[key] = result
+    return outputs
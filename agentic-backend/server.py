@@ -6,20 +6,35 @@ This server runs the agent locally and provides endpoints for interaction.
 
 import os
 import asyncio
-from typing import Any, Dict, Optional, AsyncGenerator
-from fastapi import FastAPI, HTTPException
+import functools
+from typing import Any, AsyncContextManager, AsyncGenerator, Callable, Dict, Optional
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
-import uvicorn
 import json
+from contextlib import aclosing, nullcontext
 
 # Load environment variables
 load_dotenv()
 
-# Import the root agent
-from sahayakai.agent import root_agent
+from sahayakai import config
+from sahayakai.local_model_client import TransformerLabClient
+from sahayakai.response_cache import response_cache, is_cacheable
+from sahayakai.image_cache import image_cache
+from sahayakai.single_flight import SingleFlight, flight_key
+from sahayakai.admission import (
+    AdmissionController, AdmissionRejected, rejection_response, request_tenant, request_priority
+)
+from sahayakai.conversation_store import ConversationStore
+from sahayakai.job_store import JobStore, FINISHED, SUCCEEDED
+from sahayakai.job_runner import JobRunner
+from sahayakai.prompt_templates import agent_prompts
+from sahayakai.text_postprocess import OutputCleaner, NO_RESPONSE
+from sahayakai.streaming import ClosingStreamingResponse, prime_stream, signal_admitted
+from sahayakai.fair_queue import BATCH
+from sahayakai.serving import run_server
 
 app = FastAPI(
     title="Sahayak AI Agent Server",
@@ -41,30 +56,132 @@ class ChatRequest(BaseModel):
     message: str
     conversation_id: Optional[str] = None
     stream: bool = False
+    # Fair scheduling: tenant (as sent by the Streamlit client) and "interactive" or "batch"
+    userId: Optional[str] = None
+    priority: str = "interactive"
 
 class ChatResponse(BaseModel):
     response: str
     conversation_id: str
     status: str = "success"
 
+class JobRequest(BaseModel):
+    message: str
+    kind: str = "lesson_package"
+    conversation_id: Optional[str] = None
+    userId: Optional[str] = None
+
 class HealthResponse(BaseModel):
     status: str
-    agent_name: str
-    model: str
-
-# Global conversation storage (in production, use a proper database)
-conversations: Dict[str, list] = {}
+    agent_ready: bool
+    agent_name: Optional[str] = None
+    model: Optional[str] = None
+    image_cache: Optional[Dict[str, Any]] = None
+    coalescing: Optional[Dict[str, Any]] = None
+    admission: Optional[Dict[str, Any]] = None
+    jobs: Optional[Dict[str, Any]] = None
+
+@functools.lru_cache(maxsize=None)
+def get_root_agent():
+    """Import the ADK root agent on first use; the local streaming path never needs it."""
+    from sahayakai.agent import root_agent
+    return root_agent
+
+async def load_root_agent():
+    """get_root_agent() on a worker thread; the first call imports ADK, which takes seconds"""
+    return await asyncio.to_thread(get_root_agent)
+
+def root_agent_loaded() -> bool:
+    return get_root_agent.cache_info().currsize > 0
+
+# Conversation history persisted in SQLite so it survives restarts and is shared by workers
+conversation_store = ConversationStore()
+
+# Bounds agent runs in progress; excess requests get 429 with Retry-After
+admission = AdmissionController("Sahayak agent")
+
+# Response cache and coalescing key for root agent runs; a constant so that
+# keying a request never imports ADK
+ROOT_AGENT_NAME = "sahayak_agent"
+
+# Identical teacher messages in flight together share one agent run
+agent_flights = SingleFlight("agent") if config.REQUEST_COALESCING else None
+
+# Local model client used for token streaming when running offline
+local_client = TransformerLabClient() if config.USE_LOCAL_MODEL else None
+
+@app.on_event("startup")
+async def preload_root_agent():
+    """Load the agent in the background so startup does not wait for ADK"""
+    if not config.USE_LOCAL_MODEL:
+        asyncio.get_running_loop().run_in_executor(None, get_root_agent)
+
+@app.on_event("startup")
+async def start_job_runner():
+    """Pick up queued jobs, including ones left by a stopped worker"""
+    job_runner.start()
+
+@app.on_event("shutdown")
+async def close_resources():
+    """Release pooled connections to Transformer Lab and the conversation and job databases"""
+    await job_runner.stop()
+    if local_client:
+        await local_client.aclose()
+    conversation_store.close()
+    job_store.close()
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request, error: AdmissionRejected):
+    return rejection_response(error)
+
+def sse_event(payload: Dict[str, Any]) -> str:
+    """Format a payload as a server-sent event."""
+    return f"data: {json.dumps(payload)}\n\n"
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; reports whether the agent is loaded without loading it"""
+    agent = get_root_agent() if root_agent_loaded() else None
     return HealthResponse(
         status="healthy",
-        agent_name=root_agent.name,
-        model=str(root_agent.model)  # Convert to string to handle BaseLlm types
+        agent_ready=agent is not None,
+        agent_name=agent.name if agent else None,
+        model=str(agent.model) if agent else None,  # Convert to string to handle BaseLlm types
+        image_cache=image_cache.stats() if image_cache else None,
+        coalescing=agent_flights.stats() if agent_flights else None,
+        admission=admission.metrics(),
+        jobs=job_runner.metrics()
     )
 
-async def invoke_agent(message: str, conversation_id: str) -> str:
+async def invoke_agent(message: str, conversation_id: str,
+                       admit: Optional[Callable[[], AsyncContextManager]] = None) -> str:
+    """Invoke the agent, serving repeated teacher requests from the response cache
+    and sharing one run between identical requests in flight together. Only a
+    run this call starts goes through admit (admission control)."""
+    if response_cache:
+        cached = await response_cache.get_async(message, ROOT_AGENT_NAME)
+        if cached is not None:
+            return cached
+    
+    async def run() -> str:
+        async with admit() if admit else nullcontext():
+            return await run_and_cache(message, conversation_id)
+    
+    if agent_flights:
+        # Keyed like the response cache (message and agent, not conversation)
+        key = flight_key(ROOT_AGENT_NAME, message)
+        return await agent_flights.do(key, run)
+    return await run()
+
+async def run_and_cache(message: str, conversation_id: str) -> str:
+    """Run the agent and cache a successful response."""
+    agent_response = await run_root_agent(message, conversation_id)
+    
+    if response_cache and is_cacheable(agent_response) and not agent_response.startswith("Agent processing error"):
+        await response_cache.set_async(message, ROOT_AGENT_NAME, agent_response)
+    return agent_response
+
+async def run_root_agent(message: str, conversation_id: str) -> str:
     """
     Invoke the ADK agent with a simplified approach.
     This is a placeholder implementation - you'll need to implement proper ADK integration.
@@ -143,32 +260,25 @@ async def invoke_agent(message: str, conversation_id: str) -> str:
         return f"Agent processing error: {str(e)}. Please try again."
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat_with_agent(request: ChatRequest):
+async def chat_with_agent(request: ChatRequest, http_request: Request):
     """
     Send a message to the Sahayak agent and get a response.
     """
+    tenant = request_tenant(http_request, request.userId)
+    priority = request_priority(http_request, request.priority)
     try:
         # Generate conversation ID if not provided
-        conversation_id = request.conversation_id or f"conv_{len(conversations)}"
+        conversation_id = request.conversation_id or conversation_store.new_conversation_id()
         
-        # Initialize conversation if new
-        if conversation_id not in conversations:
-            conversations[conversation_id] = []
+        # Invoke the agent; requests joining an identical run take no admission slot
+        agent_response = await invoke_agent(request.message, conversation_id,
+                                             admit=lambda: admission.admit(tenant, priority))
         
-        # Add user message to conversation
-        conversations[conversation_id].append({
-            "role": "user",
-            "content": request.message
-        })
-        
-        # Invoke the agent
-        agent_response = await invoke_agent(request.message, conversation_id)
-        
-        # Add agent response to conversation
-        conversations[conversation_id].append({
-            "role": "assistant", 
-            "content": agent_response
-        })
+        # Store the user message and agent response in one write
+        await conversation_store.append_messages_async(conversation_id, [
+            {"role": "user", "content": request.message},
+            {"role": "assistant", "content": agent_response}
+        ])
         
         return ChatResponse(
             response=agent_response,
@@ -176,83 +286,233 @@ async def chat_with_agent(request: ChatRequest):
             status="success"
         )
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
-async def stream_agent_response(message: str, conversation_id: str) -> AsyncGenerator[str, None]:
-    """Stream agent response for real-time interaction."""
+async def stream_agent_response(message: str, conversation_id: str,
+                                admit: Callable[[], AsyncContextManager]) -> AsyncGenerator[str, None]:
+    """
+    Stream agent response for real-time interaction. Chunks are the raw
+    model tokens; the done event carries the cleaned response, which is what
+    gets stored and what clients should keep. An admission rejection is
+    raised, not sent, as it comes before the first event.
+    """
     try:
-        # Get the full response
-        full_response = await invoke_agent(message, conversation_id)
-        
-        # Stream it word by word for demonstration
-        words = full_response.split()
-        for i, word in enumerate(words):
-            chunk = word + " "
-            yield f"data: {json.dumps({'chunk': chunk, 'conversation_id': conversation_id})}\n\n"
-            await asyncio.sleep(0.1)  # Small delay for streaming effect
+        if local_client:
+            # Forward tokens from the local model as soon as they are generated;
+            # generation stops once the output loops or has enough lines
+            messages = await conversation_store.get_messages_async(conversation_id)
+            messages.append({"role": "user", "content": message})
+            cleaner = OutputCleaner()
+            stream = local_client.stream_until_settled_async(
+                local_client.chat_completion_stream_async(messages, admit=admit), cleaner
+            )
+            async with aclosing(stream) as chunks:
+                async for chunk in chunks:
+                    yield sse_event({'chunk': chunk, 'conversation_id': conversation_id})
+            response = cleaner.finish() or NO_RESPONSE
+        else:
+            response = await invoke_agent(message, conversation_id, admit=admit)
+            yield sse_event({'chunk': response, 'conversation_id': conversation_id})
         
-        yield f"data: {json.dumps({'done': True, 'conversation_id': conversation_id})}\n\n"
+        await conversation_store.append_messages_async(conversation_id, [
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": response}
+        ])
+        yield sse_event({'done': True, 'response': response, 'conversation_id': conversation_id})
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
-        yield f"data: {json.dumps({'error': str(e), 'conversation_id': conversation_id})}\n\n"
+        yield sse_event({'error': str(e), 'conversation_id': conversation_id})
 
 @app.post("/chat/stream")
-async def chat_stream(request: ChatRequest):
+async def chat_stream(request: ChatRequest, http_request: Request):
     """Stream chat responses from the agent."""
-    conversation_id = request.conversation_id or f"conv_{len(conversations)}"
-    
-    if conversation_id not in conversations:
-        conversations[conversation_id] = []
+    conversation_id = request.conversation_id or conversation_store.new_conversation_id()
+    tenant = request_tenant(http_request, request.userId)
+    priority = request_priority(http_request, request.priority)
     
-    conversations[conversation_id].append({
-        "role": "user",
-        "content": request.message
-    })
-    
-    return StreamingResponse(
-        stream_agent_response(request.message, conversation_id),
+    # A stream that starts a generation holds an admission slot until the
+    # generation ends; one that joins an identical stream in flight holds none.
+    # Responding only once admitted (or once output arrives) keeps rejections a 429.
+    admitted = asyncio.Event()
+    admit = signal_admitted(lambda: admission.admit(tenant, priority), admitted)
+    events = await prime_stream(stream_agent_response(request.message, conversation_id, admit), admitted)
+    # Closes the stream (releasing the slot) even if the client left before the body started
+    return ClosingStreamingResponse(
+        events,
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
         }
     )
 
+# Specialists that contribute a section to a lesson package, in package order
+LESSON_PACKAGE_SECTIONS = {
+    "story_agent": "Story",
+    "worksheet_agent": "Worksheet",
+    "visual_aid_agent": "Visual Aid",
+}
+
+async def run_lesson_package(payload: Dict[str, Any], progress) -> Dict[str, Any]:
+    """
+    Job handler for a full lesson package. With the local model the specialists
+    run in parallel (as batch traffic, behind interactive requests) and their
+    sections are joined; if one fails the others are cancelled. In cloud mode
+    the root agent produces the package.
+    """
+    message, tenant = payload["message"], payload["tenant"]
+    
+    if not local_client:
+        progress("sahayak_agent", "running")
+        conversation_id = payload.get("conversation_id") or conversation_store.new_conversation_id()
+        response = await invoke_agent(message, conversation_id,
+                                      admit=lambda: admission.admit(tenant, BATCH, retry=True))
+        progress("sahayak_agent", "completed")
+        return {"package": response, "sections": {"sahayak_agent": response}}
+    
+    async def section(agent_name: str) -> str:
+        progress(agent_name, "running")
+        template = agent_prompts.get(agent_name)
+        try:
+            text = await local_client.generate_text_async(
+                prompt=template.render(message=message),
+                max_tokens=512,
+                temperature=0.7,
+                cache_message=message,
+                agent_name=agent_name,
+                cache_prefix=template.static_prefix,
+                admit=lambda: admission.admit(tenant, BATCH, retry=True)
+            )
+        except Exception as e:
+            text = f"Error: {str(e)}"
+        if text.startswith("Error:"):
+            progress(agent_name, "failed", text)
+            raise Exception(f"{agent_name}: {text}")
+        progress(agent_name, "completed")
+        return text
+    
+    tasks = {agent_name: asyncio.create_task(section(agent_name)) for agent_name in LESSON_PACKAGE_SECTIONS}
+    try:
+        done, _ = await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()  # re-raises a failed section
+        sections = {agent_name: task.result() for agent_name, task in tasks.items()}
+    finally:
+        # A failed section fails the package: stop generating the others
+        for agent_name, task in tasks.items():
+            if not task.done():
+                task.cancel()
+                progress(agent_name, "cancelled")
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+    
+    package = "\n\n".join(
+        f"## {title}\n\n{sections[agent_name]}" for agent_name, title in LESSON_PACKAGE_SECTIONS.items()
+    )
+    return {"package": f"# Lesson Package: {message}\n\n{package}", "sections": sections}
+
+# Long-running generations run as durable background jobs instead of holding a request open
+job_store = JobStore()
+job_runner = JobRunner(job_store, {"lesson_package": run_lesson_package})
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "attempts": job["attempts"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "finished_at": job["finished_at"],
+        "expires_at": job["expires_at"],
+        "status_url": f"/jobs/{job['id']}",
+        "events_url": f"/jobs/{job['id']}/events",
+        "result_url": f"/jobs/{job['id']}/result",
+    }
+
+def get_job_or_404(job_id: str) -> Dict[str, Any]:
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest, http_request: Request):
+    """Submit a long generation (e.g. a lesson package); poll the returned URLs for progress and the result"""
+    try:
+        job = job_runner.submit(request.kind, {
+            "message": request.message,
+            "conversation_id": request.conversation_id,
+        }, request_tenant(http_request, request.userId))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job_status(job)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status and the latest status of each sub-agent"""
+    return job_status(get_job_or_404(job_id))
+
+@app.get("/jobs/{job_id}/events")
+async def get_job_events(job_id: str, after: int = Query(0, ge=0)):
+    """Progress events after the given event id, oldest first"""
+    job = get_job_or_404(job_id)
+    return {"job_id": job_id, "status": job["status"], "events": job_store.events(job_id, after)}
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """The finished job's result; 202 while it is still running"""
+    job = get_job_or_404(job_id)
+    if job["status"] not in FINISHED:
+        return JSONResponse(status_code=202, content=job_status(job))
+    if job["status"] != SUCCEEDED:
+        raise HTTPException(status_code=500, detail=f"Job failed: {job['error']}")
+    return {"job_id": job_id, "status": job["status"], "result": job["result"]}
+
 @app.get("/conversations/{conversation_id}")
 async def get_conversation(conversation_id: str):
     """Get conversation history"""
-    if conversation_id not in conversations:
+    if not await conversation_store.exists_async(conversation_id):
         raise HTTPException(status_code=404, detail="Conversation not found")
     
     return {
         "conversation_id": conversation_id,
-        "messages": conversations[conversation_id]
+        "messages": await conversation_store.get_messages_async(conversation_id)
     }
 
 @app.get("/conversations")
-async def list_conversations():
-    """List all conversation IDs"""
+async def list_conversations(limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0)):
+    """List conversation IDs, most recently active first"""
+    conversation_ids, total = await conversation_store.list_conversations_async(limit=limit, offset=offset)
     return {
-        "conversations": list(conversations.keys()),
-        "count": len(conversations)
+        "conversations": conversation_ids,
+        "count": total,
+        "limit": limit,
+        "offset": offset
     }
 
 @app.delete("/conversations/{conversation_id}")
 async def delete_conversation(conversation_id: str):
     """Delete a conversation"""
-    if conversation_id not in conversations:
+    if not await conversation_store.delete_conversation_async(conversation_id):
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    del conversations[conversation_id]
     return {"message": f"Conversation {conversation_id} deleted"}
 
 @app.get("/agent-info")
 async def get_agent_info():
     """Get detailed information about the agent"""
+    agent = await load_root_agent()
     return {
-        "agent_name": root_agent.name,
-        "model": str(root_agent.model),
+        "agent_name": agent.name,
+        "model": str(agent.model),
         "description": "Sahayak AI - Multi-agent system for rural classroom education",
         "capabilities": [
             "Lesson plan generation",
@@ -286,12 +546,13 @@ async def root():
     return {
         "name": "Sahayak AI Agent Server",
         "status": "running",
-        "agent": root_agent.name,
+        "agent": (await load_root_agent()).name,
         "description": "ADK-powered educational assistant for rural multi-grade classrooms",
         "endpoints": [
             "/health",
             "/chat",
             "/chat/stream", 
+            "/jobs",
             "/conversations",
             "/agent-info",
             "/docs"
@@ -304,14 +565,6 @@ if __name__ == "__main__":
     port = int(os.getenv("PORT", "8000"))
     
     print(f"Starting Sahayak AI Agent Server on {host}:{port}")
-    print(f"Agent: {root_agent.name}")
-    print(f"Model: {str(root_agent.model)}")
     print(f"API Documentation: http://{host}:{port}/docs")
     
-    uvicorn.run(
-        "server:app",
-        host=host,
-        port=port,
-        reload=True,
-        log_level="info"
-    )
+    run_server("server:app", default_port=8000, reload=True)
@@ -5,14 +5,21 @@ This server allows testing with Transformer Lab without ADK dependencies
 """
 
 import os
+import asyncio
 import requests
 import json
-from typing import Dict, Any, List
-from fastapi import FastAPI, HTTPException
+from typing import Dict, Any, List, Optional
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
-import uvicorn
+
+from sahayakai.text_postprocess import clean_generated_text
+from sahayakai.prompt_templates import agent_prompts
+from sahayakai.admission import (
+    AdmissionController, AdmissionRejected, rejection_response, request_tenant, request_priority
+)
+from sahayakai.serving import run_server
 
 # Load environment variables
 load_dotenv()
@@ -66,41 +73,7 @@ class TransformerLabClient:
             
             generated_text = result.get("text", "")
             
-            if generated_text:
-                # Clean up the response
-                if generated_text.startswith(prompt):
-                    generated_text = generated_text[len(prompt):].strip()
-                
-                # Remove artifacts and clean up repetitive content
-                lines = generated_text.split('\n')
-                unique_lines = []
-                seen_lines = set()
-                
-                for line in lines:
-                    line = line.strip()
-                    if (line and 
-                        line not in seen_lines and 
-                        len(line) > 5 and
-                        not line.startswith('[User') and 
-                        not line.startswith('User ')):
-                        
-                        unique_lines.append(line)
-                        seen_lines.add(line)
-                        
-                        if len(unique_lines) >= 3:
-                            break
-                
-                if unique_lines:
-                    result = ' '.join(unique_lines)
-                    # Ensure complete sentences
-                    sentences = result.split('. ')
-                    if len(sentences) > 1 and not sentences[-1].endswith(('.', '!', '?')):
-                        result = '. '.join(sentences[:-1]) + '.'
-                    return result.strip()
-                else:
-                    return generated_text.strip()
-            
-            return "No response generated"
+            return clean_generated_text(prompt, generated_text)
             
         except Exception as e:
             return f"Error: Could not generate response - {str(e)}"
@@ -108,6 +81,13 @@ class TransformerLabClient:
 # Initialize client
 local_client = TransformerLabClient() if USE_LOCAL_MODEL else None
 
+# Bounds generations in progress; excess requests get 429 with Retry-After
+admission = AdmissionController("Local model")
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request, error: AdmissionRejected):
+    return rejection_response(error)
+
 class ChatMessage(BaseModel):
     role: str
     content: str
@@ -116,11 +96,17 @@ class ChatRequest(BaseModel):
     messages: List[ChatMessage]
     max_tokens: int = 256
     temperature: float = 0.7
+    # Fair scheduling: tenant (as sent by the Streamlit client) and "interactive" or "batch"
+    userId: Optional[str] = None
+    priority: str = "interactive"
 
 class AgentRequest(BaseModel):
     message: str
     agent_name: str = "sahayak_agent"
     context: Dict[str, Any] = {}
+    # Fair scheduling: tenant (as sent by the Streamlit client) and "interactive" or "batch"
+    userId: Optional[str] = None
+    priority: str = "interactive"
 
 @app.get("/health")
 async def health_check():
@@ -128,15 +114,19 @@ async def health_check():
     return {
         "status": "healthy",
         "model": LOCAL_MODEL_NAME if USE_LOCAL_MODEL else "cloud",
-        "server": "local-standalone" if USE_LOCAL_MODEL else "cloud"
+        "server": "local-standalone" if USE_LOCAL_MODEL else "cloud",
+        "admission": admission.metrics()
     }
 
 @app.post("/chat")
-async def chat_completion(request: ChatRequest):
+async def chat_completion(request: ChatRequest, http_request: Request):
     """OpenAI-compatible chat completion endpoint"""
     if not local_client:
         raise HTTPException(status_code=400, detail="Local model not configured")
     
+    ticket = await admission.acquire(
+        request_tenant(http_request, request.userId), request_priority(http_request, request.priority)
+    )
     try:
         # Convert messages to a prompt
         prompt_parts = []
@@ -152,7 +142,10 @@ async def chat_completion(request: ChatRequest):
         if not prompt.endswith("Assistant:"):
             prompt += "\nAssistant:"
         
-        response = local_client.generate_text(
+        # Blocking HTTP call; run it off the event loop so admission sees
+        # concurrent requests instead of serialising them
+        response = await asyncio.to_thread(
+            local_client.generate_text,
             prompt=prompt,
             max_tokens=request.max_tokens,
             temperature=request.temperature
@@ -172,84 +165,24 @@ async def chat_completion(request: ChatRequest):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    finally:
+        admission.release(ticket)
 
 @app.post("/agent")
-async def run_agent(request: AgentRequest):
+async def run_agent(request: AgentRequest, http_request: Request):
     """Run a specific agent with local model"""
     if not local_client:
         raise HTTPException(status_code=400, detail="Local model not configured")
     
+    ticket = await admission.acquire(
+        request_tenant(http_request, request.userId), request_priority(http_request, request.priority)
+    )
     try:
-        # Create agent-specific prompts
-        if request.agent_name == "content_gen_agent":
-            prompt = f"""Task: Create educational content for rural Indian school children.
-
-Request: {request.message}
-
-Create content that is:
-- Appropriate for multi-grade classrooms
-- Simple, clear language
-- Culturally relevant to rural India
-- Practical for teachers with limited resources
-
-Content:"""
-        
-        elif request.agent_name == "story_agent":
-            prompt = f"""Task: Write a short educational story for children.
-
-Topic: {request.message}
-
-Create a story that is:
-- Age-appropriate for young students
-- Set in rural Indian context
-- Include a learning element
-- Complete with beginning, middle, and end
-
-Story:"""
-        
-        elif request.agent_name == "worksheet_agent":
-            prompt = f"""Task: Create a practice worksheet for students.
-
-Subject: {request.message}
-
-Create a worksheet with:
-- Clear title
-- Simple instructions
-- 3-5 practice problems
-- Answer spaces
-
-Worksheet:
-
-Title: _______________
-
-Instructions: _______________
-
-Problems:
-1."""
-        
-        elif request.agent_name == "visual_aid_agent":
-            prompt = f"""Task: Create step-by-step drawing instructions for teachers.
-
-Topic: {request.message}
-
-Provide detailed instructions for blackboard/whiteboard drawing:
-- Materials needed (chalk, markers, etc.)
-- Step-by-step drawing process
-- Labels and annotations to add
-- Interactive elements for students
-
-Instructions:"""
-        
-        else:  # root_agent
-            prompt = f"""You are Sahayak AI, helping rural Indian teachers.
-
-Teacher's request: {request.message}
-
-Provide practical educational advice that works in multi-grade classrooms with limited resources.
-
-Advice:"""
+        # Agent prompts are parsed once; unknown agents get the Sahayak prompt
+        prompt = agent_prompts.render(request.agent_name, message=request.message)
         
-        response = local_client.generate_text(
+        response = await asyncio.to_thread(
+            local_client.generate_text,
             prompt=prompt,
             max_tokens=512,
             temperature=0.7
@@ -265,6 +198,8 @@ Advice:"""
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Agent error: {str(e)}")
+    finally:
+        admission.release(ticket)
 
 @app.get("/agents")
 async def list_agents():
@@ -306,4 +241,6 @@ if __name__ == "__main__":
     print(f"📚 Server will run at: http://localhost:8080")
     print(f"📖 API Docs: http://localhost:8080/docs")
     
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    # Only ADK-free sahayakai modules are imported here. Admission limits are
+    # per worker process, so production mode admits up to workers x the limits.
+    run_server("standalone_dev_server:app", default_port=8080)
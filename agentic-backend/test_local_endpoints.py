@@ -3,6 +3,7 @@
 Test script to discover and test local model endpoints
 """
 
+import os
 import asyncio
 import httpx
 import json
@@ -10,7 +11,7 @@ import json
 async def test_local_model_endpoints():
     """Test various common endpoints for local LLM servers"""
     
-    base_url = "http://localhost:21002"
+    base_url = os.getenv("LOCAL_MODEL_URL", "http://localhost:21002").rstrip("/")
     
     # Common endpoints to test
     endpoints = [
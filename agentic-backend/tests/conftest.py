@@ -0,0 +1,6 @@
+import os
+
+# Module-level caches are created on import; keep them out of the working tree
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+os.environ.setdefault("IMAGE_CACHE_ENABLED", "false")
+os.environ.setdefault("USE_LOCAL_MODEL", "false")
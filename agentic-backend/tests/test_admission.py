@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from sahayakai.admission import AdmissionController, AdmissionRejected
+from sahayakai.fair_queue import BATCH, INTERACTIVE, FairQueue
+
+
+def make_controller(**kwargs) -> AdmissionController:
+    settings = dict(name="test", max_in_flight=1, max_queue=4, queue_timeout=1,
+                    tenant_max_in_flight=1, tenant_max_queue=4, tenant_weights={})
+    settings.update(kwargs)
+    return AdmissionController(**settings)
+
+
+def drain(queue: FairQueue):
+    order = []
+    while (request := queue.pop(lambda tenant: True)) is not None:
+        order.append(request.tenant)
+    return order
+
+
+# Fair queue
+
+def test_tenants_take_turns_however_much_each_queued():
+    queue = FairQueue()
+    for _ in range(4):
+        queue.push("bulk", INTERACTIVE, None)
+    queue.push("teacher", INTERACTIVE, None)
+    assert drain(queue) == ["bulk", "teacher", "bulk", "bulk", "bulk"]
+
+
+def test_weights_set_each_tenants_share():
+    queue = FairQueue({"district": 2.0})
+    for _ in range(4):
+        queue.push("district", INTERACTIVE, None)
+        queue.push("school", INTERACTIVE, None)
+    served = drain(queue)[:6]
+    assert served.count("district") == 4 and served.count("school") == 2
+
+
+def test_interactive_before_batch():
+    queue = FairQueue()
+    queue.push("a", BATCH, None)
+    queue.push("b", INTERACTIVE, None)
+    assert drain(queue) == ["b", "a"]
+    assert len(queue) == 0
+
+
+def test_ineligible_tenants_are_skipped_and_removed_requests_forgotten():
+    queue = FairQueue()
+    busy = queue.push("busy", INTERACTIVE, None)
+    queue.push("idle", INTERACTIVE, None)
+    assert queue.pop(lambda tenant: tenant != "busy").tenant == "idle"
+    queue.remove(busy)
+    assert len(queue) == 0 and queue.depth("busy") == 0
+
+
+# Admission controller
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected_with_retry_after():
+    controller = make_controller(max_queue=0)
+    ticket = await controller.acquire("a")
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire("b")
+    assert rejected.value.reason == "queue_full"
+    assert rejected.value.retry_after >= 1
+    controller.release(ticket)
+    assert controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_release_hands_the_slot_to_the_next_waiter():
+    controller = make_controller()
+    ticket = await controller.acquire("a")
+    waiting = asyncio.ensure_future(controller.acquire("b"))
+    await asyncio.sleep(0)
+    assert controller.metrics()["queue_depth"] == 1
+
+    controller.release(ticket)
+    handed_over = await waiting
+    assert handed_over.tenant == "b"
+    assert controller.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout_is_rejected():
+    controller = make_controller(queue_timeout=0.05)
+    await controller.acquire("a")
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire("b")
+    assert rejected.value.reason == "queue_timeout"
+    assert controller.metrics()["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_tenant_queue_limit():
+    controller = make_controller(max_in_flight=2, tenant_max_queue=1)
+    await controller.acquire("a")
+    queued = asyncio.ensure_future(controller.acquire("a"))
+    await asyncio.sleep(0)
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire("a")
+    assert rejected.value.reason == "tenant_queue_full"
+    assert (await controller.acquire("b")).tenant == "b"  # other tenants still get the free slot
+    queued.cancel()
+    await asyncio.gather(queued, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    controller = make_controller()
+    ticket = await controller.acquire("a")
+    waiting = asyncio.ensure_future(controller.acquire("b"))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    await asyncio.gather(waiting, return_exceptions=True)
+
+    assert controller.metrics()["queue_depth"] == 0
+    controller.release(ticket)
+    assert controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_admit_releases_on_error():
+    controller = make_controller()
+    with pytest.raises(RuntimeError):
+        async with controller.admit("a"):
+            assert controller.in_flight == 1
+            raise RuntimeError("generation failed")
+    assert controller.in_flight == 0
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from sahayakai import config
+from sahayakai.batching import GenerationBatcher
+from sahayakai.local_model_client import TransformerLabClient
+
+
+class RecordingClient:
+    """Stands in for TransformerLabClient.generate_batch_async"""
+
+    def __init__(self):
+        self.batches = []
+
+    async def generate_batch_async(self, prompts, max_tokens, temperature, top_p, repetition_penalty):
+        self.batches.append(list(prompts))
+        await asyncio.sleep(0)
+        return [ValueError(prompt) if prompt == "bad" else prompt.upper() for prompt in prompts]
+
+
+@pytest.mark.asyncio
+async def test_flushes_when_batch_is_full():
+    client = RecordingClient()
+    batcher = GenerationBatcher(client, window_ms=60_000, max_batch_size=3)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(*[batcher.generate(prompt) for prompt in ["a", "b", "c"]]), timeout=1
+    )
+    assert results == ["A", "B", "C"]
+    assert client.batches == [["a", "b", "c"]]
+
+
+@pytest.mark.asyncio
+async def test_flushes_partial_batch_after_window():
+    client = RecordingClient()
+    batcher = GenerationBatcher(client, window_ms=20, max_batch_size=8)
+
+    started = asyncio.get_running_loop().time()
+    results = await asyncio.gather(batcher.generate("a"), batcher.generate("b"))
+    assert results == ["A", "B"]
+    assert client.batches == [["a", "b"]]
+    assert asyncio.get_running_loop().time() - started >= 0.02
+
+
+@pytest.mark.asyncio
+async def test_batches_by_sampling_parameters_and_scatters_errors():
+    client = RecordingClient()
+    batcher = GenerationBatcher(client, window_ms=10, max_batch_size=8)
+
+    results = await asyncio.gather(
+        batcher.generate("a", max_tokens=64), batcher.generate("bad", max_tokens=64),
+        batcher.generate("c", max_tokens=128), return_exceptions=True,
+    )
+    assert results[0] == "A" and isinstance(results[1], ValueError) and results[2] == "C"
+    assert sorted(client.batches) == [["a", "bad"], ["c"]]
+    assert batcher.stats()["batches"] == 2
+
+
+def test_batching_requires_a_batch_endpoint(monkeypatch):
+    monkeypatch.setattr(config, "LOCAL_MODEL_BATCH_ENDPOINT", "")
+    assert TransformerLabClient(base_url="http://worker", batching=True)._batcher is None
+
+    monkeypatch.setattr(config, "LOCAL_MODEL_BATCH_ENDPOINT", "worker_generate_batch")
+    assert TransformerLabClient(base_url="http://worker", batching=True)._batcher is not None
@@ -0,0 +1,274 @@
+import time
+import asyncio
+
+import httpx
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from sahayakai import config, local_model_client
+from sahayakai.circuit_breaker import CircuitBreaker, CircuitOpenError
+from sahayakai.local_model_client import TransformerLabClient
+
+RESET = 0.05
+
+
+def make_breaker(**kwargs) -> CircuitBreaker:
+    return CircuitBreaker(name="worker", failure_threshold=kwargs.pop("failure_threshold", 2),
+                          reset_timeout=RESET, **kwargs)
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.end_call(breaker.before_call())
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def wait_for_reset():
+    time.sleep(RESET * 1.5)
+
+
+# State transitions
+
+def test_opens_after_consecutive_failures():
+    breaker = make_breaker()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_success_resets_failure_count():
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_after_reset_timeout_allows_one_probe():
+    breaker = make_breaker()
+    open_breaker(breaker)
+    wait_for_reset()
+    assert breaker.before_call() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_successful_probe_closes():
+    breaker = make_breaker()
+    open_breaker(breaker)
+    wait_for_reset()
+    probe = breaker.before_call()
+    breaker.record_success()
+    breaker.end_call(probe)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.before_call() is False
+
+
+def test_failed_probe_reopens():
+    breaker = make_breaker()
+    open_breaker(breaker)
+    wait_for_reset()
+    probe = breaker.before_call()
+    breaker.record_failure()
+    breaker.end_call(probe)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_probe_without_outcome_frees_its_slot():
+    breaker = make_breaker()
+    open_breaker(breaker)
+    wait_for_reset()
+    breaker.end_call(breaker.before_call())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.before_call() is True
+
+
+def test_end_call_of_non_probe_keeps_probe_slot_taken():
+    breaker = make_breaker()
+    call = breaker.before_call()
+    open_breaker(breaker)
+    wait_for_reset()
+    breaker.before_call()
+    breaker.end_call(call)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+# Local model client: cancelled and 4xx probes must not wedge the breaker
+
+def make_client(handler) -> TransformerLabClient:
+    client = TransformerLabClient(base_url="http://worker")
+    client.breaker = make_breaker(failure_threshold=1)
+    client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+async def refuse(request):
+    raise httpx.ConnectError("connection refused", request=request)
+
+
+async def hang(request):
+    await asyncio.sleep(3600)
+
+
+async def ok(request):
+    return httpx.Response(200, json={"text": "ok", "error_code": 0})
+
+
+async def bad_request(request):
+    return httpx.Response(422, json={"detail": "bad request"})
+
+
+async def trip(client: TransformerLabClient):
+    with pytest.raises(Exception):
+        await client._make_request_async("worker_generate", {"max_new_tokens": 8})
+    assert client.breaker.state == CircuitBreaker.OPEN
+    await asyncio.sleep(RESET * 1.5)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_does_not_wedge_breaker():
+    handlers = iter([refuse, hang, ok])
+    client = make_client(lambda request: next(handlers)(request))
+    await trip(client)
+
+    probe = asyncio.create_task(client._make_request_async("worker_generate", {"max_new_tokens": 8}))
+    await asyncio.sleep(0.01)
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+
+    result = await client._make_request_async("worker_generate", {"max_new_tokens": 8})
+    assert result["text"] == "ok"
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_client_error_probe_closes_breaker():
+    handlers = iter([refuse, bad_request])
+    client = make_client(lambda request: next(handlers)(request))
+    await trip(client)
+
+    with pytest.raises(Exception):
+        await client._make_request_async("worker_generate", {"max_new_tokens": 8})
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stream_closed_before_first_token_frees_probe():
+    handlers = iter([refuse, hang])
+    client = make_client(lambda request: next(handlers)(request))
+    await trip(client)
+
+    stream = client._stream_async("prompt", {"max_new_tokens": 8})
+    task = asyncio.create_task(stream.__anext__())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await stream.aclose()
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+    assert client.breaker.before_call() is True
+    await client.aclose()
+
+
+class StatusAdapter(BaseAdapter):
+    """requests adapter answering every call with a fixed status"""
+
+    def __init__(self, status: int):
+        super().__init__()
+        self.status = status
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = self.status
+        response._content = b'{"detail": "bad request"}'
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def test_sync_client_error_probe_closes_breaker():
+    client = TransformerLabClient(base_url="http://worker")
+    client.breaker = make_breaker(failure_threshold=1)
+    open_breaker(client.breaker)
+    wait_for_reset()
+
+    client._session.mount("http://", StatusAdapter(400))
+    with pytest.raises(Exception):
+        client._make_request("worker_generate", {"max_new_tokens": 8})
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+# Retries: one breaker outcome per call, and no probe slot held while backing off
+
+@pytest.fixture
+def retries(monkeypatch):
+    monkeypatch.setattr(config, "LOCAL_MODEL_RETRIES", 2)
+    monkeypatch.setattr(local_model_client, "backoff_delay", lambda attempt: 0)
+
+
+def test_sync_retries_count_as_one_failure(retries):
+    client = TransformerLabClient(base_url="http://worker")
+    client.breaker = make_breaker(failure_threshold=2)
+    client._session.mount("http://", StatusAdapter(503))
+
+    with pytest.raises(Exception):
+        client._make_request("worker_generate", {"max_new_tokens": 8}, idempotent=True)
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    assert client.breaker.metrics()["failures"] == 1
+
+
+def test_sync_retry_frees_probe_slot_during_backoff(retries, monkeypatch):
+    client = TransformerLabClient(base_url="http://worker")
+    client.breaker = make_breaker(failure_threshold=1)
+    open_breaker(client.breaker)
+    wait_for_reset()
+    client._session.mount("http://", StatusAdapter(503))
+
+    probes_during_backoff = []
+
+    def backoff(attempt):
+        # Raises CircuitOpenError if the failed attempt still held the probe slot
+        probe = client.breaker.before_call()
+        client.breaker.end_call(probe)
+        probes_during_backoff.append(probe)
+        return 0
+
+    monkeypatch.setattr(local_model_client, "backoff_delay", backoff)
+    with pytest.raises(Exception):
+        client._make_request("worker_generate", {"max_new_tokens": 8}, idempotent=True)
+    assert probes_during_backoff == [True, True]
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+
+async def unavailable(request):
+    return httpx.Response(503, json={"detail": "overloaded"})
+
+
+@pytest.mark.asyncio
+async def test_async_retries_count_as_one_failure(retries):
+    client = make_client(unavailable)
+    client.breaker = make_breaker(failure_threshold=2)
+
+    with pytest.raises(Exception):
+        await client._make_request_async("worker_generate", {"max_new_tokens": 8}, idempotent=True)
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    assert client.breaker.metrics()["failures"] == 1
+    await client.aclose()
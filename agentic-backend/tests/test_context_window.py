@@ -0,0 +1,60 @@
+from sahayakai.context_window import ContextWindowManager, count_tokens, extractive_summary
+
+SYSTEM = {"role": "system", "content": "You are Sahayak."}
+
+
+def turn(i: int):
+    role = "user" if i % 2 == 0 else "assistant"
+    return {"role": role, "content": f"Message number {i} about the water cycle. " + "More detail. " * 10}
+
+
+def make_manager(**kwargs) -> ContextWindowManager:
+    settings = dict(max_tokens=200, keep_last_turns=4, summary_max_tokens=50, agent_budgets={})
+    settings.update(kwargs)
+    return ContextWindowManager(**settings)
+
+
+def test_short_history_is_unchanged():
+    messages = [SYSTEM, {"role": "user", "content": "Hello"}]
+    assert make_manager().fit(messages) is messages
+
+
+def test_long_history_keeps_recent_turns_and_summarizes_the_rest():
+    messages = [SYSTEM] + [turn(i) for i in range(10)]
+    fitted = make_manager().fit(messages)
+
+    assert fitted[0] == SYSTEM
+    assert fitted[1]["role"] == "system"
+    assert fitted[1]["content"].startswith("Summary of earlier conversation: ")
+    kept = fitted[2:]
+    assert kept and kept == messages[-len(kept):]
+    assert sum(count_tokens(m["content"]) for m in fitted) <= 200
+
+
+def test_agent_budgets_override_the_default():
+    manager = make_manager(agent_budgets={"quiz_agent": 10_000})
+    messages = [SYSTEM] + [turn(i) for i in range(10)]
+    assert manager.budget_for("quiz_agent") == 10_000
+    assert manager.fit(messages, "quiz_agent") is messages
+    assert manager.fit(messages, "story_agent") != messages
+
+
+def test_summary_is_extended_incrementally():
+    calls = []
+
+    def summarizer(previous, messages, max_tokens):
+        calls.append(len(messages))
+        return extractive_summary(previous, messages, max_tokens)
+
+    manager = make_manager(summarizer=summarizer, keep_last_turns=2)
+    history = [SYSTEM] + [turn(i) for i in range(8)]
+    manager.fit(history)
+    manager.fit(history + [turn(8), turn(9)])
+    assert calls == [calls[0], 2]
+
+
+def test_extractive_summary_uses_first_sentences_within_budget():
+    summary = extractive_summary("", [{"role": "user", "content": "Explain rain. In detail please."},
+                                      {"role": "assistant", "content": "Rain falls from clouds. It is water."}], 100)
+    assert summary == "Teacher: Explain rain. Assistant: Rain falls from clouds."
+    assert len(extractive_summary(summary, [turn(0)] * 20, 10)) <= 10 * 4 + 3
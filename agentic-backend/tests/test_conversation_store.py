@@ -0,0 +1,75 @@
+import pytest
+
+from sahayakai.conversation_store import ConversationStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ConversationStore(path=str(tmp_path / "conversations.db"))
+    yield store
+    store.close()
+
+
+def exchange(question: str, answer: str):
+    return [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+
+
+def test_messages_are_kept_in_order(store):
+    store.append_messages("conv_a", exchange("What is soil?", "Soil is ..."))
+    store.append_messages("conv_a", exchange("Types of soil?", "Clay, sand, loam"))
+
+    assert [m["content"] for m in store.get_messages("conv_a")] == [
+        "What is soil?", "Soil is ...", "Types of soil?", "Clay, sand, loam"]
+    assert [m["content"] for m in store.get_messages("conv_a", limit=2)] == [
+        "Types of soil?", "Clay, sand, loam"]
+
+
+def test_list_pages_most_recent_first(store):
+    for name in ("conv_1", "conv_2", "conv_3"):
+        store.append_messages(name, exchange("hi", "hello"))
+    store.append_messages("conv_1", exchange("again", "hello again"))
+
+    assert store.list_conversations(limit=2, offset=0) == (["conv_1", "conv_3"], 3)
+    assert store.list_conversations(limit=2, offset=2) == (["conv_2"], 3)
+    assert store.list_conversations(limit=2, offset=4) == ([], 3)
+
+
+def test_delete_removes_conversation_and_messages(store):
+    store.append_messages("conv_a", exchange("hi", "hello"))
+    store.append_messages("conv_b", exchange("hi", "hello"))
+
+    assert store.delete_conversation("conv_a")
+    assert not store.exists("conv_a")
+    assert store.get_messages("conv_a") == []
+    assert not store.delete_conversation("conv_a")
+    assert store.list_conversations() == (["conv_b"], 1)
+
+
+def test_conversation_ids_are_unique():
+    ids = {ConversationStore.new_conversation_id() for _ in range(1000)}
+    assert len(ids) == 1000
+
+
+def test_deleting_does_not_lead_to_id_reuse(store):
+    first = store.new_conversation_id()
+    store.append_messages(first, exchange("hi", "hello"))
+    store.delete_conversation(first)
+    assert store.new_conversation_id() != first
+
+
+def test_history_is_shared_across_instances(tmp_path):
+    path = str(tmp_path / "conversations.db")
+    writer, reader = ConversationStore(path=path), ConversationStore(path=path)
+    writer.append_messages("conv_a", exchange("hi", "hello"))
+    assert reader.exists("conv_a")
+    writer.close()
+    reader.close()
+
+
+@pytest.mark.asyncio
+async def test_async_wrappers(store):
+    await store.append_messages_async("conv_a", exchange("hi", "hello"))
+    assert await store.exists_async("conv_a")
+    assert await store.get_messages_async("conv_a", limit=1) == [{"role": "assistant", "content": "hello"}]
+    assert await store.list_conversations_async() == (["conv_a"], 1)
+    assert await store.delete_conversation_async("conv_a")
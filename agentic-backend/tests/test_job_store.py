@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from sahayakai.job_runner import JobRunner
+from sahayakai.job_store import FAILED, QUEUED, RUNNING, SUCCEEDED, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(path=str(tmp_path / "jobs.db"), result_ttl=3600)
+    yield store
+    store.close()
+
+
+# Job store
+
+def test_claim_takes_each_job_once(store):
+    first = store.create("lesson", {"message": "soil"}, "school_a")
+    second = store.create("lesson", {"message": "rain"}, "school_b")
+
+    claimed = store.claim("worker_1")
+    assert claimed["id"] == first["id"]
+    assert claimed["status"] == RUNNING and claimed["attempts"] == 1
+    assert store.claim("worker_2", first["id"]) is None
+    assert store.claim("worker_2")["id"] == second["id"]
+    assert store.claim("worker_3") is None
+
+
+def test_progress_events_and_result(store):
+    job = store.create("lesson", {"message": "soil"}, "school_a")
+    store.claim("worker_1", job["id"])
+    store.add_event(job["id"], "story_agent", "running")
+    store.add_event(job["id"], "story_agent", "completed", "done")
+    store.finish(job["id"], result={"package": "lesson"})
+
+    finished = store.get(job["id"])
+    assert finished["status"] == SUCCEEDED
+    assert finished["result"] == {"package": "lesson"}
+    assert finished["progress"] == {"story_agent": "completed", "job": SUCCEEDED}
+
+    events = store.events(job["id"])
+    assert [(e["agent"], e["status"]) for e in events] == [
+        ("story_agent", "running"), ("story_agent", "completed"), ("job", SUCCEEDED)]
+    assert store.events(job["id"], after=events[1]["id"]) == events[2:]
+
+
+def test_released_jobs_are_queued_without_counting_the_attempt(store):
+    job = store.create("lesson", {}, "school_a")
+    store.claim("worker_1", job["id"])
+    store.release("worker_1")
+    released = store.get(job["id"])
+    assert released["status"] == QUEUED and released["attempts"] == 0
+
+
+def test_stale_jobs_are_requeued_then_failed(store):
+    job = store.create("lesson", {}, "school_a")
+    store.claim("worker_1", job["id"])
+    assert store.requeue_stale(stale_after=-1, max_attempts=2) == 1
+    assert store.get(job["id"])["status"] == QUEUED
+
+    store.claim("worker_2", job["id"])
+    store.requeue_stale(stale_after=-1, max_attempts=2)
+    assert store.get(job["id"])["status"] == FAILED
+
+
+def test_expired_results_are_purged(tmp_path):
+    store = JobStore(path=str(tmp_path / "jobs.db"), result_ttl=1)
+    job = store.create("lesson", {}, "school_a")
+    store.finish(job["id"], result="done")
+    store.result_ttl = -1
+    other = store.create("lesson", {}, "school_a")
+    store.finish(other["id"], result="done")
+
+    assert store.purge_expired() == 1
+    assert store.get(other["id"]) is None
+    assert store.get(job["id"]) is not None
+    store.close()
+
+
+# Job runner
+
+@pytest.mark.asyncio
+async def test_runner_runs_submitted_job_and_records_failures(store):
+    async def lesson(payload, progress):
+        progress("story_agent", "running")
+        if payload["message"] == "fail":
+            raise RuntimeError("worker unavailable")
+        return f"lesson for {payload['tenant']}"
+
+    runner = JobRunner(store, {"lesson": lesson}, max_concurrent=2, poll_interval=0.05)
+    runner.start()
+    try:
+        ok = runner.submit("lesson", {"message": "soil"}, "school_a")
+        failing = runner.submit("lesson", {"message": "fail"}, "school_a")
+        with pytest.raises(ValueError):
+            runner.submit("unknown", {}, "school_a")
+
+        for _ in range(50):
+            if store.counts().get(QUEUED, 0) + store.counts().get(RUNNING, 0) == 0:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await runner.stop()
+
+    assert store.get(ok["id"])["result"] == "lesson for school_a"
+    failed = store.get(failing["id"])
+    assert failed["status"] == FAILED and failed["error"] == "worker unavailable"
+
+
+@pytest.mark.asyncio
+async def test_stopping_the_runner_requeues_running_jobs(store):
+    started = asyncio.Event()
+
+    async def slow(payload, progress):
+        started.set()
+        await asyncio.sleep(3600)
+
+    runner = JobRunner(store, {"lesson": slow}, max_concurrent=1, poll_interval=60)
+    runner.start()
+    job = runner.submit("lesson", {}, "school_a")
+    await asyncio.wait_for(started.wait(), timeout=1)
+    await runner.stop()
+
+    requeued = store.get(job["id"])
+    assert requeued["status"] == QUEUED and requeued["owner"] is None
@@ -0,0 +1,137 @@
+import json
+
+import httpx
+import pytest
+
+from sahayakai import local_model_client
+from sahayakai.local_model_client import TransformerLabClient
+from sahayakai.response_cache import ResponseCache, chat_cache_key, normalize_request, is_cacheable
+
+SYSTEM = {"role": "system", "content": "You are Sahayak, a helpful assistant for teachers in rural India. " * 20}
+
+
+def make_cache(**kwargs) -> ResponseCache:
+    return ResponseCache(path="", **kwargs)
+
+
+# Keys and near-duplicate matching
+
+def test_normalized_requests_share_a_key():
+    cache = make_cache()
+    cache.set("Create a worksheet on soil types for grade 5", "worksheet_agent", "soil worksheet")
+    assert cache.get("make a worksheet about soil type for class 5", "worksheet_agent") == "soil worksheet"
+    assert cache.stats()["hits"] == 1
+
+
+def test_near_duplicate_hit():
+    cache = make_cache(similarity_threshold=0.7)
+    cache.set("worksheet on the types of soil in india for grade 5", "worksheet_agent", "soil worksheet")
+    assert cache.get("worksheet on the types of soils in indian for grade 5", "worksheet_agent") == "soil worksheet"
+    assert cache.stats()["near_hits"] == 1
+
+
+def test_grade_agent_and_sampling_separate_entries():
+    cache = make_cache()
+    cache.set("story about the monsoon for grade 3", "story_agent", "grade 3 story", (256, 0.7))
+    assert cache.get("story about the monsoon for grade 4", "story_agent", (256, 0.7)) is None
+    assert cache.get("story about the monsoon for grade 3", "worksheet_agent", (256, 0.7)) is None
+    assert cache.get("story about the monsoon for grade 3", "story_agent", (512, 0.7)) is None
+
+
+def test_numbers_and_word_order_are_kept():
+    cache = make_cache()
+    cache.set("what is 3 times 4", "sahayak_agent", "12")
+    assert cache.get("what is 3 times 5", "sahayak_agent") is None
+    cache.set("story of a dog chasing a cat", "story_agent", "dog story")
+    assert cache.get("story of a cat chasing a dog", "story_agent") is None
+
+
+def test_translation_direction_is_kept():
+    assert normalize_request("Translate this poem from English to Hindi", "a")["language"] == "from english to hindi"
+    cache = make_cache()
+    cache.set("Translate the rain poem from English to Hindi", "sahayak_agent", "hindi poem")
+    assert cache.get("Translate the rain poem from Hindi to English", "sahayak_agent") is None
+    assert cache.get("Translate the rain poem from English to Tamil", "sahayak_agent") is None
+    assert cache.get("Translate the rain poem from English to Hindi", "sahayak_agent") == "hindi poem"
+
+
+def test_long_messages_match_exactly_only():
+    cache = make_cache(near_max_words=4)
+    long_message = "explain the water cycle with evaporation condensation and precipitation steps"
+    cache.set(long_message, "sahayak_agent", "water cycle")
+    assert cache.get(long_message + " please", "sahayak_agent") == "water cycle"  # stopword only
+    assert cache.get(long_message.replace("steps", "stages"), "sahayak_agent") is None
+    assert cache.stats()["near_hits"] == 0
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(path=path).set("poem on trees for grade 2", "story_agent", "tree poem")
+    assert ResponseCache(path=path).get("poem on trees for grade 2", "story_agent") == "tree poem"
+
+
+def test_errors_are_not_cacheable():
+    assert is_cacheable("A lesson")
+    assert not is_cacheable("Error: worker unavailable")
+    assert not is_cacheable("")
+
+
+# Chat requests
+
+def test_chat_key_is_last_user_message_and_context():
+    first = [SYSTEM, {"role": "user", "content": "Explain photosynthesis"}]
+    message, context, single_turn = chat_cache_key(first)
+    assert message == "Explain photosynthesis"
+    assert single_turn
+
+    follow_up = first + [{"role": "assistant", "content": "Plants make food."},
+                         {"role": "user", "content": "Make it simpler"}]
+    message, follow_up_context, single_turn = chat_cache_key(follow_up)
+    assert message == "Make it simpler"
+    assert not single_turn
+    assert follow_up_context != context
+
+
+def test_chat_follow_ups_in_different_conversations_do_not_collide():
+    cache = make_cache()
+    photosynthesis = [SYSTEM, {"role": "user", "content": "Explain photosynthesis"},
+                      {"role": "assistant", "content": "Plants make food from sunlight."},
+                      {"role": "user", "content": "Make it simpler"}]
+    water_cycle = [SYSTEM, {"role": "user", "content": "Explain the water cycle"},
+                   {"role": "assistant", "content": "Water evaporates and falls as rain."},
+                   {"role": "user", "content": "Make it simpler"}]
+    message, context, single_turn = chat_cache_key(photosynthesis)
+    cache.set(message, "local_model", "simple photosynthesis", context=context)
+
+    message, context, single_turn = chat_cache_key(water_cycle)
+    assert cache.get(message, "local_model", context=context, near=single_turn) is None
+
+
+async def answer_by_topic(request):
+    prompt = json.loads(request.content)["prompt"]
+    topic = "photosynthesis" if "photosynthesis" in prompt else "water cycle"
+    return httpx.Response(200, json={"text": f"An answer about {topic}", "error_code": 0})
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_does_not_serve_another_topic(monkeypatch):
+    cache = make_cache()
+    monkeypatch.setattr(local_model_client, "response_cache", cache)
+    client = TransformerLabClient(base_url="http://worker")
+    client.early_stop = False
+    client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(answer_by_topic))
+
+    async def fake_template():
+        return {}
+    monkeypatch.setattr(client, "get_conversation_template_async", fake_template)
+
+    photosynthesis = await client.chat_completion_async([SYSTEM, {"role": "user", "content": "Explain photosynthesis"}])
+    water_cycle = await client.chat_completion_async([SYSTEM, {"role": "user", "content": "Explain the water cycle"}])
+    assert "photosynthesis" in photosynthesis
+    assert "water cycle" in water_cycle
+    assert cache.stats()["near_hits"] == 0
+
+    again = await client.chat_completion_async([SYSTEM, {"role": "user", "content": "Explain photosynthesis"}])
+    assert again == photosynthesis
+    assert cache.stats()["hits"] == 1
+    await client.aclose()
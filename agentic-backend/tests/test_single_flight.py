@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from sahayakai.single_flight import SingleFlight, flight_key
+
+
+@pytest.mark.asyncio
+async def test_work_is_cancelled_once_every_caller_gives_up():
+    flights, cancelled = SingleFlight("test"), asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    callers = [asyncio.create_task(flights.do("key", work)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    callers[0].cancel()
+    await asyncio.sleep(0.01)
+    assert not cancelled.is_set()
+
+    callers[1].cancel()
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    await asyncio.gather(*callers, return_exceptions=True)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_flight_key_ignores_case_and_whitespace_only():
+    assert flight_key("Explain  Rain", "story_agent") == flight_key("explain rain ", "story_agent")
+    assert flight_key("explain rain", "story_agent") != flight_key("explain rain", "quiz_agent")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_run():
+    flights, runs = SingleFlight("test"), []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "lesson"
+
+    results = await asyncio.gather(*(flights.do("key", work) for _ in range(3)))
+    assert results == ["lesson"] * 3
+    assert len(runs) == 1
+    assert flights.stats()["coalesced"] == 2
+
+    assert await flights.do("key", work) == "lesson"  # finished calls are not kept
+    assert len(runs) == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller():
+    flights = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("worker unavailable")
+
+    results = await asyncio.gather(*(flights.do("key", work) for _ in range(2)), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_do_sync_coalesces_threads():
+    flights, runs, release = SingleFlight("test"), [], asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    def work():
+        runs.append(1)
+        asyncio.run_coroutine_threadsafe(release.wait(), loop).result()
+        return "lesson"
+
+    callers = [asyncio.create_task(asyncio.to_thread(flights.do_sync, "key", work)) for _ in range(3)]
+    while flights.stats()["coalesced"] < 2:
+        await asyncio.sleep(0.01)
+    release.set()
+    assert await asyncio.gather(*callers) == ["lesson"] * 3
+    assert len(runs) == 1
+
+
+@pytest.mark.asyncio
+async def test_late_stream_subscribers_get_the_whole_stream():
+    flights, runs, go_on = SingleFlight("test"), [], asyncio.Event()
+
+    async def work():
+        runs.append(1)
+        yield "Rain "
+        await go_on.wait()
+        yield "falls."
+
+    async def subscribe():
+        return [chunk async for chunk in flights.stream("key", work)]
+
+    first = asyncio.create_task(subscribe())
+    await asyncio.sleep(0.01)
+    late = asyncio.create_task(subscribe())
+    await asyncio.sleep(0.01)
+    go_on.set()
+
+    assert await first == await late == ["Rain ", "falls."]
+    assert len(runs) == 1
+    assert flights.stats()["stream_subscribers_coalesced"] == 1
@@ -0,0 +1,90 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from sahayakai.admission import AdmissionRejected
+from sahayakai.streaming import ClosingStreamingResponse, prime_stream, signal_admitted
+
+
+def gate(allowed: bool, slots: list):
+    @asynccontextmanager
+    async def admit():
+        if not allowed:
+            raise AdmissionRejected("Local model", "queue_full", 1)
+        slots.append(1)
+        try:
+            yield
+        finally:
+            slots.pop()
+    return admit
+
+
+async def slow_generation(admit, first_token_after: float):
+    async with admit():
+        await asyncio.sleep(first_token_after)
+        yield "token"
+        yield "done"
+
+
+@pytest.mark.asyncio
+async def test_primed_once_admitted_without_waiting_for_output():
+    admitted, slots = asyncio.Event(), []
+    stream = slow_generation(signal_admitted(gate(True, slots), admitted), first_token_after=0.5)
+
+    events = await asyncio.wait_for(prime_stream(stream, admitted), timeout=0.2)
+    assert slots == [1]
+    assert [event async for event in events] == ["token", "done"]
+    assert slots == []
+
+
+@pytest.mark.asyncio
+async def test_rejection_is_raised_before_the_response_starts():
+    admitted = asyncio.Event()
+    stream = slow_generation(signal_admitted(gate(False, []), admitted), first_token_after=0)
+    with pytest.raises(AdmissionRejected):
+        await prime_stream(stream, admitted)
+
+
+@pytest.mark.asyncio
+async def test_output_without_admission_primes_the_stream():
+    async def cached():
+        yield "cached answer"
+
+    events = await prime_stream(cached(), asyncio.Event())
+    assert [event async for event in events] == ["cached answer"]
+
+
+@pytest.mark.asyncio
+async def test_closing_before_first_item_releases_the_slot():
+    admitted, slots = asyncio.Event(), []
+    stream = slow_generation(signal_admitted(gate(True, slots), admitted), first_token_after=3600)
+
+    events = await prime_stream(stream, admitted)
+    assert slots == [1]
+    await events.aclose()
+    assert slots == []
+
+
+@pytest.mark.asyncio
+async def test_response_closes_generator_when_client_disconnects_mid_wait():
+    closed = asyncio.Event()
+
+    async def events():
+        try:
+            yield "data: started\n\n"
+            await asyncio.sleep(3600)
+        finally:
+            closed.set()
+
+    async def receive():
+        await asyncio.sleep(0.05)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    response = ClosingStreamingResponse(events(), media_type="text/event-stream")
+    scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+    await asyncio.wait_for(response(scope, receive, send), timeout=1)
+    assert closed.is_set()
@@ -0,0 +1,65 @@
+from sahayakai.text_postprocess import (
+    NO_RESPONSE, OutputCleaner, clean_generated_text, complete_sentences, find_loop,
+)
+
+
+def test_trailing_fragment_is_dropped():
+    assert complete_sentences("Plants need water. They also need") == "Plants need water."
+    assert complete_sentences("Plants need water") == "Plants need water"
+    assert complete_sentences("Plants need water!") == "Plants need water!"
+
+
+def test_find_loop_keeps_one_copy():
+    text = "The answer is: " + "ha ha ha " * 10
+    cut = find_loop(text)
+    assert cut != -1
+    assert find_loop(text[:cut]) == -1
+    assert find_loop("A short, ordinary sentence about the monsoon rains in India.") == -1
+
+
+def test_turn_markers_role_echoes_and_prompt_are_removed():
+    prompt = "Explain rain."
+    output = prompt + " Rain falls from clouds.<end_of_turn>\n[User] thanks\nClouds hold water drops."
+    assert clean_generated_text(prompt, output) == "Rain falls from clouds. Clouds hold water drops."
+
+
+def test_empty_output():
+    assert clean_generated_text("prompt", "") == NO_RESPONSE
+
+
+def test_stops_after_max_lines():
+    cleaner = OutputCleaner(max_lines=2)
+    assert not cleaner.feed("First useful line.\n")
+    assert cleaner.feed("Second useful line.\nThird line.\n")
+    assert cleaner.stop_reason == "max_lines"
+    assert cleaner.finish() == "First useful line. Second useful line."
+
+
+def test_stops_on_repeated_lines():
+    cleaner = OutputCleaner()
+    cleaner.feed("Water evaporates.\n")
+    for _ in range(3):
+        cleaner.feed("Water evaporates.\n")
+    assert cleaner.done and cleaner.stop_reason == "repetition"
+    assert cleaner.finish() == "Water evaporates."
+
+
+def test_stops_on_a_line_looping_without_newlines():
+    cleaner = OutputCleaner()
+    for _ in range(20):
+        if cleaner.feed("and again "):
+            break
+    assert cleaner.stop_reason == "repetition"
+    assert cleaner.finish() == "and again"
+
+
+def test_streamed_chunks_match_a_single_pass():
+    output = "Soil has layers.\nTopsoil is rich.\n\nSubsoil is hard. It holds"
+    cleaner = OutputCleaner()
+    for i in range(0, len(output), 3):
+        cleaner.feed(output[i:i + 3])
+    assert cleaner.finish() == clean_generated_text("", output)
+
+
+def test_short_lines_fall_back_to_first_paragraph():
+    assert clean_generated_text("", "Yes.\nOk\n\nNo.") == "Yes.\nOk"